@@ -0,0 +1,73 @@
+"""Benchmark the heap AppointmentManager against the bucket-queue BucketAppointmentManager.
+
+    python benchmarks/appointments.py --bookings 1000000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_core import AppointmentManager, BucketAppointmentManager
+
+# Emergency / Urgent / Standard share of incoming bookings
+PRIORITY_MIX = ((1, 0.1), (2, 0.3), (3, 0.6))
+
+
+def workload(count, seed):
+    rng = random.Random(seed)
+    levels = [p for p, _ in PRIORITY_MIX]
+    weights = [w for _, w in PRIORITY_MIX]
+    return rng.choices(levels, weights, k=count)
+
+
+def run(manager_cls, priorities):
+    mgr = manager_cls()
+    start = time.perf_counter()
+    for i, p in enumerate(priorities):
+        mgr.book(f"patient {i}", p, "checkup")
+    booked = time.perf_counter()
+    page = mgr.peek(50, len(priorities) // 2)
+    peeked = time.perf_counter()
+    while mgr.pop_next() is not None:
+        pass
+    popped = time.perf_counter()
+    return booked - start, peeked - booked, popped - peeked, page
+
+
+def peak_memory(manager_cls, priorities):
+    tracemalloc.start()
+    mgr = manager_cls()
+    for i, p in enumerate(priorities):
+        mgr.book(f"patient {i}", p, "checkup")
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--memory", action="store_true", help="also report peak traced memory (slow)")
+    args = parser.parse_args()
+
+    priorities = workload(args.bookings, args.seed)
+    print(f"{args.bookings} bookings, then one mid-queue page, then pop until empty")
+    pages = []
+    for cls in (AppointmentManager, BucketAppointmentManager):
+        book, peek, pop = run(cls, priorities)[:3]
+        pages.append(run(cls, priorities[:10_000])[3])
+        n = args.bookings
+        line = (f"  {cls.__name__:<26} book {book / n * 1e9:6.0f} ns/op   pop {pop / n * 1e9:6.0f} ns/op"
+                f"   peek(50, mid) {peek * 1e3:7.2f} ms")
+        if args.memory:
+            line += f"   peak {peak_memory(cls, priorities) / 2**20:7.1f} MiB"
+        print(line)
+    assert pages[0] == pages[1], "managers disagree on queue order"
+
+
+if __name__ == "__main__":
+    main()
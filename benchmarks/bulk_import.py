@@ -0,0 +1,85 @@
+"""Benchmark importing a road network file: GraphImporter against one add_road() per row.
+
+    python benchmarks/bulk_import.py --edges 2000000
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_core import Graph
+from navigator_store import GraphImporter
+
+
+def write_network(path, edges, seed):
+    """Random sparse network, ~4 roads per junction, ~5% of rows repeat a road."""
+    rng = random.Random(seed)
+    nodes = max(2, edges // 2)
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        out.writerow(["from", "to", "km"])
+        for _ in range(edges):
+            a = rng.randrange(nodes)
+            b = (a + rng.randrange(1, 64)) % nodes if rng.random() < 0.95 else (a + 1) % nodes
+            out.writerow([f"J{a}", f"J{b}", rng.randint(1, 40)])
+
+
+def add_road_import(path):
+    graph = Graph()
+    with open(path, newline="") as f:
+        rows = csv.reader(f)
+        next(rows)
+        for a, b, km in rows:
+            graph.add_road(a, b, int(km))
+    graph.freeze(compact=True)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--edges", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--baseline", action="store_true", help="also time add_road per row (slow)")
+    parser.add_argument("--memory", action="store_true", help="also report peak traced memory (slow)")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="scn-import-")
+    try:
+        path = os.path.join(directory, "roads.csv")
+        write_network(path, args.edges, args.seed)
+        size = os.path.getsize(path)
+        print(f"{args.edges} edge rows, {size / 2**20:.1f} MiB of CSV")
+
+        if args.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        importer = GraphImporter().read_edges(path)
+        staged = time.perf_counter()
+        graph = importer.build()
+        built = time.perf_counter()
+        line = (f"  GraphImporter  parse {staged - start:6.2f} s   build {built - staged:6.2f} s"
+                f"   {args.edges / (built - start) * 60 / 1e6:6.1f} M edges/min")
+        if args.memory:
+            line += f"   peak {tracemalloc.get_traced_memory()[1] / 2**20:7.1f} MiB"
+            tracemalloc.stop()
+        print(line)
+        print(f"  {len(graph.csr)} junctions, {len(graph.csr.targets) // 2} distinct roads")
+
+        if args.baseline:
+            start = time.perf_counter()
+            add_road_import(path)
+            elapsed = time.perf_counter() - start
+            print(f"  add_road       total {elapsed:6.2f} s   {args.edges / elapsed * 60 / 1e6:6.1f} M edges/min")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark Graph.distance_matrix against one Graph.dijkstra per source.
+
+    python benchmarks/distance_matrix.py --side 120 --ambulances 200 --hospitals 40
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_core import Graph
+
+
+def grid_city(side, seed):
+    """side x side street grid with jittered junctions and integer road lengths."""
+    rng = random.Random(seed)
+    graph = Graph()
+    for i in range(side):
+        for j in range(side):
+            graph.add_node(f"{i},{j}", j * 10 + rng.uniform(-3, 3), i * 10 + rng.uniform(-3, 3))
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side:
+                graph.add_road(f"{i},{j}", f"{i},{j + 1}", rng.randint(1, 4))
+            if i + 1 < side:
+                graph.add_road(f"{i},{j}", f"{i + 1},{j}", rng.randint(1, 4))
+    graph.freeze()
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=120, help="grid side; nodes = side^2")
+    parser.add_argument("--ambulances", type=int, default=200)
+    parser.add_argument("--hospitals", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    graph = grid_city(args.side, args.seed)
+    rng = random.Random(args.seed)
+    nodes = list(graph.adj)
+    sources = rng.sample(nodes, args.ambulances)
+    targets = rng.sample(nodes, args.hospitals)
+    print(f"{len(nodes)} nodes, {args.ambulances} x {args.hospitals} matrix")
+
+    start = time.perf_counter()
+    looped = []
+    for s in sources:
+        dist, _ = graph.dijkstra(s)
+        looped.append([dist[t] for t in targets])
+    baseline = time.perf_counter() - start
+    print(f"  dijkstra loop        {baseline:8.3f} s")
+
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        matrix = graph.distance_matrix(sources, targets, workers=workers)
+        elapsed = time.perf_counter() - start
+        rows = [list(row) for row in matrix]
+        assert rows == looped, "distance_matrix disagrees with dijkstra"
+        print(f"  distance_matrix w={workers:<3} {elapsed:8.3f} s  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark live road updates: incremental partition repair against full recomputation.
+
+    python benchmarks/dynamic_updates.py --side 120 --hospitals 40 --batches 200 --batch-size 5
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_core import Graph, HospitalPartition
+
+
+def grid_city(side, hospitals, seed):
+    """side x side street grid with jittered junctions, integer road lengths and random hospitals."""
+    rng = random.Random(seed)
+    graph = Graph()
+    for i in range(side):
+        for j in range(side):
+            graph.add_node(f"{i},{j}", j * 10 + rng.uniform(-3, 3), i * 10 + rng.uniform(-3, 3))
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side:
+                graph.add_road(f"{i},{j}", f"{i},{j + 1}", rng.randint(1, 4))
+            if i + 1 < side:
+                graph.add_road(f"{i},{j}", f"{i + 1},{j}", rng.randint(1, 4))
+    for name in rng.sample(list(graph.adj), hospitals):
+        graph.add_hospital(name)
+    graph.freeze(compact=True)
+    return graph
+
+
+def traffic(graph, batches, size, seed):
+    """Update batches: mostly congestion (x1.5-4), some clearing back to base, a few closures."""
+    rng = random.Random(seed)
+    roads = [(a, b, w) for a in graph.adj for b, w in graph.adj[a].items() if a < b]
+    out = []
+    for _ in range(batches):
+        batch = []
+        for a, b, w in rng.sample(roads, size):
+            r = rng.random()
+            batch.append((a, b, None if r < 0.05 else w if r < 0.35 else round(w * rng.uniform(1.5, 4))))
+        out.append(batch)
+    return out
+
+
+def run(graph, batches, queries, mode):
+    part = graph.precompute_hospital_partition()
+    hospitals = [graph.csr.ids[h] for h in graph.hospitals]
+    answers = []
+    start = time.perf_counter()
+    for batch, sources in zip(batches, queries):
+        if mode == "repair":
+            graph.update_roads(batch)
+            answers.extend(graph.nearest_hospitals(s, 1)[0][1] for s in sources)
+        elif mode == "rebuild":
+            graph._partition = None
+            graph.update_roads(batch)
+            part = graph.precompute_hospital_partition()
+            answers.extend(graph.nearest_hospitals(s, 1)[0][1] for s in sources)
+        else:  # one full Dijkstra per query
+            graph._partition = None
+            graph.update_roads(batch)
+            for s in sources:
+                dist = graph.dijkstra(s)[0]
+                answers.append(min(dist.get(graph.csr.names[h], float("inf")) for h in hospitals))
+    return time.perf_counter() - start, answers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--side", type=int, default=120, help="grid side; nodes = side^2")
+    parser.add_argument("--hospitals", type=int, default=40)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5, help="roads changed per update")
+    parser.add_argument("--queries", type=int, default=5, help="nearest-hospital queries after each update")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    base = grid_city(args.side, args.hospitals, args.seed)
+    batches = traffic(base, args.batches, args.batch_size, args.seed)
+    rng = random.Random(args.seed)
+    names = list(base.adj)
+    queries = [[rng.choice(names) for _ in range(args.queries)] for _ in batches]
+    print(f"{args.side ** 2} nodes, {args.hospitals} hospitals, {args.batches} batches of "
+          f"{args.batch_size} road updates, {args.queries} nearest-hospital queries after each")
+
+    results = {}
+    for mode, label in (("repair", "update_roads + repair"), ("rebuild", "rebuild partition"),
+                        ("dijkstra", "Graph.dijkstra per query")):
+        graph = grid_city(args.side, args.hospitals, args.seed)
+        elapsed, answers = run(graph, batches, queries, mode)
+        results[mode] = answers
+        rounds = args.batches / elapsed
+        print(f"  {label:<26} {elapsed:7.2f} s   {rounds:8.1f} update+query rounds/s")
+    assert results["repair"] == results["rebuild"] == results["dijkstra"], "strategies disagree"
+
+
+if __name__ == "__main__":
+    main()
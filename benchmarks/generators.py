@@ -0,0 +1,127 @@
+"""Seeded synthetic cities and booking workloads for the benchmarks.
+
+Graphs are streamed through GraphImporter, so they come back frozen and compact (CSR arrays,
+no adjacency dicts) and sizes up to ~10^7 nodes stay within a few GB. Node names are the
+decimal node numbers; roughly one node in HOSPITAL_EVERY is a hospital.
+"""
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_store import GraphImporter
+
+# Emergency / Urgent / Standard share of incoming bookings
+PRIORITY_MIX = ((1, 0.1), (2, 0.3), (3, 0.6))
+COMPLAINTS = {1: ("Chest Pain", "Severe Bleeding", "Road Accident Injury", "Shortness of Breath"),
+              2: ("High Fever", "Migraine", "Abdominal Pain", "Infection"),
+              3: ("Annual Checkup", "Blood Test", "Follow-up", "Physiotherapy Session")}
+HOSPITAL_EVERY = 500
+
+
+def _finish(importer, n, rng):
+    hospitals = rng.sample(range(n), max(1, n // HOSPITAL_EVERY))
+    importer.mark_hospitals(str(i) for i in hospitals)
+    return importer.build()
+
+
+def grid(n, seed=0):
+    """sqrt(n) x sqrt(n) street grid, junctions jittered, integer road lengths 1-4 km."""
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    n = side * side
+    importer = GraphImporter()
+    importer.add_nodes((str(i), (i % side) * 10 + rng.uniform(-3, 3), (i // side) * 10 + rng.uniform(-3, 3))
+                       for i in range(n))
+
+    def roads():
+        for i in range(n):
+            if i % side + 1 < side:
+                yield str(i), str(i + 1), rng.randint(1, 4)
+            if i + side < n:
+                yield str(i), str(i + side), rng.randint(1, 4)
+
+    importer.add_edges(roads())
+    return _finish(importer, n, rng)
+
+
+def random_geometric(n, seed=0, degree=6):
+    """Junctions scattered uniformly; each joined to every junction within the radius that gives
+    about `degree` neighbours. Road length is the straight-line distance (10 px = 1 km), min 1."""
+    rng = random.Random(seed)
+    size = 10 * math.sqrt(n)
+    xs = [rng.uniform(0, size) for _ in range(n)]
+    ys = [rng.uniform(0, size) for _ in range(n)]
+    radius = math.sqrt(degree / (math.pi * n)) * size
+    cells = {}
+    for i in range(n):
+        cells.setdefault((int(xs[i] // radius), int(ys[i] // radius)), []).append(i)
+    importer = GraphImporter()
+    importer.add_nodes((str(i), xs[i], ys[i]) for i in range(n))
+
+    def roads():
+        for (cx, cy), members in cells.items():
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for j in cells.get((cx + dx, cy + dy), ()):
+                        for i in members:
+                            if i < j:
+                                d = math.hypot(xs[i] - xs[j], ys[i] - ys[j])
+                                if d <= radius:
+                                    yield str(i), str(j), max(1, round(d / 10))
+
+    importer.add_edges(roads())
+    return _finish(importer, n, rng)
+
+
+def scale_free(n, seed=0, links=2):
+    """Barabasi-Albert preferential attachment (each new junction links to `links` existing ones,
+    chosen in proportion to degree): a few hub interchanges, many dead ends. Lengths 1-10 km."""
+    rng = random.Random(seed)
+    importer = GraphImporter()
+    importer.add_nodes((str(i), rng.uniform(0, 10 * math.sqrt(n)), rng.uniform(0, 10 * math.sqrt(n)))
+                       for i in range(n))
+
+    def roads():
+        ends = list(range(links + 1))  # every road end once, so picks are degree-weighted
+        for i in range(links + 1):
+            for j in range(i):
+                yield str(i), str(j), rng.randint(1, 10)
+                ends += (i, j)
+        for i in range(links + 1, n):
+            chosen = set()
+            while len(chosen) < links:
+                chosen.add(ends[rng.randrange(len(ends))])
+            for j in chosen:
+                yield str(i), str(j), rng.randint(1, 10)
+                ends += (i, j)
+
+    importer.add_edges(roads())
+    return _finish(importer, n, rng)
+
+
+GENERATORS = {"grid": grid, "geometric": random_geometric, "scale_free": scale_free}
+
+
+def priorities(count, seed=0, mix=PRIORITY_MIX):
+    rng = random.Random(seed)
+    return rng.choices([p for p, _ in mix], [w for _, w in mix], k=count)
+
+
+def bookings(count, seed=0, mix=PRIORITY_MIX):
+    """(name, priority, details) for count patients drawn from the priority mix."""
+    rng = random.Random(seed)
+    return [(f"patient {i}", p, rng.choice(COMPLAINTS[p])) for i, p in enumerate(priorities(count, seed, mix))]
+
+
+def clinic_day(count, seed=0, mix=PRIORITY_MIX, backlog=0.2):
+    """Interleaved ("book", booking) / ("pop", None) operations: patients arrive a little faster
+    than they are seen, so about `backlog` of them are still queued at the end."""
+    rng = random.Random(seed)
+    ops = []
+    for booking in bookings(count, seed, mix):
+        ops.append(("book", booking))
+        if rng.random() < 1 - backlog:
+            ops.append(("pop", None))
+    return ops
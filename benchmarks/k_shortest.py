@@ -0,0 +1,148 @@
+"""Benchmark k shortest alternative routes (Graph.k_shortest_routes) on generated cities.
+
+    python benchmarks/k_shortest.py --sizes 100000,1000000 --k 3,5,10
+    python benchmarks/k_shortest.py --check 2000   (also compare with plain Yen on a small graph)
+
+Each query asks for routes from a random junction to a random hospital. The tree grown from
+the hospital is built once per hospital ("tree" below, cached afterwards like any dijkstra
+tree); the k-route timings are the searches made on top of it.
+"""
+import argparse
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from navigator_core import INF
+import generators
+
+
+def plain_yen(csr, source, target, k):
+    """Textbook Yen: a fresh Dijkstra (stopping at the target) for every spur node."""
+    offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+
+    def search(spur, blocked, banned):
+        dist, prev, heap = {spur: 0}, {spur: -1}, [(0, spur)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u == target:
+                path = []
+                while u >= 0:
+                    path.append(u)
+                    u = prev[u]
+                return d, path[::-1]
+            if d > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if v in blocked or (u == spur and v in banned):
+                    continue
+                if d + weights[i] < dist.get(v, INF):
+                    dist[v], prev[v] = d + weights[i], u
+                    heapq.heappush(heap, (d + weights[i], v))
+        return None
+
+    def cost(path):
+        return sum(min(weights[i] for i in range(offsets[u], offsets[u + 1]) if targets[i] == v)
+                   for u, v in zip(path, path[1:]))
+
+    first = search(source, set(), set())
+    if first is None:
+        return []
+    found, queue, seen = [(first[0], tuple(first[1]))], [], {tuple(first[1])}
+    while len(found) < k:
+        path = found[-1][1]
+        for i in range(len(path) - 1):
+            root = path[:i + 1]
+            banned = {p[i + 1] for _, p in found if p[:i + 1] == root}
+            hit = search(path[i], set(path[:i]), banned)
+            if hit is not None:
+                candidate = path[:i] + tuple(hit[1])
+                if candidate not in seen:
+                    seen.add(candidate)
+                    heapq.heappush(queue, (cost(root) + hit[0], candidate))
+        if not queue:
+            break
+        found.append(heapq.heappop(queue))
+    return found
+
+
+def pairs(graph, queries, seed):
+    rng = random.Random(seed)
+    names, hospitals = graph.csr.names, sorted(graph.hospitals)
+    return [(names[rng.randrange(len(names))], hospitals[rng.randrange(len(hospitals))]) for _ in range(queries)]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return [samples[min(len(samples) - 1, int(q * len(samples)))] * 1e3 for q in (0.5, 0.9, 0.99)]
+
+
+def run(graph, queries, ks):
+    tree = []
+    for start, hospital in queries:
+        begin = time.perf_counter()
+        graph.k_shortest_routes(start, hospital, 1)
+        tree.append(time.perf_counter() - begin)
+    print(f"  {'tree from the hospital':<24} p50 {percentiles(tree)[0]:9.1f} ms  (once per hospital)")
+    for k in ks:
+        samples, found, hops = [], 0, 0
+        for start, hospital in queries:
+            begin = time.perf_counter()
+            routes = graph.k_shortest_routes(start, hospital, k)
+            samples.append(time.perf_counter() - begin)
+            found += len(routes)
+            hops += len(routes[0][1]) if routes else 0
+        p50, p90, p99 = percentiles(samples)
+        print(f"  k={k:<22} p50 {p50:9.1f} ms  p90 {p90:9.1f} ms  p99 {p99:9.1f} ms  "
+              f"{found / len(queries):4.1f} routes of ~{hops / len(queries):.0f} nodes")
+
+
+def check(size, queries, ks, seed):
+    graph = generators.grid(size, seed)
+    csr = graph.csr
+    print(f"check against plain Yen, grid n={len(csr)}")
+    for k in ks:
+        ours = theirs = 0
+        for start, hospital in pairs(graph, queries, seed):
+            graph.k_shortest_routes(start, hospital, 1)
+            begin = time.perf_counter()
+            routes = graph.k_shortest_routes(start, hospital, k)
+            ours += time.perf_counter() - begin
+            begin = time.perf_counter()
+            reference = plain_yen(csr, csr.ids[start], csr.ids[hospital], k)
+            theirs += time.perf_counter() - begin
+            assert [d for d, _ in routes] == [csr.distance(d) for d, _ in reference], (start, hospital, k)
+        print(f"  k={k:<3} k_shortest_routes {ours / queries * 1e3:8.1f} ms   plain Yen {theirs / queries * 1e3:9.1f} ms"
+              f"   ({theirs / ours:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generators", default=",".join(generators.GENERATORS),
+                        help=f"comma-separated subset of {', '.join(generators.GENERATORS)}")
+    parser.add_argument("--sizes", default="100000", help="comma-separated node counts")
+    parser.add_argument("--k", default="3,4,5,6,7,8,9,10", help="comma-separated route counts")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="also check distances against plain Yen on an N-node grid")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    ks = [int(k) for k in args.k.split(",")]
+
+    for name in args.generators.split(","):
+        for n in (int(size) for size in args.sizes.split(",")):
+            build_start = time.perf_counter()
+            graph = generators.GENERATORS[name](n, args.seed)
+            print(f"{name} n={len(graph.csr)} roads={len(graph.csr.targets) // 2} hospitals={len(graph.hospitals)} "
+                  f"(built in {time.perf_counter() - build_start:.1f} s)")
+            run(graph, pairs(graph, args.queries, args.seed), ks)
+    if args.check:
+        check(args.check, min(args.queries, 5), ks, args.seed)
+
+
+if __name__ == "__main__":
+    main()
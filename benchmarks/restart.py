@@ -0,0 +1,71 @@
+"""Benchmark restart of durable appointment queues: checkpoint load plus journal replay.
+
+    python benchmarks/restart.py --appointments 1000000 --tail 10000
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from navigator_core import BucketAppointmentManager
+from navigator_store import Storage
+
+HOSPITALS = ["Agha Khan", "Jinnah Hospital", "Saifee Hospital", "Civil Hospital",
+             "Ziauddin Hospital", "Indus Hospital"]
+
+
+def fill(storage, count, seed):
+    rng = random.Random(seed)
+    queues = storage.open_queues(HOSPITALS, BucketAppointmentManager)
+    for i in range(count):
+        queues[rng.choice(HOSPITALS)].book(f"patient {i}", rng.choice((1, 2, 3, 3)), "checkup")
+    return queues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--appointments", type=int, default=1_000_000)
+    parser.add_argument("--tail", type=int, default=10_000, help="journal records after the checkpoint")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="scn-restart-")
+    try:
+        storage = Storage(directory)
+        start = time.perf_counter()
+        queues = fill(storage, args.appointments, args.seed)
+        booked = time.perf_counter()
+        storage.checkpoint()
+        checkpointed = time.perf_counter()
+        rng = random.Random(args.seed + 1)
+        for i in range(args.tail):
+            queue = queues[rng.choice(HOSPITALS)]
+            if i % 2:
+                queue.pop_next()
+            else:
+                queue.book(f"walk-in {i}", 1, "triage")
+        storage.close()
+        expected = {h: len(q) for h, q in queues.items()}
+
+        restart = time.perf_counter()
+        storage = Storage(directory)
+        queues = storage.open_queues(HOSPITALS, BucketAppointmentManager)
+        restored = time.perf_counter()
+        storage.close()
+        assert {h: len(q) for h, q in queues.items()} == expected, "restart lost appointments"
+
+        n = args.appointments
+        print(f"{n} queued appointments, {args.tail} journal records after the checkpoint")
+        print(f"  journaled booking   {(booked - start) / n * 1e9:7.0f} ns/op")
+        print(f"  checkpoint          {(checkpointed - booked) * 1e3:7.0f} ms")
+        print(f"  restart             {(restored - restart) * 1e3:7.0f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
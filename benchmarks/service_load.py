@@ -0,0 +1,134 @@
+"""Load generator for navigator_service.py: requests per second and latency percentiles.
+
+    python benchmarks/service_load.py --connections 32 --seconds 10
+    python benchmarks/service_load.py --url http://127.0.0.1:8080   (an already running service)
+
+Without --url a service is started on a free port over a temporary copy of the demo data.
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+HOSPITALS = ["Agha Khan", "Jinnah Hospital", "Saifee Hospital", "Civil Hospital",
+             "Ziauddin Hospital", "Indus Hospital"]
+# endpoint -> share of requests
+MIX = (("nearest", 0.4), ("book", 0.3), ("next", 0.2), ("queue", 0.1))
+
+
+def make_request(kind, rng):
+    hospital = rng.choice(HOSPITALS)
+    if kind == "nearest":
+        x, y = rng.uniform(50, 950), rng.uniform(50, 550)
+        return "GET", f"/nearest?x={x:.0f}&y={y:.0f}&k=3", b""
+    if kind == "queue":
+        return "GET", f"/queue?hospital={hospital.replace(' ', '%20')}&limit=20", b""
+    if kind == "book":
+        body = {"hospital": hospital, "name": f"load {rng.randrange(10**6)}", "priority": rng.choice((1, 2, 3))}
+    else:
+        body = {"hospital": hospital}
+    return "POST", f"/{kind}", json.dumps(body).encode("utf-8")
+
+
+async def client(host, port, deadline, rng, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    kinds = [k for k, _ in MIX]
+    weights = [w for _, w in MIX]
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = make_request(kind, rng)
+            start = time.perf_counter()
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            if status != 200:
+                errors[kind] = errors.get(kind, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run(host, port, connections, seconds, seed):
+    # Half a second of warm-up traffic so the worker pool is running before timing starts
+    warm = {}
+    await client(host, port, time.perf_counter() + 0.5, random.Random(seed), warm, {})
+    latencies, errors = {}, {}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(client(host, port, deadline, random.Random(seed + i), latencies, errors)
+                           for i in range(connections)))
+    return time.perf_counter() - start, latencies, errors
+
+
+def start_service(data_dir, workers):
+    cmd = [sys.executable, str(ROOT / "navigator_service.py"), "--port", "0", "--data", data_dir]
+    if workers:
+        cmd += ["--workers", str(workers)]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    if not line.startswith("listening on "):
+        proc.kill()
+        raise RuntimeError(f"service did not start: {line!r}")
+    return proc, line.split()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running service instead of starting one")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=None, help="routing workers for the started service")
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    proc = data_dir = None
+    url = args.url
+    if url is None:
+        data_dir = tempfile.mkdtemp(prefix="scn-service-")
+        proc, url = start_service(data_dir, args.workers)
+    try:
+        parts = urlsplit(url)
+        elapsed, latencies, errors = asyncio.run(
+            run(parts.hostname, parts.port, args.connections, args.seconds, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+            shutil.rmtree(data_dir)
+
+    everything = [t for values in latencies.values() for t in values]
+    print(f"{args.connections} connections for {elapsed:.1f} s against {url}")
+    print(f"  total     {len(everything) / elapsed:8.0f} req/s   p50 {percentile(everything, 0.5) * 1e3:7.2f} ms"
+          f"   p99 {percentile(everything, 0.99) * 1e3:7.2f} ms")
+    for kind, _ in MIX:
+        values = latencies.get(kind, [])
+        if values:
+            print(f"  {kind:<8} {len(values) / elapsed:8.0f} req/s   p50 {percentile(values, 0.5) * 1e3:7.2f} ms"
+                  f"   p99 {percentile(values, 0.99) * 1e3:7.2f} ms   errors {errors.get(kind, 0)}")
+
+
+if __name__ == "__main__":
+    main()
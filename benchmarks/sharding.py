@@ -0,0 +1,104 @@
+"""Benchmark booking throughput of sharded appointment queues against worker count.
+
+    python benchmarks/sharding.py --workers 1,2,4,8 --hospitals 64 --bookings 400000
+
+Bookings are spread over the hospitals at random and sent as columns (ShardedQueues.book_many()),
+then every queue is drained with pop_many(). The in-process row is the plain dict of managers
+the app uses. "front end" is the caller's own CPU time per booking, which bounds the rate the
+caller can feed workers at; the rate rises with the worker count until the workers together
+outrun it or the machine runs out of cores (one core per worker plus one for the caller).
+Afterwards one worker is added to the largest pool to show how many hospitals (and queued
+patients) a rebalance moves.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from navigator_core import AppointmentManager, BucketAppointmentManager
+from navigator_shards import ShardedQueues
+import generators
+
+FACTORIES = {"bucket": BucketAppointmentManager, "heap": AppointmentManager}
+
+
+def workload(hospitals, count, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(hospitals), name, p, details) for name, p, details in generators.bookings(count, seed)]
+
+
+def in_process(hospitals, work, factory):
+    managers = {h: factory() for h in hospitals}
+    start = time.perf_counter()
+    for h, name, p, details in work:
+        managers[h].book(name, p, details)
+    booked = time.perf_counter() - start
+    start = time.perf_counter()
+    for h, name, p, details in work:
+        managers[h].pop_next()
+    return booked, time.perf_counter() - start
+
+
+def sharded(queues, work, unbatched):
+    start = time.perf_counter()
+    for h, name, p, details in work[:unbatched]:
+        queues[h].book(name, p, details)
+    single = time.perf_counter() - start
+    hospitals, names, priorities, details = (list(column) for column in zip(*work[unbatched:]))
+    start, cpu = time.perf_counter(), time.process_time()
+    queues.book_many(hospitals, names, priorities, details)
+    booked, front = time.perf_counter() - start, time.process_time() - cpu
+    start = time.perf_counter()
+    queues.pop_many([h for h, _, _, _ in work])
+    return single, booked, front, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--hospitals", type=int, default=64)
+    parser.add_argument("--bookings", type=int, default=400_000)
+    parser.add_argument("--unbatched", type=int, default=2000, help="bookings sent one call at a time first")
+    parser.add_argument("--factory", choices=FACTORIES, default="bucket")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    factory = FACTORIES[args.factory]
+    hospitals = [f"Hospital {i}" for i in range(args.hospitals)]
+    work = workload(hospitals, args.bookings, args.seed)
+    batched = args.bookings - args.unbatched
+    print(f"{args.bookings} bookings over {args.hospitals} hospitals ({factory.__name__})")
+
+    booked, popped = in_process(hospitals, work, factory)
+    print(f"  {'in-process':<12} {args.bookings / booked:12,.0f} bookings/s {args.bookings / popped:12,.0f} pops/s")
+    base, counts = None, [int(w) for w in args.workers.split(",")]
+    for workers in counts:
+        with ShardedQueues(hospitals, workers, factory) as queues:
+            single, booked, front, popped = sharded(queues, work, args.unbatched)
+            rate = batched / booked
+            base = base or rate
+            print(f"  {workers:>2} workers   {rate:12,.0f} bookings/s {args.bookings / popped:12,.0f} pops/s   "
+                  f"x{rate / base:.2f}   front end {front / batched * 1e6:.2f} us/booking   "
+                  f"unbatched {args.unbatched / single:9,.0f} bookings/s")
+    cores = os.cpu_count() or 1
+    if cores <= max(counts):
+        print(f"  note: {cores} core(s) here; a pool only speeds up while the caller and every worker have a core")
+
+    with ShardedQueues(hospitals, max(counts), factory) as queues:
+        queues.book_many(*(list(column) for column in zip(*work)))
+        with queues.batch():
+            sizes = {h: queues[h].depths() for h in hospitals}
+        start = time.perf_counter()
+        moved = queues.add_worker()
+        elapsed = time.perf_counter() - start
+        patients = sum(sum(sizes[h].result().values()) for h in moved)
+        print(f"add a worker to {max(counts)}: moved {len(moved)}/{len(hospitals)} hospitals, "
+              f"{patients}/{args.bookings} queued patients in {elapsed * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
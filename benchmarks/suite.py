@@ -0,0 +1,243 @@
+"""Routing and scheduling benchmark suite with JSON output for regression tracking.
+
+    python benchmarks/suite.py --sizes 1000,100000 --output results.json
+    python benchmarks/suite.py --generators grid --sizes 10000000 --queries 20   (big, slow)
+
+Every case reports throughput, latency percentiles (p50/p90/p99/max, microseconds) and
+peak memory: the process's peak RSS, plus the traced Python allocation peak of the case
+with --trace-memory (which slows everything down). Queries are timed one by one;
+appointment operations are timed in batches of BATCH and reported per operation.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from navigator_core import AppointmentManager, BucketAppointmentManager, queue_view_changes
+import generators
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+BATCH = 256
+VISIBLE_ROWS = 40  # queue rows the appointments page shows at once
+
+
+def peak_rss_kib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def summarize(name, samples, per_sample=1, **info):
+    """samples are seconds per timed call, each covering per_sample operations."""
+    per_op = sorted(t / per_sample for t in samples)
+    total = sum(samples)
+    ops = len(samples) * per_sample
+
+    def pct(q):
+        return round(per_op[min(len(per_op) - 1, int(q * len(per_op)))] * 1e6, 3)
+
+    return dict(name=name, ops=ops, seconds=round(total, 6), throughput=round(ops / total, 1) if total else None,
+                p50_us=pct(0.5), p90_us=pct(0.9), p99_us=pct(0.99), max_us=round(per_op[-1] * 1e6, 3),
+                peak_rss_kib=peak_rss_kib(), **info)
+
+
+class Case:
+    """Runs one benchmark function, optionally under tracemalloc, and records its summary."""
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def run(self, fn, *args, **info):
+        if self.trace_memory:
+            tracemalloc.start()
+        result = fn(*args)
+        if self.trace_memory:
+            result["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        result.update(info)
+        self.results.append(result)
+        print(f"  {result['name']:<34} {result['throughput']:>12,.0f} ops/s   p50 {result['p50_us']:>10.1f} us"
+              f"   p99 {result['p99_us']:>10.1f} us", file=sys.stderr)
+        return result
+
+
+# Routing cases
+def bench_dijkstra(graph, sources):
+    samples = []
+    for s in sources:
+        graph.path_cache.clear()  # measure the search, not the tree cache
+        start = time.perf_counter()
+        graph.dijkstra(s)
+        samples.append(time.perf_counter() - start)
+    return summarize("dijkstra", samples)
+
+
+def bench_nearest(graph, points, k):
+    """find_nearest as the app does it: snap a map position onto the network, then search."""
+    samples = []
+    for i, (x, y) in enumerate(points):
+        start = time.perf_counter()
+        overlay = graph.snap(f"caller {i}", x, y)
+        graph.nearest_hospitals(overlay.origin, k, overlay)
+        samples.append(time.perf_counter() - start)
+    return summarize(f"nearest_hospitals k={k}", samples)
+
+
+def bench_reconstruct(graph, source, targets):
+    graph.path_cache.clear()
+    _, prev = graph.dijkstra(source)
+    samples, hops = [], 0
+    for t in targets:
+        start = time.perf_counter()
+        hops += len(graph.reconstruct_route(prev, t))
+        samples.append(time.perf_counter() - start)
+    return summarize("reconstruct_route", samples, mean_route_nodes=round(hops / len(targets), 1))
+
+
+def routing_cases(case, generator, n, queries, seed):
+    build_start = time.perf_counter()
+    graph = generator(n, seed)
+    info = dict(generator=generator.__name__, nodes=len(graph.csr), roads=len(graph.csr.targets) // 2,
+                hospitals=len(graph.hospitals), build_seconds=round(time.perf_counter() - build_start, 3))
+    print(f"{info['generator']} n={info['nodes']} roads={info['roads']} "
+          f"(built in {info['build_seconds']} s)", file=sys.stderr)
+    rng = random.Random(seed)
+    names = graph.csr.names
+    sources = [names[rng.randrange(len(names))] for _ in range(queries)]
+    xs, ys = graph.csr.xs, graph.csr.ys
+    x0, x1, y0, y1 = min(xs), max(xs), min(ys), max(ys)
+    points = [(rng.uniform(x0, x1), rng.uniform(y0, y1)) for _ in range(queries)]
+
+    case.run(bench_dijkstra, graph, sources, **info)
+    graph.precompute_hospital_partition()
+    case.run(bench_nearest, graph, points, 1, **info)
+    case.run(bench_nearest, graph, points, 5, **info)
+    case.run(bench_reconstruct, graph, sources[0], sources, **info)
+
+
+# Scheduling cases
+def bench_book(manager_cls, patients):
+    mgr, samples = manager_cls(), []
+    for i in range(0, len(patients) - BATCH + 1, BATCH):
+        chunk = patients[i:i + BATCH]
+        start = time.perf_counter()
+        for name, p, details in chunk:
+            mgr.book(name, p, details)
+        samples.append(time.perf_counter() - start)
+    return summarize(f"{manager_cls.__name__}.book", samples, BATCH)
+
+
+def bench_pop(manager_cls, patients):
+    mgr, samples = manager_cls(), []
+    for name, p, details in patients:
+        mgr.book(name, p, details)
+    while len(mgr) >= BATCH:
+        start = time.perf_counter()
+        for _ in range(BATCH):
+            mgr.pop_next()
+        samples.append(time.perf_counter() - start)
+    return summarize(f"{manager_cls.__name__}.pop_next", samples, BATCH)
+
+
+def bench_clinic_day(manager_cls, ops):
+    mgr, samples = manager_cls(), []
+    for i in range(0, len(ops) - BATCH + 1, BATCH):
+        chunk = ops[i:i + BATCH]
+        start = time.perf_counter()
+        for kind, booking in chunk:
+            if kind == "book":
+                mgr.book(*booking)
+            else:
+                mgr.pop_next()
+        samples.append(time.perf_counter() - start)
+    return summarize(f"{manager_cls.__name__} mixed", samples, BATCH, queued_at_end=len(mgr))
+
+
+def bench_peek_all(manager_cls, patients, repeats):
+    mgr = manager_cls()
+    for name, p, details in patients:
+        mgr.book(name, p, details)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        mgr.peek_all()
+        samples.append(time.perf_counter() - start)
+    return summarize(f"{manager_cls.__name__}.peek_all", samples, queued=len(mgr))
+
+
+def bench_display_refresh(manager_cls, patients, refreshes, seed):
+    """The appointments page after each booking: fetch the visible page, format the rows and
+    diff them against what is shown (the Tk text edits themselves are not included)."""
+    rng = random.Random(seed)
+    mgr = manager_cls()
+    for name, p, details in patients:
+        mgr.book(name, p, details)
+    shown, samples = [], []
+    for i in range(refreshes):
+        mgr.book(f"walk-in {i}", rng.choice((1, 2, 3)), "")
+        start = time.perf_counter()
+        rows = mgr.peek(VISIBLE_ROWS, 0)
+        first, _, end = queue_view_changes(shown, rows)
+        [f"P: {p} | {name} — {details}" for p, _, name, details in rows[first:end]]
+        shown = rows
+        samples.append(time.perf_counter() - start)
+    return summarize(f"{manager_cls.__name__} refresh", samples, queued=len(mgr))
+
+
+def scheduling_cases(case, count, queries, seed):
+    print(f"appointments: {count} bookings", file=sys.stderr)
+    patients = generators.bookings(count, seed)
+    ops = generators.clinic_day(count, seed)
+    for cls in (AppointmentManager, BucketAppointmentManager):
+        case.run(bench_book, cls, patients, bookings=count)
+        case.run(bench_pop, cls, patients, bookings=count)
+        case.run(bench_clinic_day, cls, ops, bookings=count)
+        case.run(bench_peek_all, cls, patients, max(3, queries // 50), bookings=count)
+        case.run(bench_display_refresh, cls, patients, queries, seed, bookings=count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generators", default=",".join(generators.GENERATORS),
+                        help=f"comma-separated subset of {', '.join(generators.GENERATORS)}")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated node counts")
+    parser.add_argument("--queries", type=int, default=200, help="timed queries per routing case")
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc peak per case (slow)")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    case = Case(args.trace_memory)
+    for name in args.generators.split(","):
+        for n in (int(size) for size in args.sizes.split(",")):
+            routing_cases(case, generators.GENERATORS[name], n, args.queries, args.seed)
+    if args.bookings:
+        scheduling_cases(case, args.bookings, args.queries, args.seed)
+
+    report = {
+        "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "seed": args.seed, "queries": args.queries,
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S%z")},
+        "results": case.results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,80 +1,29 @@
 import tkinter as tk
 from tkinter import font as tkfont
 from tkinter import messagebox
-import heapq
-
-# Graph Class (Dijkstra)
-class Graph:
-    def __init__(self):
-        self.adj = {}  # adjacency list
-        self.node_positions = {}  # positions for visualization
-
-    def add_hospital(self, name, x=None, y=None):
-        if name not in self.adj:
-            self.adj[name] = {}
-        if x is not None and y is not None:
-            self.node_positions[name] = (x, y)
-        elif name not in self.node_positions:
-            idx = len(self.node_positions) + 1
-            # Simple position generation if not provided
-            self.node_positions[name] = (60 + (idx * 120) % 900, 60 + (idx * 80) % 500)
-
-    def add_road(self, a, b, distance):
-        self.add_hospital(a)
-        self.add_hospital(b)
-        self.adj[a][b] = distance
-        self.adj[b][a] = distance
-
-    def dijkstra(self, start):
-        if start not in self.adj:
-            return {}, {}
-        dist = {n: float('inf') for n in self.adj}
-        prev = {n: None for n in self.adj}
-        dist[start] = 0
-        heap = [(0, start)]
-        while heap:
-            d, node = heapq.heappop(heap)
-            if d > dist.get(node, float('inf')):
-                continue
-            for nb, w in self.adj.get(node, {}).items():
-                nd = d + w
-                if nd < dist.get(nb, float('inf')):
-                    dist[nb] = nd
-                    prev[nb] = node
-                    heapq.heappush(heap, (nd, nb))
-        return dist, prev
-
-    def reconstruct_route(self, prev, target):
-        if target not in prev:
-            return []
-        route = []
-        node = target
-        while node is not None:
-            route.insert(0, node)
-            node = prev[node]
-        return route
-
-# Appointment Manager
-class AppointmentManager:
-    def __init__(self):
-        self.heap = []
-        self.counter = 0
-
-    def book(self, name, priority, details=""):
-        self.counter += 1
-        heapq.heappush(self.heap, (priority, self.counter, name, details))
-
-    def pop_next(self):
-        if not self.heap:
-            return None
-        p, _, name, details = heapq.heappop(self.heap)
-        return (p, name, details)
-
-    def peek_all(self):
-        return sorted(self.heap)
+import bisect
+import multiprocessing
+import os
+import queue
+import zlib
+
+from navigator_core import (INF, Graph, AppointmentManager, AssignmentEngine, BucketAppointmentManager,
+                            NameIndex, RoutingExecutor, book_demo_appointments, populate_demo_graph,
+                            queue_view_changes)
+from navigator_metrics import METRICS, SlowQuerySampler
+from navigator_store import Storage
+
+# Graph snapshot, appointment checkpoint and journal live here between runs
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+# SCN_METRICS=text or =prometheus turns metrics on and prints them on exit; with
+# SCN_SLOW_MS set, slower queries are reported (one in 100 with a cProfile breakdown)
+METRICS_FORMAT = os.environ.get("SCN_METRICS")
+SLOW_MS = os.environ.get("SCN_SLOW_MS")
 
 # GUI Application
 class SmartMedicalApp(tk.Tk):
+    POLL_MS = 25  # how often finished background queries are picked up
+
     def __init__(self):
         super().__init__()
         self.title("Smart Medical System")
@@ -95,10 +44,32 @@ class SmartMedicalApp(tk.Tk):
 
         self.configure(bg=self.bg_color)
 
-        # Data
-        self.graph = Graph()
+        # Data: reopen the saved network and queues, seeding them with demo data on first run
+        self.storage = Storage(DATA_DIR)
+        self.graph = self.storage.load_graph()
+        if self.graph is None:
+            self.graph = Graph()
+            self._populate_data()
+            self.storage.save_graph(self.graph)
         self.app_mgr = AppointmentManager()
-        self._populate_data()
+        # Priorities are always 1/2/3 here, so each hospital gets the O(1) bucket queue
+        self.app_mgrs = self.storage.open_queues(sorted(self.graph.hospitals), BucketAppointmentManager)
+        if self.storage.fresh:
+            self._populate_appointments()
+        self.graph.freeze()
+        self.graph.precompute_hospital_partition()
+        self.assigner = AssignmentEngine(self.graph, self.app_mgrs)
+        if METRICS_FORMAT:
+            METRICS.enable(SlowQuerySampler(float(SLOW_MS) / 1e3) if SLOW_MS else None)
+            METRICS.gauge("queue_depth", lambda: {h: len(m) for h, m in self.app_mgrs.items()}, "hospital",
+                          "Patients waiting per hospital")
+
+        # Routing queries run in worker processes; results come back to Tk via after()
+        # (spawned, not forked, so workers never inherit the Tk/X connection)
+        self.router = RoutingExecutor(self.graph, mp_context=multiprocessing.get_context("spawn"))
+        self.results = queue.Queue()
+        self.after(self.POLL_MS, self._drain_results)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # Added for shortest path storage
         self.last_shortest_hospital = None 
@@ -124,19 +95,46 @@ class SmartMedicalApp(tk.Tk):
         # Start the application on the StartPage
         self.show_page("StartPage")
 
+    def post(self, future, callback):
+        """Call callback(result) on the Tk thread once future completes."""
+        future.add_done_callback(lambda f: self.results.put((callback, f)))
+
+    def _drain_results(self):
+        while True:
+            try:
+                callback, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                result = future.result()
+            except Exception as e:
+                messagebox.showerror("Routing Error", str(e))
+                continue
+            callback(result)
+        self.storage.sync_if_due()
+        self.after(self.POLL_MS, self._drain_results)
+
+    def _on_close(self):
+        self.router.shutdown()
+        self.storage.checkpoint()  # next start loads this instead of replaying the journal
+        self.storage.close()
+        if METRICS_FORMAT:
+            print(METRICS.export(METRICS_FORMAT), end="")
+        self.destroy()
+
     def show_page(self, name):
         page = self.pages[name]
         page.lift()
         if name == "EmergencyRoutingPage":
             page.draw_map()
         elif name == "AppointmentsPage":
-            page.update_queue_display()
+            # Setting hospital_var below refreshes the queue through its trace
             # If coming from routing, pre-fill the hospital field
             if self.last_shortest_hospital:
                 page.hospital_var.set(self.last_shortest_hospital)
             else:
                 # If no routing was done, default to the first hospital
-                page.hospital_var.set(list(self.graph.adj.keys())[0])
+                page.hospital_var.set(next(iter(self.app_mgrs)))
                 def show_page(self, page_name):
                     page = self.pages[page_name]
                     page.tkraise()
@@ -147,67 +145,11 @@ class SmartMedicalApp(tk.Tk):
 
 
     def _populate_data(self):
-        # Hospitals
-        self.graph.add_hospital("Agha Khan", 360, 140)
-        self.graph.add_hospital("Jinnah Hospital", 560, 220)
-        self.graph.add_hospital("Saifee Hospital", 180, 80)
-        self.graph.add_hospital("Civil Hospital", 600, 420)
-        self.graph.add_hospital("Ziauddin Hospital", 820, 140)
-        self.graph.add_hospital("Indus Hospital", 80, 320)
-        
+        populate_demo_graph(self.graph)
+
+    def _populate_appointments(self):
+        book_demo_appointments(self.app_mgrs)
 
-        # Roads (km)
-        self.graph.add_road("Agha Khan", "Jinnah Hospital", 15)
-        self.graph.add_road("Agha Khan", "Saifee Hospital", 25)
-        self.graph.add_road("Jinnah Hospital", "Civil Hospital", 10)
-        self.graph.add_road("Saifee Hospital", "Civil Hospital", 35)
-        self.graph.add_road("Agha Khan", "Ziauddin Hospital", 20)
-        self.graph.add_road("Jinnah Hospital", "Ziauddin Hospital", 30)
-        self.graph.add_road("Indus Hospital", "Agha Khan", 18)
-        
-        self.app_mgrs = {h: AppointmentManager() for h in self.graph.adj.keys()}
-
-        # Appointments
-        # Agha Khan Hospital
-        self.app_mgrs["Agha Khan"].book("Sarah Feroz", 3, "Annual Checkup")
-        self.app_mgrs["Agha Khan"].book("Hamza Ali", 2, "High Fever")
-        self.app_mgrs["Agha Khan"].book("Mahira Usman", 1, "Severe Bleeding")
-        self.app_mgrs["Agha Khan"].book("Rimsha Khalid", 2, "Severe Headache")
-        self.app_mgrs["Agha Khan"].book("Usman Tariq", 1, "Accidental Injury")
-        self.app_mgrs["Agha Khan"].book("Laiba Ahmed", 3, "Diabetes Follow-up")
-        self.app_mgrs["Agha Khan"].book("Irfan Siddiqui", 2, "Abdominal Pain")
-
-        # Jinnah Hospital
-        self.app_mgrs["Jinnah Hospital"].book("Nawera Khan", 1, "Severe Chest Pain")
-        self.app_mgrs["Jinnah Hospital"].book("Daniyal Ahmed", 2, "Migraine")
-        self.app_mgrs["Jinnah Hospital"].book("Areeba Shah", 3, "Routine Follow-up")
-        self.app_mgrs["Jinnah Hospital"].book("Sarmad Ali", 3, "Throat Infection")
-        self.app_mgrs["Jinnah Hospital"].book("Maryam Zehra", 2, "High Blood Pressure")
-
-
-        # Saifee Hospital
-        self.app_mgrs["Saifee Hospital"].book("Alyana Abid", 2, "Flu Symptoms")
-        self.app_mgrs["Saifee Hospital"].book("Hassan Raza", 1, "Asthma Attack")
-        self.app_mgrs["Saifee Hospital"].book("Fatima Noor", 3, "Blood Test")
-
-        # Civil Hospital
-        self.app_mgrs["Civil Hospital"].book("Zohaib Khan", 1, "Road Accident Injury")
-        self.app_mgrs["Civil Hospital"].book("Sadia Mirza", 2, "Infection")
-        self.app_mgrs["Civil Hospital"].book("Areesha Tariq", 3, "General Checkup")
-
-        # Ziauddin Hospital
-        self.app_mgrs["Ziauddin Hospital"].book("Talha Siddiqui", 2, "Back Pain")
-        self.app_mgrs["Ziauddin Hospital"].book("Noor Fatima", 1, "Shortness of Breath")
-        self.app_mgrs["Ziauddin Hospital"].book("Rehan Ali", 3, "X-ray Appointment")
-        self.app_mgrs["Ziauddin Hospital"].book("Hiba Shafqat", 1, "Critical Injury")
-        self.app_mgrs["Ziauddin Hospital"].book("Adeel Qureshi", 3, "Physiotherapy Session")
-        self.app_mgrs["Ziauddin Hospital"].book("Sadia Hussain", 2, "Allergy Reaction")
-
-
-        # Indus Hospital
-        self.app_mgrs["Indus Hospital"].book("Kiran Baloch", 1, "High Risk Pregnancy")
-        self.app_mgrs["Indus Hospital"].book("Shahzaib Akhtar", 2, "Ear Infection")
-        self.app_mgrs["Indus Hospital"].book("Mariam Javed", 3, "Skin Rash")
 # Start Page (REINSTATED)
 class StartPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -236,6 +178,83 @@ class StartPage(tk.Frame):
                     bg=controller.button_bg, fg="white", font=controller.title_font, 
                     relief="flat", padx=20, pady=10).pack(pady=(20, 0))
 
+# Entry with as-you-type suggestions
+class AutocompleteEntry(tk.Entry):
+    """Entry with a suggestion list under it that follows the typing. suggest(text) returns
+    names; on_select(text) runs when a suggestion is picked (Enter, Tab or a click) or Enter
+    is pressed with the list closed."""
+    MAX_SUGGESTIONS = 8
+
+    def __init__(self, master, suggest, on_select=None, **kw):
+        super().__init__(master, **kw)
+        self.suggest = suggest
+        self.on_select = on_select
+        self.listbox = None
+        self.bind("<KeyRelease>", self._on_key)
+        self.bind("<Down>", lambda e: self._move(1))
+        self.bind("<Up>", lambda e: self._move(-1))
+        self.bind("<Return>", lambda e: self._accept(True))
+        self.bind("<Tab>", lambda e: self._accept(False))
+        self.bind("<Escape>", lambda e: self.hide())
+        # Closing later lets a click on the list land before the list disappears
+        self.bind("<FocusOut>", lambda e: self.after(150, self.hide))
+
+    def set(self, text):
+        self.delete(0, tk.END)
+        self.insert(0, text)
+
+    def _on_key(self, event):
+        if event.keysym not in ("Up", "Down", "Return", "Tab", "Escape"):
+            self.refresh()
+
+    def refresh(self):
+        text = self.get()
+        names = self.suggest(text)[:self.MAX_SUGGESTIONS] if text.strip() else []
+        if not names or names == [text]:
+            self.hide()
+            return
+        if self.listbox is None:
+            self.listbox = tk.Listbox(self.winfo_toplevel(), activestyle="none", exportselection=False,
+                                      font=self["font"], bg=self["bg"], relief="flat", highlightthickness=1)
+            self.listbox.bind("<ButtonRelease-1>", lambda e: self._accept(True))
+        self.listbox.delete(0, tk.END)
+        for name in names:
+            self.listbox.insert(tk.END, name)
+        self.listbox.config(height=len(names))
+        self.listbox.place(in_=self, x=0, rely=1.0, relwidth=1.0)
+        self.listbox.lift()
+
+    def hide(self):
+        if self.listbox is not None:
+            self.listbox.place_forget()
+
+    def _shown(self):
+        return self.listbox is not None and self.listbox.winfo_ismapped()
+
+    def _move(self, step):
+        if not self._shown():
+            self.refresh()
+            return "break"
+        current = self.listbox.curselection()
+        i = (current[0] + step if current else (0 if step > 0 else -1)) % self.listbox.size()
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(i)
+        self.listbox.see(i)
+        return "break"
+
+    def _accept(self, submit):
+        if self._shown():
+            current = self.listbox.curselection()
+            choice = self.listbox.get(current[0] if current else 0)
+            self.hide()
+            self.set(choice)
+            self.icursor(tk.END)
+        elif not submit:
+            return None  # Tab with nothing to pick moves the focus as usual
+        if self.on_select is not None:
+            self.on_select(self.get())
+        return "break"
+
 # Appointments Page
 class AppointmentsPage(tk.Frame):
     LEFT_WIDTH = 360
@@ -255,13 +274,16 @@ class AppointmentsPage(tk.Frame):
 
         tk.Label(left_card, text="Target Hospital", bg=controller.card_bg, fg=controller.text_primary,
                  font=controller.label_font).pack(anchor="w", pady=(8,2))
-        hospital_options = list(controller.graph.adj.keys())
+        hospital_options = list(controller.app_mgrs)
+        self.hospital_index = NameIndex(hospital_options)
         self.hospital_var = tk.StringVar(value=hospital_options[0])
-        hospital_menu = tk.OptionMenu(left_card, self.hospital_var, *hospital_options,
-                                      command=lambda e: self.update_queue_display())
-        hospital_menu.config(width=26, bg=controller.button_bg, fg="white", font=controller.button_font)
-        hospital_menu["menu"].config(bg=controller.panel_bg, fg=controller.text_primary)
-        hospital_menu.pack(anchor="w", pady=2)
+        # Type to search the hospitals; the trace on hospital_var below refreshes the queue
+        # once one is picked
+        self.hospital_entry = AutocompleteEntry(left_card, self.hospital_index.complete, self.select_hospital,
+                                                width=28, font=controller.text_font, bg=controller.entry_bg,
+                                                relief="flat")
+        self.hospital_entry.set(hospital_options[0])
+        self.hospital_entry.pack(anchor="w", pady=2)
 
         tk.Label(left_card, text="Patient Name", bg=controller.card_bg, fg=controller.text_primary,
                  font=controller.label_font).pack(anchor="w", pady=(8,2))
@@ -290,6 +312,13 @@ class AppointmentsPage(tk.Frame):
         tk.Button(btn_frame, text="Call Next Patient", command=self.call_next_patient,
                   bg=controller.warn, fg="white", font=controller.button_font, relief="flat", padx=8).pack(side="left")
 
+        edit_frame = tk.Frame(left_card, bg=controller.card_bg)
+        edit_frame.pack(anchor="w", pady=(0,12), fill="x")
+        tk.Button(edit_frame, text="Change Priority", command=self.change_priority,
+                  bg=controller.button_bg, fg="white", font=controller.button_font, relief="flat", padx=8).pack(side="left", padx=(0,8))
+        tk.Button(edit_frame, text="Cancel Appointment", command=self.cancel_appointment,
+                  bg=controller.subtle, fg="white", font=controller.button_font, relief="flat", padx=8).pack(side="left")
+
         bottom_nav = tk.Frame(left_card, bg=controller.card_bg)
         bottom_nav.pack(side="bottom", fill="x", pady=(12,0))
         tk.Button(bottom_nav, text="Go to Emergency Routing",
@@ -308,26 +337,57 @@ class AppointmentsPage(tk.Frame):
         tk.Label(right_card, text="Current Appointment Queue", bg=controller.panel_bg,
                  font=controller.header_font, fg=controller.highlight).grid(row=0, column=0, sticky="w")
 
-        self.queue_text = tk.Text(right_card, height=18, wrap="word", state="disabled", font=controller.text_font,
+        # Virtualized list: the Text only holds the rows that fit, the scrollbar spans the whole queue
+        self.queue_text = tk.Text(right_card, height=18, wrap="none", state="disabled", font=controller.text_font,
                                   bg=controller.bg_color, fg=controller.text_primary, bd=0, padx=8, pady=8)
         self.queue_text.grid(row=1, column=0, sticky="nswe", pady=(8,0))
 
-        scrollbar = tk.Scrollbar(right_card, command=self.queue_text.yview)
-        scrollbar.grid(row=1, column=1, sticky="ns", pady=(8,0))
-        self.queue_text.config(yscrollcommand=scrollbar.set)
+        self.queue_scroll = tk.Scrollbar(right_card, command=self.scroll_queue)
+        self.queue_scroll.grid(row=1, column=1, sticky="ns", pady=(8,0))
+        self.queue_text.bind("<MouseWheel>", lambda e: self.scroll_queue("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.queue_text.bind("<Button-4>", lambda e: self.scroll_queue("scroll", -1, "units"))
+        self.queue_text.bind("<Button-5>", lambda e: self.scroll_queue("scroll", 1, "units"))
+        self.queue_text.bind("<Configure>", lambda e: self.update_queue_display())
+        self.queue_offset = 0
+        self.shown_rows = None  # rows currently in the Text widget (None forces a full redraw)
+        self.shown_hospital = None
 
         self.queue_text.tag_configure("p1", foreground=controller.warn)
         self.queue_text.tag_configure("p2", foreground=controller.subtle)
         self.queue_text.tag_configure("p3", foreground=controller.success)
         self.queue_text.tag_configure("meta", foreground=controller.subtle)
 
-        self.hospital_var.trace("w", lambda *args: self.update_queue_display())
+        self.hospital_var.trace("w", lambda *args: self._hospital_changed())
+
+    def _hospital_changed(self):
+        if self.hospital_entry.get() != self.hospital_var.get():
+            self.hospital_entry.set(self.hospital_var.get())
+        self.update_queue_display()
+
+    def select_hospital(self, text):
+        """Switch to the hospital best matching the typed text; False if none matches."""
+        hospital = self.hospital_index.resolve(text)
+        if hospital is None:
+            messagebox.showerror("Input Error", f"No hospital matches {text.strip()!r}.")
+            self.hospital_entry.set(self.hospital_var.get())
+            return False
+        self.hospital_var.set(hospital)
+        return True
+
+    def _current_hospital(self):
+        # The hospital in the field, even if it was typed without picking a suggestion
+        text = self.hospital_entry.get()
+        if text != self.hospital_var.get() and not self.select_hospital(text):
+            return None
+        return self.hospital_var.get()
 
 
     def book_appointment(self):
         name = self.name_entry.get().strip()
         details = self.details_entry.get().strip()
-        hospital = self.hospital_var.get()
+        hospital = self._current_hospital()
+        if hospital is None:
+            return
         try:
             priority = int(self.priority_var.get())
         except ValueError:
@@ -342,13 +402,25 @@ class AppointmentsPage(tk.Frame):
 
         full_details = f"{details}".strip()
         self.controller.app_mgrs[hospital].book(name, priority, full_details)
-        messagebox.showinfo("Success", f"Appointment booked for {name} (Priority {priority}) at {hospital}.")
+        message = f"Appointment booked for {name} (Priority {priority}) at {hospital}."
         self.name_entry.delete(0, tk.END)
         self.details_entry.delete(0, tk.END)
         self.update_queue_display()
+        # If the patient was routed first, show the way to the facility they picked once a worker has it
+        routing = self.controller.pages["EmergencyRoutingPage"]
+        if not routing.route_to(hospital, lambda trip: self._show_booked(message, trip)):
+            self._show_booked(message, None)
+
+    def _show_booked(self, message, trip):
+        if trip:
+            distance, route = trip
+            message += f"\nRoute: {' → '.join(route)} ({distance} km)"
+        messagebox.showinfo("Success", message)
 
     def call_next_patient(self):
-        hospital = self.hospital_var.get()
+        hospital = self._current_hospital()
+        if hospital is None:
+            return
         patient = self.controller.app_mgrs[hospital].pop_next()
         if not patient:
             messagebox.showinfo("Info", "No pending appointments.")
@@ -357,30 +429,145 @@ class AppointmentsPage(tk.Frame):
         messagebox.showinfo("Now Serving", f"Patient: {name}\nPriority: {p}\nDetails: {details}")
         self.update_queue_display()
 
+    def _find_patient(self):
+        # Oldest queued appointment for the name in the form, or None after telling the user
+        name = self.name_entry.get().strip()
+        hospital = self._current_hospital()
+        if hospital is None:
+            return None
+        if not name:
+            messagebox.showerror("Input Error", "Please enter a patient name.")
+            return None
+        found = self.controller.app_mgrs[hospital].find(name)
+        if not found:
+            messagebox.showinfo("Info", f"No queued appointment for {name} at {hospital}.")
+            return None
+        return name, hospital, found[0][0]
+
+    def change_priority(self):
+        match = self._find_patient()
+        if not match:
+            return
+        name, hospital, appt_id = match
+        priority = int(self.priority_var.get())
+        self.controller.app_mgrs[hospital].update_priority(appt_id, priority)
+        messagebox.showinfo("Success", f"{name} is now Priority {priority} at {hospital}.")
+        self.update_queue_display()
+
+    def cancel_appointment(self):
+        match = self._find_patient()
+        if not match:
+            return
+        name, hospital, appt_id = match
+        self.controller.app_mgrs[hospital].cancel(appt_id)
+        messagebox.showinfo("Success", f"Appointment for {name} at {hospital} cancelled.")
+        self.update_queue_display()
+
+    def visible_rows(self):
+        line = self.controller.text_font.metrics("linespace")
+        return max(1, (self.queue_text.winfo_height() - 16) // line)
+
+    def scroll_queue(self, action, amount, unit=None):
+        total = len(self.controller.app_mgrs[self.hospital_var.get()])
+        if action == "moveto":
+            self.queue_offset = int(float(amount) * total)
+        else:
+            step = self.visible_rows() if unit == "pages" else 1
+            self.queue_offset += int(amount) * step
+        self.update_queue_display()
+        return "break"
+
+    def _format_row(self, item):
+        p, _, name, details = item
+        line = f"P: {p} | {name}"
+        if details:
+            line += f" — {details}"
+        line += "\n"
+        tag = "p3"
+        if p == 1:
+            tag = "p1"
+        elif p == 2:
+            tag = "p2"
+        return line, tag
+
     def update_queue_display(self):
         hospital = self.hospital_var.get()
-        items = self.controller.app_mgrs[hospital].peek_all()
+        mgr = self.controller.app_mgrs[hospital]
+        total, count = len(mgr), self.visible_rows()
+        self.queue_offset = max(0, min(self.queue_offset, total - count))
+        items = mgr.peek(count, self.queue_offset)
+
+        old = self.shown_rows if hospital == self.shown_hospital else None
         self.queue_text.config(state="normal")
-        self.queue_text.delete("1.0", tk.END)
-        if not items:
-            self.queue_text.insert(tk.END, "No pending appointments.\n", "meta")
+        if not items or not old:
+            # Full redraw only for a new hospital or when switching to/from the empty message
+            self.queue_text.delete("1.0", tk.END)
+            start, new_end = 0, len(items)
+            if not items:
+                self.queue_text.insert(tk.END, "No pending appointments.\n", "meta")
         else:
-            for p, _, name, details in items:
-                line = f"P: {p} | {name}"
-                if details:
-                    line += f" — {details}"
-                line += "\n"
-                tag = "p3"
-                if p == 1:
-                    tag = "p1"
-                elif p == 2:
-                    tag = "p2"
-                self.queue_text.insert(tk.END, line, tag)
+            # Only the rows that changed are deleted and re-inserted
+            start, old_end, new_end = queue_view_changes(old, items)
+            self.queue_text.delete(f"{start + 1}.0", f"{old_end + 1}.0")
+        for i in range(start, new_end):
+            line, tag = self._format_row(items[i])
+            self.queue_text.insert(f"{i + 1}.0", line, tag)
         self.queue_text.config(state="disabled")
+        self.shown_rows = items or None
+        self.shown_hospital = hospital
+
+        if total:
+            self.queue_scroll.set(self.queue_offset / total, (self.queue_offset + len(items)) / total)
+        else:
+            self.queue_scroll.set(0, 1)
+
+# Map culling index
+class MapIndex:
+    """Grid buckets of map keys for viewport culling. Each key has an importance (for roads,
+    their on-map length); a cell keeps its keys most important first, so dropping minor items
+    when zoomed out is a prefix cut per visible cell."""
+    CELL = 200  # world pixels
+
+    def __init__(self):
+        self.cells = {}  # (col, row) -> ([-importance ascending], [key])
+
+    def add(self, key, importance, x1, y1, x2=None, y2=None):
+        x2 = x1 if x2 is None else x2
+        y2 = y1 if y2 is None else y2
+        for col in range(int(min(x1, x2) // self.CELL), int(max(x1, x2) // self.CELL) + 1):
+            for row in range(int(min(y1, y2) // self.CELL), int(max(y1, y2) // self.CELL) + 1):
+                ranks, keys = self.cells.setdefault((col, row), ([], []))
+                i = bisect.bisect_right(ranks, -importance)
+                ranks.insert(i, -importance)
+                keys.insert(i, key)
+
+    def visible(self, x1, y1, x2, y2, min_importance=0):
+        """Keys in cells overlapping the world rectangle with importance >= min_importance."""
+        found = set()
+        for col in range(int(x1 // self.CELL), int(x2 // self.CELL) + 1):
+            for row in range(int(y1 // self.CELL), int(y2 // self.CELL) + 1):
+                cell = self.cells.get((col, row))
+                if cell is not None:
+                    ranks, keys = cell
+                    found.update(keys[:bisect.bisect_right(ranks, -min_importance)])
+        return found
 
 # Emergency Routing Page 
 class EmergencyRoutingPage(tk.Frame):
     LEFT_WIDTH = 360
+    SNAP_NODES = 3  # road nodes a typed location is linked to
+    RESIZE_DEBOUNCE_MS = 80  # a burst of <Configure> events becomes one move after this pause
+    ZOOM_STEP = 1.2
+    MIN_ZOOM, MAX_ZOOM = 0.05, 8.0
+    MIN_ROAD_PX = 12  # roads drawn shorter than this are hidden (with their junctions)
+    LABEL_ZOOM = 0.75  # below this zoom, km labels and plain junction names are hidden
+    COVERAGE_KM = 10  # default reach for the coverage overlay
+    # Coverage shading: one colour per hospital's catchment, and roads no hospital reaches
+    COVERAGE_COLORS = ("#32E0C4", "#FFB86B", "#6EC1FF", "#FF7AC6", "#B6FF6E", "#FFE66E", "#9D8CFF", "#FF8E6E")
+    UNCOVERED_COLOR = "#5C2A44"
+    ALTERNATIVE_ROUTES = 3  # fallback routes to the chosen hospital, drawn dashed beside the best one
+    ALT_ROUTE_COLOR = "#FFB86B"
+    ALT_ROUTE_DASH = (6, 4)
     location_map = {
         "streat 21": (200, 520),
         "main street": (600, 500),
@@ -408,8 +595,10 @@ class EmergencyRoutingPage(tk.Frame):
 
         tk.Label(left_card, text="Your Current Location (type to set):", bg=controller.card_bg,
                     fg=controller.text_primary, font=controller.label_font).pack(anchor="w", pady=(6,2))
-        self.location_entry = tk.Entry(left_card, width=30, font=controller.text_font,
-                                            bg=controller.entry_bg, relief="flat")
+        # Suggests known places and road nodes as you type; Enter searches
+        self.location_entry = AutocompleteEntry(left_card, lambda text: self.location_index().complete(text),
+                                                lambda text: self.find_nearest(), width=30,
+                                                font=controller.text_font, bg=controller.entry_bg, relief="flat")
         self.location_entry.pack(anchor="w", pady=2)
 
         tk.Label(left_card, text="(Simulated distances in km)", bg=controller.card_bg,
@@ -418,6 +607,22 @@ class EmergencyRoutingPage(tk.Frame):
         tk.Button(left_card, text="🚨 Find Nearest Hospital", command=self.find_nearest,
                     bg=controller.warn, fg="white", font=controller.button_font, relief="flat", padx=8, pady=6).pack(anchor="w", pady=(2,10))
 
+        # Coverage overlay: shade each hospital's catchment within a road distance
+        coverage_row = tk.Frame(left_card, bg=controller.card_bg)
+        coverage_row.pack(anchor="w", pady=(0,2))
+        tk.Label(coverage_row, text="Coverage radius (km):", bg=controller.card_bg,
+                    fg=controller.text_primary, font=controller.label_font).pack(side="left")
+        self.radius_entry = tk.Entry(coverage_row, width=6, font=controller.text_font,
+                                     bg=controller.entry_bg, relief="flat")
+        self.radius_entry.insert(0, str(self.COVERAGE_KM))
+        self.radius_entry.pack(side="left", padx=6)
+        self.coverage_button = tk.Button(coverage_row, text="Show Coverage", command=self.toggle_coverage,
+                                         bg=controller.button_bg, fg="white", font=controller.button_font, relief="flat")
+        self.coverage_button.pack(side="left")
+        self.coverage_label = tk.Label(left_card, text="", bg=controller.card_bg, fg=controller.subtle,
+                                       font=("Arial", 9), justify="left")
+        self.coverage_label.pack(anchor="w", pady=(0,6))
+
         tk.Label(left_card, text="Search Result:", bg=controller.card_bg,
                     fg=controller.text_primary, font=controller.label_font).pack(anchor="w", pady=(6,2))
         self.result_text = tk.Text(left_card, height=10, width=36, state="disabled",
@@ -450,187 +655,479 @@ class EmergencyRoutingPage(tk.Frame):
         self.v_scroll.grid(row=1, column=1, sticky="ns")
         self.h_scroll = tk.Scrollbar(right_card, orient="horizontal", command=self.canvas.xview)
         self.h_scroll.grid(row=2, column=0, sticky="we")
-        self.canvas.configure(yscrollcommand=self.v_scroll.set, xscrollcommand=self.h_scroll.set)
+        # Scrolling changes which part of the map is visible, so it also refreshes culling
+        self.canvas.configure(yscrollcommand=lambda *a: (self.v_scroll.set(*a), self._schedule_view()),
+                              xscrollcommand=lambda *a: (self.h_scroll.set(*a), self._schedule_view()))
 
         self.canvas_frame = tk.Frame(self.canvas, bg=self.canvas['bg'])
         self.canvas_window = self.canvas.create_window((0,0), window=self.canvas_frame, anchor="nw")
-        # Bind the canvas resize event to redraw and center the map
+        # Bind the canvas resize event to recenter the map; wheel zooms, dragging pans
         self.canvas.bind('<Configure>', self.recenter_map)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self.zoom_map)
+        self.canvas.bind("<ButtonPress-1>", lambda e: self.canvas.scan_mark(e.x, e.y))
+        self.canvas.bind("<B1-Motion>", lambda e: self.canvas.scan_dragto(e.x, e.y, gain=1))
         
         self.current_route = None
         self.user_pos = None
+        self.query_id = 0
+        self.alternatives = []  # [(distance, route)] fallbacks to the hospital of current_route
+
+        # Canvas items persist between redraws; canvas = world * view_scale + view_offset
+        self.map_version = None  # graph version the items were built for
+        self.edge_items = {}  # (a, b) with a < b -> (line id, km label id)
+        self.node_items = {}  # node -> (oval id, name label id)
+        self.node_world = {}  # node -> world position
+        self.edge_index = MapIndex()
+        self.node_index = MapIndex()
+        self.hospital_nodes = set()
+        self.overlay_keys = ([], None)  # (edge keys, origin) drawn for the current search
+        self.route_edges = set()
+        self.route_nodes = set()
+        self.route_km = {}
+        self.alt_edges = set()  # roads on a fallback route but not on the best one
+        self.world_bounds = (0, 0, 0, 0)  # min x, min y, max x, max y of the base network
+        self.shown = set()  # item ids currently visible
+        self.placed_scale = {}  # node -> view_scale its oval/label were placed at since the last zoom
+        self.view_scale = 1.0
+        self.view_offset = (0.0, 0.0)
+        self.canvas_size = None
+        self.pending_resize = None
+        self.pending_view = None
+        self.coverage_radius = None  # km while the coverage overlay is on
+        self.coverage = None  # CoverageMap the map is currently shaded with
+        self.coverage_colors = {}  # hospital -> catchment colour
+        self.places = None  # (graph's name index, NameIndex over location_map and the graph's nodes)
 
         self.draw_map()
 
     def recenter_map(self, event=None):
-        """Called on resize to ensure the map drawing remains centered."""
-        self.draw_map()
+        """Resize handler: a burst of <Configure> events becomes a single move once it stops."""
+        if self.pending_resize is not None:
+            self.after_cancel(self.pending_resize)
+        self.pending_resize = self.after(self.RESIZE_DEBOUNCE_MS, self._apply_resize)
+
+    def _apply_resize(self):
+        self.pending_resize = None
+        size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        if self.canvas_size is not None and self.map_version is not None:
+            # Keep the map where it was relative to the canvas centre
+            self._move_view((size[0] - self.canvas_size[0]) / 2, (size[1] - self.canvas_size[1]) / 2)
+        self.canvas_size = size
+        self._update_view()
+
+    def zoom_map(self, event):
+        """Mouse wheel zoom around the pointer."""
+        zoom_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        scale = self.view_scale * (self.ZOOM_STEP if zoom_in else 1 / self.ZOOM_STEP)
+        scale = min(max(scale, self.MIN_ZOOM), self.MAX_ZOOM)
+        factor = scale / self.view_scale
+        if factor == 1:
+            return
+        cx, cy = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        # Roads and km labels are rescaled by Tk in one call; node markers keep their
+        # size and are re-placed as they become visible
+        self.canvas.scale("scaled", cx, cy, factor, factor)
+        ox, oy = self.view_offset
+        self.view_offset = (cx + factor * (ox - cx), cy + factor * (oy - cy))
+        self.view_scale = scale
+        # Every placed marker is now off: zooming back to a scale around another pointer
+        # gives a different offset, so markers are placed again rather than trusted by scale
+        self.placed_scale = {}
+        self._schedule_view()
 
     def reset_map_state(self):
         """Resets the map state to show only the original hospital network."""
         self.current_route = None
         self.user_pos = None
+        self.alternatives = []
         
         self.result_text.config(state="normal")
         self.result_text.delete("1.0", tk.END)
         self.result_text.config(state="disabled")
         
         self.draw_map() 
+
+    def toggle_coverage(self):
+        if self.coverage_radius is None:
+            try:
+                radius = float(self.radius_entry.get())
+            except ValueError:
+                radius = 0
+            if radius <= 0:
+                messagebox.showerror("Input Error", "Coverage radius must be a positive number of km.")
+                return
+            self.coverage_radius = radius
+            self.coverage_button.config(text="Hide Coverage")
+        else:
+            self.coverage_radius = None
+            self.coverage_button.config(text="Show Coverage")
+            self.coverage_label.config(text="")
+        self.draw_map()
     
+    def route_to(self, hospital, callback):
+        """Route from the last searched location to a chosen hospital in a worker process, then
+        call callback((distance, route) or None) on the Tk thread. False if nothing was searched."""
+        if self.current_route is None or self.user_pos is None:
+            return False
+        future = self.controller.router.submit("route", self.user_pos, hospital, "astar", self.current_route[0])
+        self.controller.post(future, lambda trip: callback(trip if trip[1] else None))
+        return True
+
+    def location_index(self):
+        graph = self.controller.graph
+        nodes = graph.name_index()  # replaced only when nodes are added, not on road changes
+        if self.places is None or self.places[0] is not nodes:
+            self.places = (nodes, NameIndex(list(self.location_map) + list(graph.adj)))
+        return self.places[1]
+
     def find_nearest(self):
         start_label = self.location_entry.get().strip()
         if not start_label:
             messagebox.showerror("Input Error", "Enter your location name.")
             return
 
-        # 1. Create a DEEP COPY of the original graph to isolate the user node
-        temp_graph = Graph()
-        # Copy nodes and positions
-        temp_graph.adj = {k: v.copy() for k, v in self.controller.graph.adj.items()}
-        temp_graph.node_positions = self.controller.graph.node_positions.copy()
-        
-        # Set user location (can be pre-defined or simulated if not found)
-        # Normalize the input to lowercase for lookup against the location_map keys
-        normalized_label = start_label.lower() 
-        if normalized_label in self.location_map:
-            user_x, user_y = self.location_map[normalized_label]
-            start_label = normalized_label # Use normalized key for consistency
+        graph = self.controller.graph
+
+        # 1. Set user location: a known place or road node (typos resolve to the closest
+        # name), otherwise a simulated position
+        known = self.location_index().resolve(start_label)
+        normalized_label = start_label.lower()
+        if known is not None and known != start_label:
+            start_label = known
+            self.location_entry.set(known)
+        if start_label in graph.adj:
+            user_x = user_y = None  # searched from directly, nothing to snap
+        elif start_label in self.location_map:
+            user_x, user_y = self.location_map[start_label]
         else:
-            # Simple simulation for a new location near the existing network
-            user_x = 50 + (hash(start_label) % 900)
-            user_y = 50 + (hash(start_label) % 500)
-            
-        temp_graph.add_hospital(start_label, user_x, user_y)
-        self.user_pos = start_label 
+            # Deterministic simulated position for an unknown location (same label, same spot)
+            seed = zlib.crc32(normalized_label.encode("utf-8"))
+            user_x = 50 + (seed % 900)
+            user_y = 50 + ((seed // 900) % 500)
+
+        # 2. Snap the user location to its nearest road nodes with a query-scoped overlay (the graph is not copied)
+        with METRICS.timer("find_nearest_seconds", phase="snap"):
+            overlay = None if user_x is None else graph.snap(start_label, user_x, user_y, self.SNAP_NODES)
+
+        # 3. Find the k nearest hospitals in a worker process so the window stays responsive
+        # (with metrics on, the search phase shows up as routing_call_seconds{query="nearest_hospitals"})
+        self.query_id += 1
+        query_id = self.query_id
+        k = self.controller.assigner.candidates
+        future = self.controller.router.submit("nearest_hospitals", start_label, k, overlay)
+        self.controller.post(future, lambda nearest: self.show_nearest(query_id, start_label, overlay, nearest))
+
+    def show_nearest(self, query_id, start_label, overlay, nearest):
+        if query_id != self.query_id:
+            return  # a newer search was started while this one ran
+        if not nearest:
+            messagebox.showinfo("Info", "No hospital is reachable from that location.")
+            return
+        nearest_hosp, distance, route = nearest[0]
 
-        # 2. Connect user location to existing hospitals
-        hospital_nodes = list(self.controller.graph.adj.keys()) 
-        temp_graph.adj[start_label] = {}
-        
-        for hosp in hospital_nodes:
-             if hosp != start_label:
-                 x1, y1 = temp_graph.node_positions[start_label]
-                 x2, y2 = temp_graph.node_positions[hosp]
-                 # Distance calculation
-                 distance = int(((x1-x2)**2 + (y1-y2)**2)**0.5 / 20)
-                 distance = max(distance, 5) 
-                 
-                 temp_graph.adj[start_label][hosp] = distance
-                 # Ensure the back-connection is correctly added to the temp_graph copy
-                 if hosp in temp_graph.adj:
-                     temp_graph.adj[hosp][start_label] = distance 
-
-        # 3. Find the shortest path using Dijkstra
-        dist, prev = temp_graph.dijkstra(start_label)
-        
-        # 4. Find the nearest hospital 
-        nearest_hosp = min(
-            self.controller.graph.adj.keys(), # Only consider original hospitals
-            key=lambda h: dist.get(h, float('inf')) 
-        )
+        # 4. Store the final route and the nearest hospital name
+        self.user_pos = start_label 
+        hops = self.controller.graph.hop_distances(route, overlay)
+        self.current_route = (overlay, route, hops) 
+        self.alternatives = []
+        # Pre-fill booking with the best hospital once queue waits are counted, not just the closest
+        best = self.controller.assigner.score(nearest, priority=1)[0]
+        self.controller.last_shortest_hospital = best.hospital
+
+        # 5. Update results text
+        self.result_text.config(state="normal")
+        self.result_text.delete("1.0", tk.END)
+        self.result_text.insert(tk.END, f"Nearest Hospital: {nearest_hosp}\nDistance: {distance} km\nRoute: {' → '.join(route)}")
+        for node, km in zip(route[1:], hops[1:]):
+            self.result_text.insert(tk.END, f"\n  {km:>4} km  {node}")
+        self.result_text.insert(tk.END, f"\nRecommended: {best.hospital}\n  ~{best.minutes:.0f} min "
+                                        f"({best.travel:.0f} travel + {best.wait:.0f} queue wait)")
+        self.result_text.config(state="disabled")
         
-        route = temp_graph.reconstruct_route(prev, nearest_hosp)
+        # 6. Redraw the map
+        with METRICS.timer("find_nearest_seconds", phase="draw"):
+            self.draw_map()
 
-        # 5. Store the final route and the nearest hospital name
-        self.current_route = (temp_graph, route) 
-        self.controller.last_shortest_hospital = nearest_hosp # Store nearest hospital
+        # 7. Fallback routes to the same hospital, added to the map when they arrive
+        future = self.controller.router.submit("k_shortest_routes", start_label, nearest_hosp,
+                                               self.ALTERNATIVE_ROUTES + 1, overlay)
+        self.controller.post(future, lambda routes: self.show_alternatives(query_id, route, routes))
 
-        # 6. Update results text
+    def show_alternatives(self, query_id, best, routes):
+        if query_id != self.query_id:
+            return
+        self.alternatives = [(d, r) for d, r in routes if r != best][:self.ALTERNATIVE_ROUTES]
+        if not self.alternatives:
+            return
+        on_best = set(best)
         self.result_text.config(state="normal")
-        self.result_text.delete("1.0", tk.END)
-        self.result_text.insert(tk.END, f"Nearest Hospital: {nearest_hosp}\nDistance: {dist[nearest_hosp]} km\nRoute: {' → '.join(route)}")
+        self.result_text.insert(tk.END, "\nIf a road is blocked:")
+        for number, (distance, route) in enumerate(self.alternatives, 2):
+            via = next((node for node in route if node not in on_best), route[-1])
+            self.result_text.insert(tk.END, f"\n  Route {number}: {distance} km via {via}")
         self.result_text.config(state="disabled")
-        
-        # 7. Redraw the map
         self.draw_map()
         
     def draw_map(self):
-        self.canvas.delete("all")
-        
-        g = self.controller.graph 
-        route_nodes = []
-        
-        if self.current_route is not None:
-            g = self.current_route[0]
-            route_nodes = self.current_route[1]
-            
-        # 1. Draw Edges (Roads)
+        """Bring the canvas up to date: build items if the graph changed, restyle the route,
+        then show only what is in view at the current zoom."""
+        g = self.controller.graph
+        with METRICS.timer("draw_map_seconds", stage="build"):
+            if self.map_version != g.version:
+                self._build_map()
+        with METRICS.timer("draw_map_seconds", stage="coverage"):
+            self._shade_coverage()
+        with METRICS.timer("draw_map_seconds", stage="route"):
+            self._draw_route()
+        with METRICS.timer("draw_map_seconds", stage="view"):
+            self._update_view()
+
+    def _to_canvas(self, x, y):
+        ox, oy = self.view_offset
+        return x * self.view_scale + ox, y * self.view_scale + oy
+
+    def _move_view(self, dx, dy):
+        self.canvas.move("map", dx, dy)
+        ox, oy = self.view_offset
+        self.view_offset = (ox + dx, oy + dy)
+
+    def _add_edge(self, a, b, dist, extra_tags=()):
+        (x1, y1), (x2, y2) = self.node_world[a], self.node_world[b]
+        c1, c2 = self._to_canvas(x1, y1), self._to_canvas(x2, y2)
+        tags = ("map", "scaled") + extra_tags
+        line = self.canvas.create_line(*c1, *c2, fill=self.controller.subtle, width=2, state="hidden", tags=tags)
+        label = self.canvas.create_text((c1[0] + c2[0]) / 2, (c1[1] + c2[1]) / 2, text=f"{dist} km",
+                                        fill=self.controller.subtle, font=("Arial", 8, "normal"),
+                                        anchor="s", state="hidden", tags=tags)
+        key = (a, b) if a < b else (b, a)
+        self.edge_items[key] = (line, label)
+        return key, ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
+
+    def _add_node(self, node, extra_tags=()):
+        tags = ("map",) + extra_tags
+        oval = self.canvas.create_oval(0, 0, 0, 0, width=2, state="hidden", tags=tags)
+        label = self.canvas.create_text(0, 0, text=node, fill=self.controller.text_primary,
+                                        font=("Arial", 10, "normal"), anchor="s", state="hidden", tags=tags)
+        self.node_items[node] = (oval, label)
+        self._style_node(node)
+
+    def _build_map(self):
+        g = self.controller.graph
+        self.canvas.delete("map")
+        self.edge_items, self.node_items, self.shown, self.placed_scale = {}, {}, set(), {}
+        self.edge_index, self.node_index = MapIndex(), MapIndex()
+        self.overlay_keys, self.route_edges, self.route_nodes = ([], None), set(), set()
+        self.alt_edges = set()
+        self.node_world = dict(g.node_positions)
+        self.hospital_nodes = set(g.hospitals)
+        self.coverage = None
+
+        # Centre the network's bounding box in the canvas at the current zoom
+        if self.node_world:
+            xs = [x for x, _ in self.node_world.values()]
+            ys = [y for _, y in self.node_world.values()]
+            self.world_bounds = (min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.world_bounds = (0, 0, 0, 0)
+        x1, y1, x2, y2 = self.world_bounds
+        self.canvas_size = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        self.view_offset = (self.canvas_size[0] / 2 - (x1 + x2) / 2 * self.view_scale,
+                            self.canvas_size[1] / 2 - (y1 + y2) / 2 * self.view_scale)
+
+        # 1. Roads, once each; a junction matters as much as its longest road
+        importance = dict.fromkeys(self.node_world, 0)
         for a, nbrs in g.adj.items():
-            x1, y1 = g.node_positions.get(a, (0,0))
             for b, dist in nbrs.items():
-                if a < b:  # prevent double draw
-                    x2, y2 = g.node_positions.get(b, (0,0))
-                    
-                    is_in_route = False
-                    if len(route_nodes) >= 2:
-                        for i in range(len(route_nodes) - 1):
-                            n1, n2 = route_nodes[i], route_nodes[i+1]
-                            if (a == n1 and b == n2) or (a == n2 and b == n1):
-                                is_in_route = True
-                                break
-                                
-                    line_color = self.controller.warn if is_in_route else self.controller.subtle
-                    
-                    self.canvas.create_line(x1, y1, x2, y2, fill=line_color, width=2, tags="map_element")
-                    self.canvas.create_text(
-                        (x1+x2)/2, (y1+y2)/2 - 6, 
-                        text=f"{dist} km", 
-                        fill=self.controller.subtle, 
-                        font=("Arial", 8, "bold" if is_in_route else "normal"),
-                        tags="map_element"
-                    )
-
-        # 2. Draw Nodes (Hospitals/Location)
-        for node, (x, y) in g.node_positions.items():
-            is_hospital = node in self.controller.graph.adj # Check if it's one of the permanent hospitals
-            fill_color = self.controller.button_bg if is_hospital else self.controller.highlight
-            outline_color = "white"
-            size = 10
-            
-            if node == self.user_pos and self.current_route is not None:
-                fill_color = self.controller.highlight 
-                outline_color = self.controller.warn
-                size = 12
-            elif node in route_nodes and is_hospital:
-                fill_color = self.controller.warn
-                outline_color = self.controller.highlight
-                size = 10
-
-            self.canvas.create_oval(x-size, y-size, x+size, y+size, 
-                                         fill=fill_color, outline=outline_color, width=2, tags="map_element")
-            
-            self.canvas.create_text(x, y - size - 4, 
-                                         text=node, 
-                                         fill=self.controller.text_primary, 
-                                         font=("Arial", 10, "bold" if node in route_nodes else "normal"), 
-                                         anchor="s",
-                                         tags="map_element")
-            
-        # 3. Center the map drawing within the canvas
-        self.canvas.update_idletasks()
-        
-        # Get bounding box for all drawn elements
-        bbox = self.canvas.bbox("map_element") 
-        if bbox:
-            x_min, y_min, x_max, y_max = bbox
-            
-            # Dimensions of the drawn content
-            map_width = x_max - x_min
-            map_height = y_max - y_min
-            
-            # Dimensions of the canvas viewable area
-            canvas_width = self.canvas.winfo_width()
-            canvas_height = self.canvas.winfo_height()
-            
-            # Calculate shift needed to center the content
-            x_shift = (canvas_width / 2) - (x_min + map_width / 2)
-            y_shift = (canvas_height / 2) - (y_min + map_height / 2)
-
-            # Move all drawn elements
-            self.canvas.move("map_element", x_shift, y_shift)
-
-        # Set scrollregion to cover the entire drawing area after movement, or just canvas size
-        self.canvas.config(scrollregion=(0, 0, max(self.canvas.winfo_width(), x_max - x_min + 50), max(self.canvas.winfo_height(), y_max - y_min + 50)))
+                if a < b and dist != INF:  # draw each road once; closed roads are not drawn
+                    key, length = self._add_edge(a, b, dist)
+                    (x1, y1), (x2, y2) = self.node_world[a], self.node_world[b]
+                    self.edge_index.add(key, length, x1, y1, x2, y2)
+                    importance[a] = max(importance[a], length)
+                    importance[b] = max(importance[b], length)
+
+        # 2. Hospitals and junctions (hospitals never drop out when zoomed out)
+        for node, (x, y) in self.node_world.items():
+            self._add_node(node)
+            self.node_index.add(node, float("inf") if node in self.hospital_nodes else importance[node], x, y)
+        self.map_version = g.version
+
+    def _shade_coverage(self):
+        """Restyle the whole map when the coverage overlay is switched or its result changed
+        (the graph caches one result per radius until it is edited)."""
+        g = self.controller.graph
+        coverage = g.coverage(self.coverage_radius) if self.coverage_radius is not None else None
+        if coverage is self.coverage:
+            return
+        self.coverage = coverage
+        if coverage is not None:
+            self.coverage_colors = {h: self.COVERAGE_COLORS[i % len(self.COVERAGE_COLORS)]
+                                    for i, h in enumerate(sorted(self.hospital_nodes))}
+            outside = coverage.uncovered()
+            text = f"Within {self.coverage_radius:g} km of a hospital: {coverage.share():.0%} of locations"
+            if outside:
+                text += f"\nOut of reach: {', '.join(sorted(outside)[:5])}" + (" …" if len(outside) > 5 else "")
+            self.coverage_label.config(text=text)
+        for key in self.edge_items:
+            self._style_edge(key)
+        for node in self.node_items:
+            self._style_node(node)
+
+    def _coverage_color(self, node):
+        found = self.coverage.nearest(node)
+        return self.coverage_colors.get(found[0]) if found else self.UNCOVERED_COLOR
+
+    def _edge_color(self, key):
+        if self.coverage is None or key[0] not in self.coverage.csr.ids or key[1] not in self.coverage.csr.ids:
+            return self.controller.subtle
+        # A road takes the catchment of its closer end; the out-of-reach colour only if neither end is reached
+        a, b = (self.coverage.nearest(node) for node in key)
+        if a is None and b is None:
+            return self.UNCOVERED_COLOR
+        return self.coverage_colors.get(min((x for x in (a, b) if x), key=lambda x: x[1])[0])
+
+    def _style_edge(self, key):
+        line, label = self.edge_items[key]
+        in_route = key in self.route_edges
+        if in_route:
+            fill, dash = self.controller.warn, ""
+        elif key in self.alt_edges:
+            fill, dash = self.ALT_ROUTE_COLOR, self.ALT_ROUTE_DASH
+        else:
+            fill, dash = self._edge_color(key), ""
+        self.canvas.itemconfigure(line, fill=fill, dash=dash)
+        self.canvas.itemconfigure(label, font=("Arial", 8, "bold" if in_route else "normal"))
+
+    def _node_size(self, node):
+        return 12 if node == self.user_pos and self.current_route is not None else 10
+
+    def _style_node(self, node):
+        oval, label = self.node_items[node]
+        is_hospital = node in self.hospital_nodes  # Check if it's one of the permanent hospitals
+        fill_color = self.controller.button_bg if is_hospital else self.controller.highlight
+        outline_color = "white"
+        if self.coverage is not None and node in self.coverage.csr.ids:
+            # Junctions are filled with their catchment colour; hospitals get it as a ring
+            if is_hospital:
+                outline_color = self._coverage_color(node)
+            else:
+                fill_color = self._coverage_color(node)
+        if node == self.user_pos and self.current_route is not None:
+            fill_color = self.controller.highlight
+            outline_color = self.controller.warn
+        elif node in self.route_nodes and is_hospital:
+            fill_color = self.controller.warn
+            outline_color = self.controller.highlight
+        km = self.route_km.get(node) if self.current_route is not None else None
+        self.canvas.itemconfigure(oval, fill=fill_color, outline=outline_color)
+        self.canvas.itemconfigure(label, text=f"{node} ({km} km)" if km else node,
+                                  font=("Arial", 10, "bold" if node in self.route_nodes else "normal"))
+        self.placed_scale.pop(node, None)  # size may have changed
+
+    def _place_node(self, node):
+        oval, label = self.node_items[node]
+        x, y = self._to_canvas(*self.node_world[node])
+        size = self._node_size(node)
+        self.canvas.coords(oval, x - size, y - size, x + size, y + size)
+        self.canvas.coords(label, x, y - size - 4)
+        self.placed_scale[node] = self.view_scale
+
+    def _draw_route(self):
+        """Swap the previous search's overlay and route styling for the current one (fallback
+        routes are drawn dashed). Only the routes' own roads and nodes are restyled (a set
+        lookup each), never the whole map."""
+        overlay, route, hops = self.current_route if self.current_route is not None else (None, [], [])
+        old_edges, old_nodes, old_alt = self.route_edges, self.route_nodes, self.alt_edges
+
+        # The searched location and its snap links exist only for this search
+        keys, origin = self.overlay_keys
+        for key in keys:
+            self.shown.difference_update(self.edge_items.pop(key))
+        if origin is not None:
+            self.shown.difference_update(self.node_items.pop(origin))
+            del self.node_world[origin]
+            self.placed_scale.pop(origin, None)
+            old_nodes = old_nodes - {origin}
+        self.canvas.delete("overlay")
+        keys, origin = [], None
+        if overlay is not None and overlay.origin not in self.node_items:
+            origin = overlay.origin
+            self.node_world[origin] = overlay.position
+            for a, b, dist in overlay.edges():
+                keys.append(self._add_edge(a, b, dist, ("overlay",))[0])
+        self.overlay_keys = (keys, origin)
+
+        self.route_km = dict(zip(route, hops))
+        self.route_edges = {(a, b) if a < b else (b, a) for a, b in zip(route, route[1:])}
+        self.route_nodes = set(route)
+        self.alt_edges = {(a, b) if a < b else (b, a) for _, alt in self.alternatives
+                          for a, b in zip(alt, alt[1:])} - self.route_edges
+        if self.user_pos is not None:
+            self.route_nodes.add(self.user_pos)
+        if origin is not None:
+            self._add_node(origin, ("overlay",))
+        for key in (old_edges ^ self.route_edges) | (old_alt ^ self.alt_edges) | set(keys):
+            if key in self.edge_items:
+                self._style_edge(key)
+        for node in old_nodes | self.route_nodes:
+            if node in self.node_items:
+                self._style_node(node)
+
+    def _schedule_view(self):
+        if self.pending_view is None and self.map_version is not None:
+            self.pending_view = self.after_idle(self._update_view)
+
+    def _update_view(self):
+        """Show the items in the viewport (plus the route) at this zoom's level of detail and
+        hide the rest, touching only items whose visibility changes."""
+        if self.pending_view is not None:
+            self.after_cancel(self.pending_view)
+            self.pending_view = None
+        if self.map_version is None:
+            return
+        scale, (ox, oy) = self.view_scale, self.view_offset
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        right = self.canvas.canvasx(self.canvas.winfo_width())
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        world = ((left - ox) / scale, (top - oy) / scale, (right - ox) / scale, (bottom - oy) / scale)
+        min_length = self.MIN_ROAD_PX / scale
+        labels = scale >= self.LABEL_ZOOM
+
+        edges = (self.edge_index.visible(*world, min_length) | self.route_edges | self.alt_edges
+                 | set(self.overlay_keys[0]))
+        nodes = self.node_index.visible(*world, min_length) | self.route_nodes
+        wanted = set()
+        for key in edges:
+            line, label = self.edge_items.get(key, (None, None))
+            if line is not None:
+                wanted.add(line)
+                if labels or key in self.route_edges:
+                    wanted.add(label)
+        for node in nodes:
+            items = self.node_items.get(node)
+            if items is not None:
+                if self.placed_scale.get(node) != scale:
+                    self._place_node(node)
+                wanted.add(items[0])
+                if labels or node in self.hospital_nodes or node in self.route_nodes:
+                    wanted.add(items[1])
+        for item in self.shown - wanted:
+            self.canvas.itemconfigure(item, state="hidden")
+        for item in wanted - self.shown:
+            self.canvas.itemconfigure(item, state="normal")
+        self.shown = wanted
+
+        # Scroll region from the network bounds under the current transform (no bbox scan)
+        x1, y1, x2, y2 = self.world_bounds
+        origin = self.overlay_keys[1]
+        if origin is not None:
+            x, y = self.node_world[origin]
+            x1, y1, x2, y2 = min(x1, x), min(y1, y), max(x2, x), max(y2, y)
+        margin = 50
+        self.canvas.config(scrollregion=(
+            min(0, x1 * scale + ox - margin), min(0, y1 * scale + oy - margin),
+            max(self.canvas.winfo_width(), x2 * scale + ox + margin),
+            max(self.canvas.winfo_height(), y2 * scale + oy + margin)))
 
 
 # Run App
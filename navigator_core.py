@@ -0,0 +1,2096 @@
+"""Compute core of Smart Care Navigator: road graph, routing indexes and appointment queues.
+
+Nothing here imports tkinter, so routing and scheduling can run in worker processes or
+on a headless server; the Tk app in dsa_project(2).py is one client of this module.
+"""
+import bisect
+import heapq
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from collections.abc import Mapping, Set
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import groupby, islice
+from operator import attrgetter
+from weakref import WeakKeyDictionary
+
+from navigator_metrics import COUNT_BUCKETS, METRICS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; distance_matrix falls back to array rows
+    np = None
+
+INF = float('inf')
+MATRIX_PARALLEL_MIN = 64  # searches before distance_matrix bothers with a process pool
+
+# Compact Road Graph (CSR arrays)
+class CSRGraph:
+    """Frozen road network: interned integer node IDs plus CSR offset/target/weight arrays."""
+    def __init__(self, names, offsets, targets, weights, integral=True, is_hospital=None, xs=None, ys=None):
+        self.names = names  # id -> name
+        self._ids = None  # name -> id, built on first use so a mapped snapshot loads in O(1)
+        self.offsets = offsets  # edges of node i are targets[offsets[i]:offsets[i+1]]
+        self.targets = targets
+        self.weights = weights
+        self.integral = integral  # report distances as ints like the dict graph did
+
+        # 1 for facilities, 0 for plain road nodes
+        self.is_hospital = bytearray(len(names)) if is_hospital is None else is_hospital
+        # node coordinates for goal-directed search
+        self.xs = array('d', bytes(8 * len(names))) if xs is None else xs
+        self.ys = array('d', bytes(8 * len(names))) if ys is None else ys
+        self._scale = None
+
+    def __getstate__(self):
+        # Arrays may be memoryviews over a mapped snapshot; pickle them as plain copies
+        state = dict(self.__dict__)
+        for key, value in state.items():
+            if isinstance(value, memoryview):
+                state[key] = bytearray(value) if value.format == 'B' else array(value.format, value.tobytes())
+        return state
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = dict(zip(self.names, range(len(self.names))))
+        return self._ids
+
+    @classmethod
+    def from_adj(cls, adj, hospitals=(), positions=None):
+        names = list(adj)
+        ids = {name: i for i, name in enumerate(names)}
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d')
+        integral = True
+        for name in names:
+            for nb, w in adj[name].items():
+                targets.append(ids[nb])
+                weights.append(w)
+                integral = integral and (isinstance(w, int) or w == INF)  # closed roads are inf
+            offsets.append(len(targets))
+        csr = cls(names, offsets, targets, weights, integral)
+        for h in hospitals:
+            if h in ids:
+                csr.is_hospital[ids[h]] = 1
+        for name, (x, y) in (positions or {}).items():
+            if name in ids:
+                csr.xs[ids[name]], csr.ys[ids[name]] = x, y
+        return csr
+
+    def __len__(self):
+        return len(self.names)
+
+    def distance(self, d):
+        if self.integral and d != INF:
+            return int(d)
+        return d
+
+    def heuristic_scale(self):
+        """Largest s with s * straight-line distance <= road distance on every edge (keeps A* admissible)."""
+        if self._scale is None:
+            xs, ys, targets, weights = self.xs, self.ys, self.targets, self.weights
+            scale = INF
+            for u in range(len(self.names)):
+                for i in range(self.offsets[u], self.offsets[u + 1]):
+                    v = targets[i]
+                    straight = ((xs[u] - xs[v]) ** 2 + (ys[u] - ys[v]) ** 2) ** 0.5
+                    if straight > 0:
+                        scale = min(scale, weights[i] / straight)
+            self._scale = 0 if scale == INF else scale
+        return self._scale
+
+    def _start(self, source, seeds=(), size=None):
+        # A source equal to len(self) is a virtual query origin reached only through its seed edges
+        n = len(self.names)
+        if size is None:
+            size = n + 1 if source == n else n
+        dist = array('d', [INF]) * size
+        prev = array('q', [-1]) * size
+        dist[source] = 0
+        heap = [(0, source)] if source < n else []
+        for v, w in seeds:
+            if w < dist[v]:
+                dist[v] = w
+                prev[v] = source
+                heap.append((w, v))
+        heapq.heapify(heap)
+        return dist, prev, heap
+
+    def dijkstra(self, source, seeds=()):
+        dist, prev, heap = self._start(source, seeds)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        pushes = len(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    pushes += 1
+                    heapq.heappush(heap, (nd, v))
+        if METRICS.enabled:
+            # The heap is drained, so every reached node was popped once live and the rest were stale
+            settled = len(dist) - dist.count(INF) - (source == len(self.names))
+            METRICS.inc("dijkstra_settled_total", settled)
+            METRICS.inc("dijkstra_heap_pushes_total", pushes)
+            METRICS.inc("dijkstra_stale_pops_total", pushes - settled)
+            METRICS.observe("dijkstra_settled_nodes", settled, COUNT_BUCKETS)
+        return dist, prev
+
+    def nearest(self, source, k, seeds=()):
+        """Dijkstra that stops once k hospitals are settled; returns [(id, dist)] and prev."""
+        dist, prev, heap = self._start(source, seeds)
+        offsets, targets, weights, is_hospital = self.offsets, self.targets, self.weights, self.is_hospital
+        found = []
+        while heap and len(found) < k:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if is_hospital[u]:
+                found.append((u, d))
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd, v))
+        return found, prev
+
+    def distances_to(self, source, goals):
+        """Distances from source to each goal id; the search stops once every goal is settled."""
+        dist, prev, heap = self._start(source)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        pending = set(goals)
+        while heap and pending:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            pending.discard(u)
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heapq.heappush(heap, (nd, v))
+        return array('d', [dist[g] for g in goals])
+
+    def _path(self, prev, node):
+        ids = []
+        while node >= 0:
+            ids.append(node)
+            node = prev[node]
+        ids.reverse()
+        return ids
+
+    def astar(self, source, target, seeds=(), landmarks=None):
+        """A* that stops at the target; returns (distance, id path). The lower bound comes from
+        landmarks (ALT) when given, otherwise from straight-line distance."""
+        dist, prev, heap = self._start(source, seeds)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        if landmarks is not None:
+            h = landmarks.bound_to(target)
+        else:
+            xs, ys = self.xs, self.ys
+            tx, ty, scale = xs[target], ys[target], self.heuristic_scale()
+            h = lambda v: scale * ((xs[v] - tx) ** 2 + (ys[v] - ty) ** 2) ** 0.5
+        heap = [(d + h(v), d, v) for d, v in heap]
+        heapq.heapify(heap)
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if u == target:
+                return d, self._path(prev, target)
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd + h(v), nd, v))
+        return INF, []
+
+    def bidirectional(self, source, target, seeds=()):
+        """Dijkstra from both ends, stopping once the frontiers prove the best meeting point."""
+        n = len(self.names)
+        df, pf, hf = self._start(source, seeds)
+        db, pb, hb = self._start(target, size=len(df))
+        back = dict(seeds)  # the backward search may step onto a virtual origin through its links
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        best, meet = df[target], target
+        sides = ((df, pf, hf, db, {}), (db, pb, hb, df, back))
+        while hf and hb and hf[0][0] + hb[0][0] < best:
+            dist, prev, heap, other, extra = sides[0] if len(hf) <= len(hb) else sides[1]
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            edges = [(targets[i], weights[i]) for i in range(offsets[u], offsets[u + 1])]
+            if u in extra:
+                edges.append((n, extra[u]))
+            for v, w in edges:
+                nd = d + w
+                if nd < dist[v]:
+                    dist[v] = nd
+                    prev[v] = u
+                    heapq.heappush(heap, (nd, v))
+                if dist[v] + other[v] < best:
+                    best, meet = dist[v] + other[v], v
+        if best == INF:
+            return INF, []
+        route = self._path(pf, meet)
+        node = pb[meet]
+        while node >= 0:
+            route.append(node)
+            node = pb[node]
+        return best, route
+
+    def multi_source(self, sources, radius=INF):
+        """One Dijkstra from all sources at once: dist, prev (towards the source) and owning source.
+        Nodes further than radius from every source are never reached (dist inf, owner -1)."""
+        n = len(self.names)
+        dist = array('d', [INF]) * n
+        prev = array('q', [-1]) * n
+        owner = array('q', [-1]) * n
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        heap = []
+        for s in sources:
+            dist[s] = 0
+            owner[s] = s
+            heap.append((0, s))
+        heapq.heapify(heap)
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v] and nd <= radius:
+                    dist[v] = nd
+                    prev[v] = u
+                    owner[v] = owner[u]
+                    heapq.heappush(heap, (nd, v))
+        return dist, prev, owner
+
+    def subtree_ranges(self, prev, root):
+        """Pre-order numbering of the shortest-path tree prev (grown from root): x lies in the
+        subtree of y exactly when start[y] <= start[x] < end[y]. Unreached nodes get -1."""
+        n = len(prev)
+        kids = sorted(range(n), key=prev.__getitem__)  # nodes grouped by parent
+        parents = [prev[i] for i in kids]
+        start = array('q', [-1]) * n
+        end = array('q', [-1]) * n
+        order, stack = [], [root]
+        while stack:
+            x = stack.pop()
+            start[x] = len(order)
+            order.append(x)
+            lo = bisect.bisect_left(parents, x)
+            stack.extend(kids[lo:bisect.bisect_right(parents, x, lo)])
+        size = array('q', [1]) * n
+        for x in reversed(order):
+            if prev[x] >= 0:
+                size[prev[x]] += size[x]
+        for x in order:
+            end[x] = start[x] + size[x]
+        return start, end
+
+    def _spur(self, spur, limit, blocked, banned, covered, tree, seeds):
+        """Cheapest path from spur to the tree's root that avoids blocked nodes and the banned
+        first hops, if it costs less than limit: (cost, id path) or None. A* on the exact
+        distance-to-root; it stops at the first settled node whose tree path is not covered."""
+        h, nxt = tree[0], tree[1]
+        n = len(self.names)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        g, parent = {spur: 0}, {spur: -1}
+        heap = [(0 if spur == n else h[spur], 0, spur)]
+        while heap:
+            f, d, u = heapq.heappop(heap)
+            if f >= limit:
+                return None
+            if d > g[u]:
+                continue
+            if u == spur:
+                done = u != n and nxt[u] >= 0 and nxt[u] not in banned and not covered(nxt[u])
+            else:
+                done = not covered(u)
+            if done:
+                path, x = [], u
+                while x >= 0:
+                    path.append(x)
+                    x = parent[x]
+                path.reverse()
+                x = nxt[u]
+                while x >= 0:
+                    path.append(x)
+                    x = nxt[x]
+                return f, path
+            if u == n:
+                edges = seeds.items()
+            else:
+                edges = zip(targets[offsets[u]:offsets[u + 1]], weights[offsets[u]:offsets[u + 1]])
+            for v, w in edges:
+                if v in blocked or (u == spur and v in banned):
+                    continue
+                nd = d + w
+                if nd < g.get(v, INF) and h[v] < INF:
+                    g[v] = nd
+                    parent[v] = u
+                    heapq.heappush(heap, (nd + h[v], nd, v))
+        return None
+
+    def _path_costs(self, path, seeds):
+        # Distance from the start of path to each of its nodes
+        n, offsets, targets, weights = len(self.names), self.offsets, self.targets, self.weights
+        costs = [0]
+        for u, v in zip(path, path[1:]):
+            if u == n:
+                w = seeds[v]
+            else:
+                w = min(weights[i] for i in range(offsets[u], offsets[u + 1]) if targets[i] == v)
+            costs.append(costs[-1] + w)
+        return costs
+
+    def k_shortest(self, source, k, tree, seeds=()):
+        """Yen's k shortest loopless paths from source to the root of tree, shortest first, as
+        [(distance, id path)]. tree is (dist, prev, start, end): a full search grown from the
+        target plus its subtree_ranges. Roads are two-way, so dist[v] is v's distance to the
+        target and prev[v] its next hop there; the tree gives the first path outright and is an
+        exact heuristic for the spur searches. Spurs are taken from each path's deviation node
+        on (Lawler) and skipped when their lower bound cannot beat the paths already queued."""
+        h, nxt, start, end = tree
+        n = len(self.names)
+        seeds = dict(seeds) if source == n else {}
+        if source == n:
+            best, first = min(((w + h[v], v) for v, w in seeds.items()), default=(INF, -1))
+            first = [n, first]
+        else:
+            best, first = h[source], [source]
+        if best == INF:
+            return []
+        while nxt[first[-1]] >= 0:
+            first.append(nxt[first[-1]])
+
+        found = [(best, tuple(first), 0)]  # (distance, path, index of its deviation node)
+        seen = {found[0][1]}
+        queue = []
+        while len(found) < k:
+            _, path, dev = found[-1]
+            need = k - len(found)
+            bound = [-c for c, _, _ in heapq.nsmallest(need, queue)]  # max-heap of the best `need`
+            heapq.heapify(bound)
+            costs = self._path_costs(path, seeds)
+            sharing = [p for _, p, _ in found if p[:dev] == path[:dev]]
+            blocked = set(path[:dev])
+            starts, ends = [], []  # disjoint subtree ranges of the root path, spur included
+
+            def cover(x):
+                a, b = start[x], end[x]
+                j = bisect.bisect_right(starts, a)
+                if a < 0 or (j and ends[j - 1] > a):
+                    return  # subtrees nest or are disjoint, so this one is already covered
+                m = bisect.bisect_left(starts, b, j)
+                starts[j:m], ends[j:m] = [a], [b]
+
+            def covered(x):
+                j = bisect.bisect_right(starts, start[x])
+                return j > 0 and ends[j - 1] > start[x]
+
+            for x in blocked:
+                if x != n:
+                    cover(x)
+            for i in range(dev, len(path) - 1):
+                spur = path[i]
+                sharing = [p for p in sharing if p[i] == spur]
+                if spur != n:
+                    cover(spur)
+                limit = -bound[0] if len(bound) == need else INF
+                if costs[i] + (0 if spur == n else h[spur]) < limit:
+                    hit = self._spur(spur, limit - costs[i], blocked, {p[i + 1] for p in sharing},
+                                     covered, tree, seeds)
+                    if hit is not None:
+                        cost, candidate = costs[i] + hit[0], path[:i] + tuple(hit[1])
+                        if candidate not in seen:
+                            seen.add(candidate)
+                            heapq.heappush(queue, (cost, candidate, i))
+                            heapq.heappush(bound, -cost)
+                            if len(bound) > need:
+                                heapq.heappop(bound)
+                blocked.add(spur)
+            if not queue:
+                break
+            found.append(heapq.heappop(queue))
+        return [(d, list(path)) for d, path, _ in found]
+
+def csr_fingerprint(csr):
+    """Checksum of names, topology and weights; an index saved for other weights will not load."""
+    crc = zlib.crc32("\0".join(csr.names).encode("utf-8"))
+    for part in (csr.offsets, csr.targets, csr.weights):
+        crc = zlib.crc32(part.tobytes(), crc)
+    return crc
+
+# ALT landmark index (offline preprocessing for fast point-to-point queries)
+class LandmarkIndex:
+    """Exact distances from a few far-apart landmarks; the triangle inequality turns them into
+    A* lower bounds. Bounds stay valid when roads only get longer, so only new nodes, new roads
+    and shorter roads force a rebuild."""
+    MAGIC = b"SCNALT1\0"
+
+    def __init__(self, landmarks, dist, fingerprint):
+        self.landmarks = landmarks  # node ids
+        self.dist = dist  # one array('d') of distances per landmark
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, csr, count=8):
+        landmarks, dist = [], []
+        if len(csr):
+            # Farthest-point selection: each landmark is the node worst covered by the previous ones
+            cover, _ = csr.dijkstra(0)
+            while len(landmarks) < min(count, len(csr)):
+                pick = max(range(len(csr)), key=lambda v: cover[v] if cover[v] != INF else -1)
+                if pick in landmarks:
+                    break
+                d, _ = csr.dijkstra(pick)
+                landmarks.append(pick)
+                dist.append(d)
+                cover = d if len(landmarks) == 1 else array('d', map(min, cover, d))
+        return cls(landmarks, dist, csr_fingerprint(csr))
+
+    def bound_to(self, target):
+        """Heuristic h(v) <= true distance from v to target."""
+        pairs = [(d, d[target]) for d in self.dist]
+        def h(v):
+            best = 0
+            for d, dt in pairs:
+                dv = d[v]
+                if dv != dt and abs(dv - dt) > best:
+                    best = abs(dv - dt)
+            return best
+        return h
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.MAGIC)
+            n = len(self.dist[0]) if self.dist else 0
+            f.write(struct.pack("=QQI", len(self.landmarks), n, self.fingerprint))
+            array('q', self.landmarks).tofile(f)
+            for d in self.dist:
+                d.tofile(f)
+
+    @classmethod
+    def load(cls, path, csr):
+        """Load a saved index, refusing it if it was built for a different graph."""
+        with open(path, "rb") as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not a landmark index")
+            count, n, fingerprint = struct.unpack("=QQI", f.read(struct.calcsize("=QQI")))
+            if fingerprint != csr_fingerprint(csr) or n != len(csr):
+                raise ValueError(f"{path} was built for a different road network")
+            landmarks = array('q')
+            landmarks.fromfile(f, count)
+            dist = []
+            for _ in range(count):
+                d = array('d')
+                d.fromfile(f, n)
+                dist.append(d)
+        return cls(list(landmarks), dist, fingerprint)
+
+# Process-pool workers for distance_matrix (each worker unpickles the frozen graph once)
+_worker_csr = None
+
+def _matrix_worker_init(csr):
+    global _worker_csr
+    _worker_csr = csr
+
+def _matrix_rows(origins, goals):
+    return [_worker_csr.distances_to(o, goals) for o in origins]
+
+# Nearest-hospital lookup table (Voronoi partition of the road network)
+class HospitalPartition:
+    """Precomputed multi-source Dijkstra from every hospital; nearest-hospital queries become lookups."""
+    def __init__(self, csr):
+        self.csr = csr
+        sources = [i for i, flag in enumerate(csr.is_hospital) if flag]
+        self.dist, self.prev, self.owner = csr.multi_source(sources)
+
+    def _route_from(self, i):
+        route = []
+        while i >= 0:
+            route.append(self.csr.names[i])
+            i = self.prev[i]
+        return route
+
+    def lookup(self, location):
+        """Return (hospital, distance, route) for a node, or None if no hospital is reachable."""
+        i = self.csr.ids.get(location)
+        if i is None or self.owner[i] < 0:
+            return None
+        route = self._route_from(i)
+        return route[-1], self.csr.distance(self.dist[i]), route
+
+    def lookup_overlay(self, overlay):
+        """Same as lookup() for a virtual origin: best link plus that node's precomputed distance."""
+        best, via = INF, -1
+        for v, w in overlay.seeds(self.csr):
+            if w + self.dist[v] < best:
+                best, via = w + self.dist[v], v
+        if via < 0:
+            return None
+        route = [overlay.origin] + self._route_from(via)
+        return route[-1], self.csr.distance(best), route
+
+    def repair(self, changed):
+        """Bring dist/prev/owner up to date after road lengths changed in place, touching only
+        the region whose shortest paths can move (Ramalingam-Reps style) instead of rerunning
+        the whole search. changed holds (u, v, old, new) per directed slot; roads are two-way
+        (both slots carry the same length), so a node's own slots double as its incoming edges.
+        Returns the number of nodes whose distance was recomputed."""
+        csr, dist, prev, owner = self.csr, self.dist, self.prev, self.owner
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+
+        # 1. Nodes hanging below a tree edge that got longer lose their distance
+        affected = set()
+        stack = [v for u, v, old, new in changed if new > old and prev[v] == u]
+        while stack:
+            x = stack.pop()
+            if x in affected:
+                continue
+            affected.add(x)
+            for i in range(offsets[x], offsets[x + 1]):
+                if prev[targets[i]] == x:
+                    stack.append(targets[i])
+        for x in affected:
+            dist[x], prev[x], owner[x] = INF, -1, -1
+
+        # 2. Seed them from their best unaffected neighbour, and seed both ends of every
+        # shortened road; anything else still holds a valid upper bound
+        heap = []
+        for x in affected:
+            for i in range(offsets[x], offsets[x + 1]):
+                y = targets[i]
+                if dist[y] + weights[i] < dist[x]:
+                    dist[x], prev[x], owner[x] = dist[y] + weights[i], y, owner[y]
+            if dist[x] < INF:
+                heap.append((dist[x], x))
+        for u, v, old, new in changed:
+            if new < old and dist[u] + new < dist[v]:
+                dist[v], prev[v], owner[v] = dist[u] + new, u, owner[u]
+                heap.append((dist[v], v))
+        heapq.heapify(heap)
+
+        # 3. Dijkstra from the seeds until no road can shorten any distance further
+        settled = set()
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            settled.add(u)
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist[v]:
+                    dist[v], prev[v], owner[v] = nd, u, owner[u]
+                    heapq.heappush(heap, (nd, v))
+        return len(affected | settled)
+
+# Hospital coverage within a road distance (isochrones)
+class CoverageMap:
+    """Nearest hospital and road distance for every node within radius km of a hospital; nodes
+    further out have owner -1 and an infinite distance."""
+    def __init__(self, csr, radius, dist, owner):
+        self.csr = csr
+        self.radius = radius
+        self.dist = dist
+        self.owner = owner  # node id -> id of its nearest hospital, -1 if out of reach
+
+    @classmethod
+    def build(cls, csr, radius, partition=None):
+        """One bounded multi-source search from every hospital, or a cut of the full partition
+        when one is already computed."""
+        if partition is not None:
+            dist = array('d', (d if d <= radius else INF for d in partition.dist))
+            owner = array('q', (o if d <= radius else -1 for o, d in zip(partition.owner, partition.dist)))
+        else:
+            sources = [i for i, flag in enumerate(csr.is_hospital) if flag]
+            dist, _, owner = csr.multi_source(sources, radius)
+        return cls(csr, radius, dist, owner)
+
+    def nearest(self, location):
+        """(hospital, distance) for a node within reach, otherwise None."""
+        i = self.csr.ids.get(location)
+        if i is None or self.owner[i] < 0:
+            return None
+        return self.csr.names[self.owner[i]], self.csr.distance(self.dist[i])
+
+    def uncovered(self):
+        """Nodes with no hospital within the radius."""
+        names = self.csr.names
+        return [names[i] for i, o in enumerate(self.owner) if o < 0]
+
+    def served(self):
+        """{hospital: number of nodes it is the nearest hospital for}"""
+        counts = {}
+        for o in self.owner:
+            if o >= 0:
+                counts[o] = counts.get(o, 0) + 1
+        return {self.csr.names[o]: c for o, c in counts.items()}
+
+    def share(self):
+        """Fraction of nodes within reach of a hospital."""
+        n = len(self.owner)
+        return (n - self.owner.count(-1)) / n if n else 0.0
+
+    def owners(self, ids):
+        """Nearest-hospital node ids (-1 out of reach) for a sequence of node ids, as a NumPy
+        int64 array when NumPy is installed, otherwise array('q')."""
+        if np is not None:
+            return np.frombuffer(self.owner, dtype=np.int64)[np.asarray(ids, dtype=np.int64)]
+        owner = self.owner
+        return array('q', [owner[i] for i in ids])
+
+# Query-scoped virtual origin (nothing in the base graph is copied or mutated)
+class RouteOverlay:
+    def __init__(self, origin, position, links):
+        self.origin = origin
+        self.position = position
+        self.links = dict(links)  # base node -> distance from the origin
+
+    def seeds(self, csr):
+        return [(csr.ids[v], w) for v, w in self.links.items() if v in csr.ids]
+
+    def edges(self):
+        return [(self.origin, v, w) for v, w in self.links.items()]
+
+    def key(self):
+        return (self.origin, tuple(sorted(self.links.items())))
+
+# LRU cache of shortest-path trees
+class ShortestPathCache:
+    """LRU of (dist, prev) trees keyed by source, bounded by the bytes of their arrays so big
+    graphs keep fewer trees; the newest tree is always kept. Emptied when the graph version moves."""
+    def __init__(self, maxbytes=64 << 20):
+        self.maxbytes = maxbytes
+        self.entries = OrderedDict()  # key -> (tree, bytes)
+        self.bytes = 0
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(tree):
+        # A tree is a tuple of arrays or of node views over them
+        return sum(len(a) * a.itemsize for a in (getattr(part, "values", part) for part in tree))
+
+    def _check(self, version):
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def get(self, key, version, count=True):
+        self._check(version)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        if count:
+            self.misses += 1
+        return None
+
+    def put(self, key, version, tree):
+        self._check(version)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        size = self._size(tree)
+        self.entries[key] = (tree, size)
+        self.bytes += size
+        while self.bytes > self.maxbytes and len(self.entries) > 1:
+            self.bytes -= self.entries.popitem(last=False)[1][1]
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries), "bytes": self.bytes,
+                "maxbytes": self.maxbytes}
+
+# Spatial index over node positions (uniform grid buckets)
+class SpatialIndex:
+    """Grid-bucket index over node positions with k-nearest and radius queries."""
+    def __init__(self, positions, cell=None):
+        self.positions = positions
+        if cell is None:
+            xs = [p[0] for p in positions.values()] or [0]
+            ys = [p[1] for p in positions.values()] or [0]
+            area = max(max(xs) - min(xs), 1) * max(max(ys) - min(ys), 1)
+            cell = max((area / max(len(positions), 1)) ** 0.5, 1)  # about one node per cell
+        self.cell = cell
+        self.buckets = {}
+        for name, (x, y) in positions.items():
+            self.buckets.setdefault(self._key(x, y), []).append(name)
+        cols = [c for c, _ in self.buckets] or [0]
+        rows = [r for _, r in self.buckets] or [0]
+        self.bounds = (min(cols), min(rows), max(cols), max(rows))  # occupied cells
+
+    def _key(self, x, y):
+        return int(x // self.cell), int(y // self.cell)
+
+    def _ring(self, cx, cy, r):
+        # Cells at Chebyshev distance exactly r from (cx, cy), clipped to the occupied bounds
+        x0, y0, x1, y1 = self.bounds
+        if r == 0:
+            if x0 <= cx <= x1 and y0 <= cy <= y1:
+                yield cx, cy
+            return
+        lo, hi = max(cx - r, x0), min(cx + r, x1)
+        for row in (cy - r, cy + r):
+            if y0 <= row <= y1:
+                for col in range(lo, hi + 1):
+                    yield col, row
+        lo, hi = max(cy - r + 1, y0), min(cy + r - 1, y1)
+        for col in (cx - r, cx + r):
+            if x0 <= col <= x1:
+                for row in range(lo, hi + 1):
+                    yield col, row
+
+    def _unsearched(self, x, y, cx, cy, r):
+        """Distance from (x, y) to the occupied cells beyond ring r (inf once none are left)."""
+        x0, y0, x1, y1 = self.bounds
+        strips = []  # (col0, row0, col1, row1) blocks of the bounds outside the searched square
+        if x0 < cx - r:
+            strips.append((x0, y0, min(x1, cx - r - 1), y1))
+        if x1 > cx + r:
+            strips.append((max(x0, cx + r + 1), y0, x1, y1))
+        lo, hi = max(x0, cx - r), min(x1, cx + r)
+        if lo <= hi:
+            if y0 < cy - r:
+                strips.append((lo, y0, hi, min(y1, cy - r - 1)))
+            if y1 > cy + r:
+                strips.append((lo, max(y0, cy + r + 1), hi, y1))
+        c, gap = self.cell, INF
+        for a, b, e, f in strips:
+            dx = max(a * c - x, 0, x - (e + 1) * c)
+            dy = max(b * c - y, 0, y - (f + 1) * c)
+            gap = min(gap, (dx * dx + dy * dy) ** 0.5)
+        return gap
+
+    def nearest(self, x, y, k=1):
+        """The k closest nodes as (distance, name) pairs, closest first. Rings are clipped to
+        the occupied cells and start at the first one that reaches them, so a point far off
+        the map costs no more than one in it."""
+        k = min(k, len(self.positions))
+        if k <= 0:
+            return []
+        cx, cy = self._key(x, y)
+        x0, y0, x1, y1 = self.bounds
+        best = []
+        r = max(x0 - cx, cx - x1, y0 - cy, cy - y1, 0)  # nearer rings hold no cells
+        while True:
+            for key in self._ring(cx, cy, r):
+                for name in self.buckets.get(key, ()):
+                    nx, ny = self.positions[name]
+                    best.append((((nx - x) ** 2 + (ny - y) ** 2) ** 0.5, name))
+            rest = self._unsearched(x, y, cx, cy, r)
+            if len(best) >= k:
+                best.sort()
+                if best[k - 1][0] <= rest:
+                    return best[:k]
+            if rest == INF:
+                return best[:k]
+            r += 1
+
+    def within(self, x, y, radius):
+        """All (distance, name) pairs within radius, closest first."""
+        bx0, by0, bx1, by1 = self.bounds
+        x0, y0 = self._key(x - radius, y - radius)
+        x1, y1 = self._key(x + radius, y + radius)
+        x0, y0, x1, y1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+        hits = []
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                for name in self.buckets.get((cx, cy), ()):
+                    nx, ny = self.positions[name]
+                    d = ((nx - x) ** 2 + (ny - y) ** 2) ** 0.5
+                    if d <= radius:
+                        hits.append((d, name))
+        hits.sort()
+        return hits
+
+# Name lookup for autocomplete (prefix and typo-tolerant)
+def normalize_name(text):
+    return " ".join(text.casefold().split())
+
+def bounded_levenshtein(a, b, limit):
+    """Edit distance between a and b, or limit + 1 if it exceeds limit. Only the diagonal band
+    of width 2 * limit + 1 is filled."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    n, big = len(b), limit + 1
+    row = [j if j <= limit else big for j in range(n + 1)]
+    for i, ca in enumerate(a, 1):
+        lo, hi = max(1, i - limit), min(n, i + limit)
+        prev_diag = row[lo - 1]
+        row[lo - 1] = best = i if lo == 1 else big
+        for j in range(lo, hi + 1):
+            cost = prev_diag if ca == b[j - 1] else prev_diag + 1
+            prev_diag = row[j]
+            if prev_diag + 1 < cost:
+                cost = prev_diag + 1
+            if row[j - 1] + 1 < cost:
+                cost = row[j - 1] + 1
+            row[j] = cost
+            if cost < best:
+                best = cost
+        if best > limit:
+            return big
+    return min(row[n], big)
+
+class NameIndex:
+    """Case- and space-insensitive name search. Prefix queries bisect a sorted list holding
+    every word-start suffix of each name ("jinnah hospital", "hospital"), so typing any word
+    of a name finds it. Typo-tolerant queries work a word at a time: each typed word is
+    looked up in a symmetric-deletion index of the distinct words (a word and every copy of
+    it with one letter dropped), which finds every word one edit away, swapped letters and
+    most two-edit misspellings; a name's distance is the sum over its aligned words, so the
+    cost follows the vocabulary, not the number of names. Queries of several words look up
+    the pairs of close words in an index of adjacent word pairs, so only names containing
+    both are scored."""
+    PREFIX_WORDS = 64  # vocabulary words a half-typed last word may expand to
+    MAX_CHECKED = 5000  # names scored per fuzzy query
+
+    def __init__(self, names=()):
+        self.names = list(dict.fromkeys(names))
+        self.keys = [normalize_name(n) for n in self.names]
+        self.exact = {}  # normalized name -> index of its first name
+        suffixes = []
+        word_names = {}
+        pair_names = {}
+        for i, key in enumerate(self.keys):
+            self.exact.setdefault(key, i)
+            suffixes.append((key, i))
+            start = key.find(" ")
+            while start >= 0:
+                suffixes.append((key[start + 1:], i))
+                start = key.find(" ", start + 1)
+            words = key.split()
+            for word in set(words):
+                word_names.setdefault(word, []).append(i)
+            for pair in set(zip(words, words[1:])):
+                pair_names.setdefault(pair, []).append(i)
+        suffixes.sort()
+        self.suffixes = [key for key, _ in suffixes]
+        self.suffix_ids = [i for _, i in suffixes]
+        self.word_names = word_names  # word -> ids of the names containing it
+        self.pair_names = pair_names  # (word, next word) -> ids of the names containing the two in a row
+        self.words = sorted(word_names)
+        self.deletions = {}  # word or word minus one letter -> vocabulary words
+        for word in self.words:
+            for variant in self._deletions(word):
+                self.deletions.setdefault(variant, []).append(word)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _deletions(word):
+        return {word} | {word[:i] + word[i + 1:] for i in range(len(word))} - {""}
+
+    def get(self, text):
+        """The name matching text exactly up to case and spacing, or None."""
+        i = self.exact.get(normalize_name(text))
+        return None if i is None else self.names[i]
+
+    def prefix(self, text, limit=10):
+        """Names with a word starting with text, those whose first word matches first, then
+        shortest first."""
+        key = normalize_name(text)
+        if not key:
+            return []
+        lo = bisect.bisect_left(self.suffixes, key)
+        found = {}
+        # Scan a few times the limit so whole-name matches are not crowded out by word matches
+        for pos in range(lo, min(lo + 4 * limit + 16, len(self.suffixes))):
+            if not self.suffixes[pos].startswith(key):
+                break
+            found.setdefault(self.suffix_ids[pos], None)
+        ranked = sorted(found, key=lambda i: (not self.keys[i].startswith(key), len(self.keys[i]), self.keys[i]))
+        return [self.names[i] for i in ranked[:limit]]
+
+    def _similar_words(self, word, max_distance, prefix):
+        """{vocabulary word: edit distance} for words within max_distance of word; with prefix
+        the words starting with it are included too."""
+        found = {}
+        if prefix:
+            lo = bisect.bisect_left(self.words, word)
+            for v in self.words[lo:lo + self.PREFIX_WORDS]:
+                if not v.startswith(word):
+                    break
+                found[v] = 0
+        elif word in self.word_names:
+            found[word] = 0
+        if max_distance:
+            for variant in self._deletions(word):
+                for v in self.deletions.get(variant, ()):
+                    if v not in found:
+                        d = bounded_levenshtein(word, v, max_distance)
+                        if d <= max_distance:
+                            found[v] = d
+        return found
+
+    def _candidates(self, matches, table, hits, limit):
+        """Ids of the names table lists for a key of matches (key -> edit distance), through
+        the closest keys first. A name is at least as far from the query as its key is, so
+        once `limit` hits are closer than the next group of keys the rest is skipped."""
+        groups = {}
+        for key, d in matches.items():
+            groups.setdefault(d, []).append(key)
+        seen = set()
+        for floor in sorted(groups):
+            if sum(d < floor for d, _, _ in hits) >= limit:
+                return
+            for key in groups[floor]:
+                for i in table.get(key, ()):
+                    if i not in seen:
+                        seen.add(i)
+                        yield i
+
+    def fuzzy(self, text, max_distance=2, limit=10, prefix=False):
+        """(name, edit distance) for names within max_distance edits of text, closest first,
+        where the distance is summed word by word. With prefix=True the typed words only have
+        to match a run of the name's words, and the last one may also be the start of a word
+        (for half-typed input)."""
+        query = normalize_name(text).split()
+        if not query:
+            return []
+        matches = [self._similar_words(w, max_distance, prefix and i == len(query) - 1)
+                   for i, w in enumerate(query)]
+        # Collect names through the most selective typed word, or through the pairs of words
+        # close to the first two typed ones when there are fewer pairs than names to score
+        keys = min(matches, key=lambda m: sum(len(self.word_names[v]) for v in m))
+        table = self.word_names
+        if len(query) > 1 and len(matches[0]) * len(matches[1]) < sum(len(self.word_names[v]) for v in keys):
+            keys = {(a, b): da + db for a, da in matches[0].items() for b, db in matches[1].items()}
+            table = self.pair_names
+        hits = []
+        for i in islice(self._candidates(keys, table, hits, limit), self.MAX_CHECKED):
+            words = self.keys[i].split()
+            starts = range(len(words) - len(query) + 1) if prefix else ((0,) if len(words) == len(query) else ())
+            best = max_distance + 1
+            for start in starts:
+                d = 0
+                for m, w in zip(matches, words[start:]):
+                    d += m.get(w, best)
+                    if d >= best:
+                        break
+                else:
+                    best = d
+            if best <= max_distance:
+                hits.append((best, len(self.keys[i]), i))
+        hits.sort()
+        return [(self.names[i], d) for d, _, i in hits[:limit]]
+
+    def complete(self, text, limit=10):
+        """Autocomplete suggestions: prefix matches, then names a typo or two away."""
+        names = self.prefix(text, limit)
+        if len(names) < limit:
+            seen = set(names)
+            names += [n for n, _ in self.fuzzy(text, 1 if len(text) < 6 else 2, limit, prefix=True)
+                      if n not in seen][:limit - len(names)]
+        return names
+
+    def resolve(self, text, max_distance=2):
+        """Best single name for typed text: an exact match, else the closest name within
+        max_distance edits if it is the only one that close, else the same for a run of the
+        name's words ('civl' -> 'Civil Hospital'), else the only prefix match; None if nothing
+        fits."""
+        exact = self.get(text)
+        if exact is not None:
+            return exact
+        for prefix in (False, True):
+            close = self.fuzzy(text, max_distance, 2, prefix=prefix)
+            if close and (len(close) == 1 or close[0][1] < close[1][1]):
+                return close[0][0]
+        matches = self.prefix(text, 2)
+        return matches[0] if len(matches) == 1 else None
+
+# Name-keyed read-only views so CSR results keep the old dict API
+class _NodeView(Mapping):
+    def __init__(self, csr, values, origin=None):
+        self.csr = csr
+        self.values = values
+        self.origin = origin  # virtual origin name, stored after the base nodes
+
+    def _id(self, name):
+        if self.origin is not None and name == self.origin:
+            return len(self.csr.names)
+        return self.csr.ids.get(name)
+
+    def _name(self, i):
+        return self.origin if i == len(self.csr.names) else self.csr.names[i]
+
+    def __getitem__(self, name):
+        i = self._id(name)
+        if i is None:
+            raise KeyError(name)
+        return self._decode(self.values[i])
+
+    def __iter__(self):
+        yield from self.csr.names
+        if self.origin is not None:
+            yield self.origin
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, name):
+        return self._id(name) is not None
+
+class DistView(_NodeView):
+    def _decode(self, d):
+        return self.csr.distance(d)
+
+class PrevView(_NodeView):
+    def _decode(self, i):
+        return None if i < 0 else self._name(i)
+
+    def route_to(self, target):
+        i = self._id(target)
+        if i is None:
+            return []
+        ids = []
+        while i >= 0:
+            ids.append(i)
+            i = self.values[i]
+            if len(ids) > len(self.values):
+                raise ValueError("prev contains a cycle")
+        return [self._name(i) for i in reversed(ids)]
+
+class _CSRRow(Mapping):
+    def __init__(self, csr, node):
+        self.csr = csr
+        self.start, self.end = csr.offsets[node], csr.offsets[node + 1]
+
+    def _decode(self, w):
+        return self.csr.distance(w)
+
+    def __getitem__(self, name):
+        j = self.csr.ids.get(name)
+        for i in range(self.start, self.end):
+            if self.csr.targets[i] == j:
+                return self._decode(self.csr.weights[i])
+        raise KeyError(name)
+
+    def __iter__(self):
+        return (self.csr.names[self.csr.targets[i]] for i in range(self.start, self.end))
+
+    def __len__(self):
+        return self.end - self.start
+
+    def copy(self):
+        return dict(self.items())
+
+class CSRAdjacency(Mapping):
+    """Read-only stand-in for Graph.adj once the dicts have been released."""
+    def __init__(self, csr):
+        self.csr = csr
+
+    def __getitem__(self, name):
+        return _CSRRow(self.csr, self.csr.ids[name])
+
+    def __iter__(self):
+        return iter(self.csr.names)
+
+    def __len__(self):
+        return len(self.csr.names)
+
+    def __contains__(self, name):
+        return name in self.csr.ids
+
+class CSRPositions(Mapping):
+    """Read-only name -> (x, y) over the frozen coordinate arrays."""
+    def __init__(self, csr):
+        self.csr = csr
+
+    def __getitem__(self, name):
+        i = self.csr.ids[name]
+        return (self.csr.xs[i], self.csr.ys[i])
+
+    def __iter__(self):
+        return iter(self.csr.names)
+
+    def __len__(self):
+        return len(self.csr.names)
+
+    def __contains__(self, name):
+        return name in self.csr.ids
+
+class CSRHospitals(Set):
+    """Read-only set of hospital names over the frozen hospital flags; the name list is
+    collected on first iteration."""
+    def __init__(self, csr):
+        self.csr = csr
+        self._names = None
+
+    @classmethod
+    def _from_iterable(cls, names):
+        return set(names)  # results of &, | and - are plain sets
+
+    def _list(self):
+        if self._names is None:
+            self._names = [name for name, flag in zip(self.csr.names, self.csr.is_hospital) if flag]
+        return self._names
+
+    def __contains__(self, name):
+        i = self.csr.ids.get(name)
+        return i is not None and bool(self.csr.is_hospital[i])
+
+    def __iter__(self):
+        return iter(self._list())
+
+    def __len__(self):
+        return len(self._list())
+
+# Graph Class (Dijkstra)
+class Graph:
+    def __init__(self):
+        self.adj = {}  # adjacency list
+        self.node_positions = {}  # positions for visualization
+        self.hospitals = set()  # facility nodes; other nodes are plain road junctions
+        self.csr = None  # compact arrays, built by freeze()
+        self._partition = None
+        self._spatial = None
+        self._names = None
+        self._landmarks = None
+        self._coverage = {}  # radius -> (graph version, CoverageMap)
+        self.version = 0  # bumped on every edit; caches compare against it
+        self.path_cache = ShortestPathCache()
+
+    @classmethod
+    def from_csr(cls, csr):
+        """Graph backed directly by frozen arrays, with no adjacency dicts (e.g. in a worker).
+        Adjacency, positions and hospitals are views over the arrays until the first edit."""
+        graph = cls()
+        graph.csr = csr
+        graph.adj = CSRAdjacency(csr)
+        graph.hospitals = CSRHospitals(csr)
+        graph.node_positions = CSRPositions(csr)
+        return graph
+
+    def add_hospital(self, name, x=None, y=None):
+        self.add_node(name, x, y)
+        self.hospitals.add(name)
+
+    def add_node(self, name, x=None, y=None):
+        self._thaw()
+        if name not in self.adj:
+            self.adj[name] = {}
+            self._landmarks = None
+            self._names = None
+        if x is not None and y is not None:
+            self.node_positions[name] = (x, y)
+        elif name not in self.node_positions:
+            idx = len(self.node_positions) + 1
+            # Simple position generation if not provided
+            self.node_positions[name] = (60 + (idx * 120) % 900, 60 + (idx * 80) % 500)
+
+    def add_road(self, a, b, distance):
+        old = self.adj[a].get(b) if a in self.adj else None
+        self.add_node(a)
+        self.add_node(b)
+        self.adj[a][b] = distance
+        self.adj[b][a] = distance
+        if old is None or distance < old:
+            self._landmarks = None  # a shorter road can break landmark bounds; a longer one cannot
+
+    def update_roads(self, changes):
+        """Change the length of existing roads in one batch: changes are (a, b, distance), with
+        distance None (or inf) closing the road. The frozen arrays are patched in place and the
+        hospital partition is repaired incrementally rather than rebuilt; cached trees are
+        dropped. Landmarks survive a batch that only lengthens or closes roads. Returns the
+        number of road directions whose length changed."""
+        csr = self.freeze()
+        offsets, targets, weights = csr.offsets, csr.targets, csr.weights
+        before = {}  # slot -> (u, v, length before the batch); a road updated twice counts once
+        for a, b, distance in changes:
+            w = INF if distance is None else distance
+            if not w >= 0:  # also rejects NaN
+                raise ValueError(f"road length must be non-negative, got {distance!r}")
+            u, v = csr.ids.get(a), csr.ids.get(b)
+            slots = [] if u is None or v is None else [
+                (x, y, i) for x, y in ((u, v), (v, u)) for i in range(offsets[x], offsets[x + 1]) if targets[i] == y]
+            if not slots:
+                raise KeyError(f"no road between {a!r} and {b!r}")
+            for x, y, i in slots:
+                if weights[i] != w:
+                    before.setdefault(i, (x, y, weights[i]))
+                    weights[i] = w
+            if w != INF and not float(w).is_integer():
+                csr.integral = False
+            if not isinstance(self.adj, CSRAdjacency):
+                self.adj[a][b] = self.adj[b][a] = w
+        changed = [(x, y, old, weights[i]) for i, (x, y, old) in before.items() if weights[i] != old]
+        if not changed:
+            return 0
+        if any(new < old for _, _, old, new in changed):
+            # Same landmark rule as add_road; the A* heuristic scale may have to shrink too
+            self._landmarks = None
+            csr._scale = None
+        if self._partition is not None:
+            self._partition.repair(changed)
+        self.version += 1  # cached trees and worker snapshots are stale
+        return len(changed)
+
+    def close_road(self, a, b):
+        return self.update_roads([(a, b, None)])
+
+    def freeze(self, compact=False):
+        """Build the CSR arrays used by searches; compact=True also drops the adjacency dicts."""
+        if self.csr is None:
+            self.csr = CSRGraph.from_adj(self.adj, self.hospitals, self.node_positions)
+        if compact and not isinstance(self.adj, CSRAdjacency):
+            self.adj = CSRAdjacency(self.csr)
+        return self.csr
+
+    def _thaw(self):
+        # Any edit goes back to dicts; the arrays are rebuilt on the next search
+        if isinstance(self.adj, CSRAdjacency):
+            self.adj = {name: row.copy() for name, row in self.adj.items()}
+        if isinstance(self.node_positions, CSRPositions):
+            self.node_positions = dict(self.node_positions)
+            self.hospitals = set(self.hospitals)
+        self.csr = None
+        self._partition = None
+        self._spatial = None
+        self.version += 1
+
+    def spatial_index(self):
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self.node_positions)
+        return self._spatial
+
+    def name_index(self):
+        """NameIndex over the node names, rebuilt only after edits that add nodes (road
+        changes keep it), so callers may cache on its identity."""
+        if self._names is None:
+            self._names = NameIndex(self.adj)
+        return self._names
+
+    def overlay(self, origin, position, links):
+        """Temporary origin linked to base nodes; pass it to dijkstra/nearest_hospitals as overlay=."""
+        if origin in self.adj:
+            raise ValueError(f"{origin!r} is already a node of the graph")
+        return RouteOverlay(origin, position, links)
+
+    def snap(self, origin, x, y, count=3, pixels_per_km=20, min_km=5):
+        """Overlay linking a map position to its count nearest nodes, or None if origin is
+        already a node. Link lengths are straight-line pixels converted to km (at least min_km)."""
+        if origin in self.adj:
+            return None
+        links = {}
+        for pixels, node in self.spatial_index().nearest(x, y, count):
+            links[node] = max(int(pixels / pixels_per_km), min_km)
+        return self.overlay(origin, (x, y), links)
+
+    def _source(self, start, overlay):
+        # Returns (csr, source id, seed edges, origin name) or None if start is unknown
+        csr = self.freeze()
+        if overlay is not None and start == overlay.origin:
+            return csr, len(csr), overlay.seeds(csr), overlay.origin
+        if start in csr.ids:
+            return csr, csr.ids[start], (), None
+        return None
+
+    def _cache_key(self, start, overlay):
+        return overlay.key() if overlay is not None and start == overlay.origin else start
+
+    def dijkstra(self, start, overlay=None):
+        found = self._source(start, overlay)
+        if found is None:
+            return {}, {}
+        key = self._cache_key(start, overlay)
+        tree = self.path_cache.get(key, self.version)
+        if tree is None:
+            csr, source, seeds, origin = found
+            dist, prev = csr.dijkstra(source, seeds)
+            # Views are read-only, so one cached tree can be handed to every caller
+            tree = DistView(csr, dist, origin), PrevView(csr, prev, origin)
+            self.path_cache.put(key, self.version, tree)
+        return tree
+
+    def nearest_hospitals(self, location, k=1, overlay=None):
+        """Up to k (hospital, distance, route) tuples, closest first; the graph is left untouched."""
+        found = self._source(location, overlay)
+        if found is None:
+            return []
+        csr, source, seeds, origin = found
+        if k == 1 and self._partition is not None:
+            hit = self._partition.lookup_overlay(overlay) if origin else self._partition.lookup(location)
+            return [hit] if hit else []
+        hits, prev = csr.nearest(source, k, seeds)
+        routes = PrevView(csr, prev, origin)
+        return [(csr.names[h], csr.distance(d), routes.route_to(csr.names[h])) for h, d in hits]
+
+    def precompute_hospital_partition(self):
+        """Run one multi-source search from all hospitals so nearest_hospitals(x) is a lookup."""
+        if self._partition is None:
+            self._partition = HospitalPartition(self.freeze())
+        return self._partition
+
+    def coverage(self, radius):
+        """CoverageMap of the nodes within radius km of a hospital, reused until the graph changes."""
+        cached = self._coverage.get(radius)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        if len(self._coverage) > 8:
+            self._coverage.clear()
+        result = CoverageMap.build(self.freeze(), radius, self._partition)
+        self._coverage[radius] = (self.version, result)
+        return result
+
+    def nearest_hospital_ids(self, locations, radius=INF):
+        """Nearest-hospital node ids for a batch of locations, -1 where none is within radius.
+        A location is a node name or an (x, y) map position, which counts as its closest node.
+        Hospital ids index graph.csr.names; see CoverageMap.owners for the array type."""
+        coverage = self.coverage(radius)
+        ids, index = coverage.csr.ids, None
+        nodes = []
+        for location in locations:
+            if isinstance(location, tuple):
+                index = index or self.spatial_index()
+                location = index.nearest(*location)[0][1]
+            nodes.append(ids[location])
+        return coverage.owners(nodes)
+
+    def build_landmarks(self, count=8, path=None):
+        """Offline ALT preprocessing; optionally saves the index to path."""
+        self._landmarks = LandmarkIndex.build(self.freeze(), count)
+        if path is not None:
+            self._landmarks.save(path)
+        return self._landmarks
+
+    def load_landmarks(self, path):
+        self._landmarks = LandmarkIndex.load(path, self.freeze())
+        return self._landmarks
+
+    def route(self, start, target, method="astar", overlay=None):
+        """Point-to-point (distance, route) that stops once target is settled; method is "astar",
+        "alt", "bidirectional" or "dijkstra". The route list has the same format as reconstruct_route."""
+        found = self._source(start, overlay)
+        if found is None or target not in self.csr.ids:
+            return INF, []
+        csr, source, seeds, origin = found
+        tree = self.path_cache.get(self._cache_key(start, overlay), self.version, count=False)
+        if method == "dijkstra" or tree is not None:
+            dist, prev = tree or self.dijkstra(start, overlay)
+            if dist[target] == INF:
+                return INF, []
+            return dist[target], self.reconstruct_route(prev, target)
+        if method == "astar":
+            d, ids = csr.astar(source, csr.ids[target], seeds)
+        elif method == "alt":
+            landmarks = self._landmarks or self.build_landmarks()
+            d, ids = csr.astar(source, csr.ids[target], seeds, landmarks)
+        elif method == "bidirectional":
+            d, ids = csr.bidirectional(source, csr.ids[target], seeds)
+        else:
+            raise ValueError(f"unknown routing method {method!r}")
+        return csr.distance(d), [origin if i == len(csr) else csr.names[i] for i in ids]
+
+    def k_shortest_routes(self, start, target, k=3, overlay=None):
+        """Up to k loopless (distance, route) pairs from start to target, shortest first: the
+        route() answer followed by the best fallbacks should a road on it be blocked. Roads are
+        two-way, so one cached tree grown from the target serves every start and every spur."""
+        found = self._source(start, overlay)
+        if found is None or target not in self.csr.ids or k < 1:
+            return []
+        csr, source, seeds, origin = found
+        dist, prev = self.dijkstra(target)
+        key = (target, "subtrees")  # never clashes with a node name or an overlay key
+        ranges = self.path_cache.get(key, self.version, count=False)
+        if ranges is None:
+            ranges = csr.subtree_ranges(prev.values, csr.ids[target])
+            self.path_cache.put(key, self.version, ranges)
+        paths = csr.k_shortest(source, k, (dist.values, prev.values) + ranges, seeds)
+        return [(csr.distance(d), [origin if i == len(csr) else csr.names[i] for i in ids]) for d, ids in paths]
+
+    def distance_matrix(self, sources, targets, workers=None):
+        """M x N road distances from every source to every target (inf where unreachable).
+        Searches run from whichever side is smaller (roads are two-way) and stop once the other
+        side is settled; big batches are spread over a process pool. Returns a NumPy array when
+        NumPy is installed, otherwise a list of array('d') rows."""
+        csr = self.freeze()
+        src = [csr.ids[s] for s in sources]
+        dst = [csr.ids[t] for t in targets]
+        flip = len(dst) < len(src)
+        origins, goals = (dst, src) if flip else (src, dst)
+        unique = list(dict.fromkeys(origins))
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(unique) >= MATRIX_PARALLEL_MIN:
+            size = -(-len(unique) // (workers * 4))
+            chunks = [unique[i:i + size] for i in range(0, len(unique), size)]
+            with ProcessPoolExecutor(workers, initializer=_matrix_worker_init, initargs=(csr,)) as pool:
+                parts = pool.map(_matrix_rows, chunks, [goals] * len(chunks))
+                rows = dict(zip(unique, (row for part in parts for row in part)))
+        else:
+            rows = {o: csr.distances_to(o, goals) for o in unique}
+        if flip:
+            matrix = [array('d', [rows[t][i] for t in dst]) for i in range(len(src))]
+        else:
+            matrix = [rows[s] for s in src]
+        if np is not None:
+            return np.array([list(row) for row in matrix], dtype=float).reshape(len(src), len(dst))
+        return matrix
+
+    def iter_route(self, prev, target):
+        """Yield the route lazily from target back to the source; raises ValueError if prev loops."""
+        if target not in prev:
+            return
+        node, steps = target, 0
+        while node is not None:
+            yield node
+            steps += 1
+            if steps > len(prev):
+                raise ValueError("prev contains a cycle")
+            node = prev[node]
+
+    def reconstruct_route(self, prev, target):
+        if isinstance(prev, PrevView):
+            return prev.route_to(target)
+        route = list(self.iter_route(prev, target))
+        route.reverse()
+        return route
+
+    def route_with_distances(self, dist, prev, target):
+        """[(node, cumulative distance)] from the source to target."""
+        return [(node, dist[node]) for node in self.reconstruct_route(prev, target)]
+
+    def hop_distances(self, route, overlay=None):
+        """Cumulative distance at each node of a route, summed from its edge weights."""
+        total, hops = 0, []
+        for i, node in enumerate(route):
+            if i:
+                a = route[i - 1]
+                if overlay is not None and overlay.origin in (a, node):
+                    total += overlay.links[node if a == overlay.origin else a]
+                else:
+                    total += self.adj[a][node]
+            hops.append(total)
+        return hops
+
+# Routing query executor (process pool, each worker holds a read-only copy of the frozen graph)
+_worker_graph = None
+
+def _routing_worker_init(csr, partition, landmarks):
+    global _worker_graph
+    _worker_graph = Graph.from_csr(csr)
+    _worker_graph._partition = partition
+    _worker_graph._landmarks = landmarks
+
+def _routing_call(query, args):
+    return getattr(_worker_graph, query)(*args)
+
+def _routing_call_metered(query, args):
+    # The worker's registry rides back with the result so the parent's totals include it
+    METRICS.enable()
+    return getattr(_worker_graph, query)(*args), METRICS.drain()
+
+class RoutingExecutor:
+    """Runs read-only routing queries on a process pool and hands back futures. Workers get the
+    frozen arrays plus any precomputed partition/landmarks once; when the graph version moves the
+    pool is restarted on a fresh snapshot."""
+    QUERIES = ("nearest_hospitals", "route", "k_shortest_routes")
+
+    def __init__(self, graph, workers=None, mp_context=None):
+        self.graph = graph
+        self.workers = workers
+        self.mp_context = mp_context
+        self._pool = None
+        self._version = None
+
+    def _ensure_pool(self):
+        if self._pool is None or self._version != self.graph.version:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            snapshot = (self.graph.freeze(), self.graph._partition, self.graph._landmarks)
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=self.mp_context,
+                                             initializer=_routing_worker_init, initargs=snapshot)
+            self._version = self.graph.version
+        return self._pool
+
+    def submit(self, query, *args):
+        """Future for graph.<query>(*args) computed in a worker process."""
+        if query not in self.QUERIES:
+            raise ValueError(f"unsupported routing query {query!r}")
+        if not METRICS.enabled:
+            return self._ensure_pool().submit(_routing_call, query, args)
+        inner = self._ensure_pool().submit(_routing_call_metered, query, args)
+        outer = Future()
+        outer.set_running_or_notify_cancel()
+        submitted = time.perf_counter()
+
+        def unpack(f):
+            try:
+                result, state = f.result()
+            except BaseException as e:
+                outer.set_exception(e)
+                return
+            METRICS.merge(state)
+            METRICS.record("routing_call_seconds", time.perf_counter() - submitted, (("query", query),))
+            outer.set_result(result)
+
+        inner.add_done_callback(unpack)
+        return outer
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+# Appointment Manager
+class AppointmentManager:
+    """Priority queue of appointments (lower priority number first, FIFO within a priority).
+    A binary heap with a position map from appointment ID to heap slot, so cancel and
+    update_priority are O(log n) and find(name) is O(1)."""
+    def __init__(self):
+        self.heap = []  # [priority, appointment id, name, details]; the id doubles as FIFO order
+        self.counter = 0
+        self.pos = {}  # appointment id -> index in heap
+        self.by_name = {}  # patient name -> set of appointment ids
+        self.counts = {}  # priority -> queued appointments
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.pos[heap[i][1]] = i
+        self.pos[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        heap = self.heap
+        while i:
+            parent = (i - 1) >> 1
+            if heap[i][:2] >= heap[parent][:2]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        heap, n = self.heap, len(self.heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1][:2] < heap[child][:2]:
+                child += 1
+            if heap[i][:2] <= heap[child][:2]:
+                break
+            self._swap(i, child)
+            i = child
+
+    def _remove_at(self, i):
+        heap = self.heap
+        entry = heap[i]
+        last = heap.pop()
+        del self.pos[entry[1]]
+        self.counts[entry[0]] -= 1
+        if i < len(heap):
+            heap[i] = last
+            self.pos[last[1]] = i
+            self._sift_down(i)
+            self._sift_up(i)
+        ids = self.by_name[entry[2]]
+        ids.discard(entry[1])
+        if not ids:
+            del self.by_name[entry[2]]
+        return entry
+
+    def book(self, name, priority, details=""):
+        """Queue a patient and return the appointment ID."""
+        self.counter += 1
+        self.heap.append([priority, self.counter, name, details])
+        self.pos[self.counter] = len(self.heap) - 1
+        self.by_name.setdefault(name, set()).add(self.counter)
+        self.counts[priority] = self.counts.get(priority, 0) + 1
+        self._sift_up(len(self.heap) - 1)
+        return self.counter
+
+    def restore(self, entries, counter=0):
+        """Load (priority, id, name, details) entries, e.g. from a checkpoint, in O(n)."""
+        self.heap.extend(list(entry) for entry in entries)
+        heapq.heapify(self.heap)
+        self.pos = {entry[1]: i for i, entry in enumerate(self.heap)}
+        self.counts, self.by_name = {}, {}
+        for p, appt_id, name, _ in self.heap:
+            self.counts[p] = self.counts.get(p, 0) + 1
+            self.by_name.setdefault(name, set()).add(appt_id)
+        self.counter = max(self.counter, counter, max(self.pos, default=0))
+
+    def pop_entry(self):
+        """Dequeue the next patient as (priority, id, name, details), or None."""
+        if not self.heap:
+            return None
+        return tuple(self._remove_at(0))
+
+    def pop_next(self):
+        entry = self.pop_entry()
+        if entry is None:
+            return None
+        p, _, name, details = entry
+        return (p, name, details)
+
+    def cancel(self, appt_id):
+        """Remove an appointment; returns (priority, name, details) or None if it is not queued."""
+        i = self.pos.get(appt_id)
+        if i is None:
+            return None
+        p, _, name, details = self._remove_at(i)
+        return (p, name, details)
+
+    def update_priority(self, appt_id, priority):
+        """Re-prioritize a queued appointment (e.g. Standard -> Emergency); it keeps its booking
+        order among patients of the new priority. Returns False if it is not queued."""
+        i = self.pos.get(appt_id)
+        if i is None:
+            return False
+        self.counts[self.heap[i][0]] -= 1
+        self.counts[priority] = self.counts.get(priority, 0) + 1
+        self.heap[i][0] = priority
+        self._sift_up(i)
+        self._sift_down(self.pos[appt_id])
+        return True
+
+    def find(self, name):
+        """Queued appointments for a patient as (appointment id, priority, details), oldest first."""
+        found = []
+        for appt_id in sorted(self.by_name.get(name, ())):
+            p, _, _, details = self.heap[self.pos[appt_id]]
+            found.append((appt_id, p, details))
+        return found
+
+    def depths(self):
+        """Queued appointments per priority."""
+        return {p: c for p, c in self.counts.items() if c}
+
+    def peek(self, n, offset=0):
+        """Entries offset..offset+n-1 in queue order, as peek_all() tuples. Walks the heap
+        best-first instead of sorting it: O((offset + n) log(offset + n))."""
+        heap, out = self.heap, []
+        frontier = [(heap[0][0], heap[0][1], 0)] if heap else []
+        while frontier and len(out) < offset + n:
+            _, _, i = heapq.heappop(frontier)
+            out.append(tuple(heap[i]))
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child][0], heap[child][1], child))
+        return out[offset:]
+
+    def peek_all(self):
+        return sorted(tuple(entry) for entry in self.heap)
+
+# Bucket-queue scheduler for the fixed urgency levels
+class _Appointment:
+    # One queued appointment; since is when it entered its current level (for aging)
+    __slots__ = ("priority", "appt_id", "name", "details", "since", "active")
+
+    def __init__(self, priority, appt_id, name, details, since=0):
+        self.priority = priority
+        self.appt_id = appt_id
+        self.name = name
+        self.details = details
+        self.since = since
+        self.active = True
+
+    def entry(self):
+        return (self.priority, self.appt_id, self.name, self.details)
+
+class BucketAppointmentManager:
+    """AppointmentManager API for the fixed levels 1=Emergency, 2=Urgent, 3=Standard: one FIFO
+    deque per level, so book and pop_next are O(1). Cancelled or re-prioritized records stay in
+    their deque as tombstones that pops skip and compaction clears. With max_wait (seconds) set,
+    a patient who has waited that long at level 2 or 3 is promoted one level, joining the back
+    of that level's queue."""
+    LEVELS = (1, 2, 3)
+
+    def __init__(self, max_wait=None, clock=time.monotonic):
+        self.levels = {p: deque() for p in self.LEVELS}
+        self.counts = dict.fromkeys(self.LEVELS, 0)  # live appointments per level
+        self.live = {}  # appointment id -> record
+        self.by_name = {}  # patient name -> appointment id, or a set of ids for repeat patients
+        self.unindexed = []  # restored records whose names by_name does not hold yet (see _names)
+        self.counter = 0
+        self.tombstones = 0
+        self.max_wait = max_wait
+        self.clock = clock
+        self.on_promote = None  # called with (appointment id, new level) for each aging promotion
+
+    def __len__(self):
+        return len(self.live)
+
+    def _now(self):
+        return self.clock() if self.max_wait is not None else 0
+
+    def _enqueue(self, record, priority, now):
+        record.priority = priority
+        record.since = now
+        self.levels[priority].append(record)
+        self.counts[priority] += 1
+
+    def _retire(self, record):
+        # Takes a live record out of the indexes; its deque slot becomes a tombstone
+        p, appt_id, name = record.priority, record.appt_id, record.name
+        record.active = False
+        self.counts[p] -= 1
+        del self.live[appt_id]
+        ids = self.by_name.get(name)  # missing for restored records not indexed yet
+        if ids == appt_id:
+            del self.by_name[name]
+        elif isinstance(ids, set):
+            ids.discard(appt_id)
+            if not ids:
+                del self.by_name[name]
+
+    def _index(self, name, appt_id):
+        ids = self.by_name.get(name)
+        if ids is None:
+            self.by_name[name] = appt_id
+        elif isinstance(ids, int):
+            self.by_name[name] = {ids, appt_id}
+        else:
+            ids.add(appt_id)
+
+    def _names(self):
+        # by_name, after indexing the restored patients still queued; restore() leaves that to
+        # the first lookup so a restart does not wait for a million-entry dict
+        if self.unindexed:
+            records = [record for record in self.unindexed if record.active]
+            self.unindexed = []
+            names = dict(zip(map(attrgetter("name"), records), map(attrgetter("appt_id"), records)))
+            if not self.by_name and len(names) == len(records):
+                self.by_name = names  # no repeat patients: built in one pass
+            else:
+                for record in records:
+                    self._index(record.name, record.appt_id)
+        return self.by_name
+
+    def _age(self):
+        if self.max_wait is None:
+            return
+        now = self.clock()
+        for p in self.LEVELS[1:]:
+            queue = self.levels[p]
+            while queue and (not queue[0].active or now - queue[0].since >= self.max_wait):
+                record = queue.popleft()
+                if not record.active:
+                    self.tombstones -= 1
+                    continue
+                self.counts[p] -= 1
+                self._enqueue(record, p - 1, now)
+                if self.on_promote is not None:
+                    self.on_promote(record.appt_id, p - 1)
+
+    def _compact(self):
+        if self.tombstones > 64 and self.tombstones > len(self.live):
+            for p in self.LEVELS:
+                self.levels[p] = deque(r for r in self.levels[p] if r.active)
+            self.tombstones = 0
+
+    def book(self, name, priority, details=""):
+        """Queue a patient and return the appointment ID."""
+        if priority not in self.levels:
+            raise ValueError(f"priority must be one of {self.LEVELS}")
+        self.counter += 1
+        record = _Appointment(priority, self.counter, name, details)
+        self._enqueue(record, priority, self._now())
+        self.live[self.counter] = record
+        self._index(name, self.counter)
+        return self.counter
+
+    def restore(self, entries, counter=0):
+        """Load (priority, id, name, details) entries in queue order, e.g. from a checkpoint.
+        Restored patients start their aging wait from now."""
+        now = self._now()
+        records = [_Appointment(p, appt_id, name, details, now) for p, appt_id, name, details in entries]
+        for p, group in groupby(records, attrgetter("priority")):
+            if p not in self.levels:
+                raise ValueError(f"priority must be one of {self.LEVELS}")
+            queue = self.levels[p]
+            before = len(queue)
+            queue.extend(group)
+            self.counts[p] += len(queue) - before
+        ids = list(map(attrgetter("appt_id"), records))
+        self.live.update(zip(ids, records))
+        self.unindexed.extend(records)
+        self.counter = max(self.counter, counter, max(ids, default=0))
+
+    def pop_entry(self):
+        """Dequeue the next patient as (priority, id, name, details), or None."""
+        self._age()
+        for p in self.LEVELS:
+            queue = self.levels[p]
+            while queue:
+                record = queue.popleft()
+                if record.active:
+                    self._retire(record)
+                    return record.entry()
+                self.tombstones -= 1
+        return None
+
+    def pop_next(self):
+        entry = self.pop_entry()
+        if entry is None:
+            return None
+        p, _, name, details = entry
+        return (p, name, details)
+
+    def cancel(self, appt_id):
+        """Remove an appointment; returns (priority, name, details) or None if it is not queued."""
+        record = self.live.get(appt_id)
+        if record is None:
+            return None
+        self._retire(record)
+        self.tombstones += 1
+        self._compact()
+        return (record.priority, record.name, record.details)
+
+    def update_priority(self, appt_id, priority):
+        """Move a queued appointment to another level (to the back of that level's queue); its
+        own level leaves it where it is."""
+        record = self.live.get(appt_id)
+        if record is None:
+            return False
+        if priority not in self.levels:
+            raise ValueError(f"priority must be one of {self.LEVELS}")
+        if priority == record.priority:
+            return True
+        self._retire(record)
+        self.tombstones += 1
+        moved = _Appointment(priority, appt_id, record.name, record.details)
+        self._enqueue(moved, priority, self._now())
+        self.live[appt_id] = moved
+        self._index(moved.name, appt_id)
+        self._compact()
+        return True
+
+    def find(self, name):
+        """Queued appointments for a patient as (appointment id, priority, details), oldest first."""
+        ids = self._names().get(name, ())
+        if isinstance(ids, int):
+            ids = (ids,)
+        return [(i, self.live[i].priority, self.live[i].details) for i in sorted(ids)]
+
+    def depths(self):
+        """Live appointments per priority level."""
+        return dict(self.counts)
+
+    def peek(self, n, offset=0):
+        """Entries offset..offset+n-1 in queue order as (priority, id, name, details) tuples."""
+        self._age()
+        out = []
+        for p in self.LEVELS:
+            if len(out) >= n:
+                break
+            if offset >= self.counts[p]:
+                offset -= self.counts[p]  # whole level lies before the page
+                continue
+            for record in self.levels[p]:
+                if not record.active:
+                    continue
+                if offset:
+                    offset -= 1
+                    continue
+                out.append(record.entry())
+                if len(out) >= n:
+                    break
+        return out
+
+    def peek_all(self):
+        self._age()
+        return [(p, r.appt_id, r.name, r.details) for p in self.LEVELS for r in self.levels[p] if r.active]
+
+# Load-aware hospital assignment (travel time + expected queue wait)
+HospitalScore = namedtuple("HospitalScore", "hospital minutes travel wait distance route")
+
+class AssignmentEngine:
+    """Ranks the k nearest hospitals by travel time plus expected wait. Travel time is road
+    distance at speed_kmh. A new patient of priority p waits behind everyone queued at
+    priority <= p, served at service_rate patients per hour (a number, or a dict per hospital)."""
+    def __init__(self, graph, managers, speed_kmh=40, service_rate=6, candidates=5):
+        self.graph = graph
+        self.managers = managers  # hospital -> appointment manager
+        self.speed_kmh = speed_kmh
+        self.service_rate = service_rate
+        self.candidates = candidates
+
+    def _rate(self, hospital):
+        if isinstance(self.service_rate, dict):
+            return self.service_rate.get(hospital, 1)
+        return self.service_rate
+
+    def wait_minutes(self, hospital, priority, extra=None):
+        depths = self.managers[hospital].depths()
+        ahead = sum(c for p, c in depths.items() if p <= priority)
+        if extra:
+            ahead += sum(c for p, c in extra.get(hospital, {}).items() if p <= priority)
+        return ahead / self._rate(hospital) * 60
+
+    def score(self, nearest, priority, extra=None):
+        """HospitalScores for nearest_hospitals() results, best first. extra holds load that is
+        not booked yet: hospital -> {priority: count}."""
+        scores = []
+        for hospital, distance, route in nearest:
+            if hospital not in self.managers:
+                continue
+            travel = distance / self.speed_kmh * 60
+            wait = self.wait_minutes(hospital, priority, extra)
+            scores.append(HospitalScore(hospital, travel + wait, travel, wait, distance, route))
+        scores.sort(key=lambda s: s.minutes)
+        return scores
+
+    def rank(self, location, priority, overlay=None):
+        nearest = self.graph.nearest_hospitals(location, self.candidates, overlay)
+        return self.score(nearest, priority)
+
+    def assign_wave(self, patients):
+        """Assign a batch of (patient, location, priority, overlay) at once. Higher urgency goes
+        first and every assignment adds to the load the next patients see, so a surge is spread
+        over several hospitals. Returns (patient, HospitalScore or None) in input order."""
+        extra = {}
+        result = [None] * len(patients)
+        order = sorted(range(len(patients)), key=lambda i: patients[i][2])
+        nearest = {}
+        for i in order:
+            patient, location, priority, overlay = patients[i]
+            key = overlay.key() if overlay is not None else location
+            if key not in nearest:
+                nearest[key] = self.graph.nearest_hospitals(location, self.candidates, overlay)
+            scores = self.score(nearest[key], priority, extra)
+            best = scores[0] if scores else None
+            if best is not None:
+                load = extra.setdefault(best.hospital, {})
+                load[priority] = load.get(priority, 0) + 1
+            result[i] = (patient, best)
+        return result
+
+def queue_view_changes(old, new):
+    """Smallest edit turning displayed rows old into new: (start, old_end, new_end) such that
+    old[start:old_end] must be replaced by new[start:new_end]."""
+    start, limit = 0, min(len(old), len(new))
+    while start < limit and old[start] == new[start]:
+        start += 1
+    old_end, new_end = len(old), len(new)
+    while old_end > start and new_end > start and old[old_end - 1] == new[new_end - 1]:
+        old_end -= 1
+        new_end -= 1
+    return start, old_end, new_end
+
+# Metrics probes (the methods are wrapped only while METRICS is enabled)
+WAIT_BUCKETS = (60, 300, 900, 1800, 3600, 7200, 14400, 28800, 86400)  # seconds in the queue
+_booked_at = WeakKeyDictionary()  # manager -> {appointment id: time of booking}
+
+def _after_book(manager, appt_id, args):
+    _booked_at.setdefault(manager, {})[appt_id] = time.time()
+    METRICS.observe("queue_depth_at_booking", len(manager) - 1, COUNT_BUCKETS, priority=args[1])
+
+def _after_pop(manager, entry, args):
+    # Patients booked before metrics were enabled (or restored from disk) have no start time
+    if entry is not None:
+        booked = _booked_at.get(manager, {}).pop(entry[1], None)
+        if booked is not None:
+            METRICS.observe("appointment_wait_seconds", time.time() - booked, WAIT_BUCKETS, priority=entry[0])
+
+def _after_cancel(manager, result, args):
+    _booked_at.get(manager, {}).pop(args[0], None)
+
+METRICS.instrument(Graph, "dijkstra", "dijkstra_seconds", "Shortest-path tree lookups, cache hits included")
+METRICS.instrument(Graph, "nearest_hospitals", "nearest_hospitals_seconds", "k-nearest hospital searches")
+METRICS.instrument(Graph, "reconstruct_route", "reconstruct_route_seconds", "Route extraction from a tree")
+METRICS.instrument(Graph, "k_shortest_routes", "k_shortest_routes_seconds", "Alternative-route searches")
+for _manager in (AppointmentManager, BucketAppointmentManager):
+    METRICS.instrument(_manager, "book", "queue_book_seconds", "Appointment bookings", _after_book)
+    METRICS.instrument(_manager, "pop_entry", "queue_pop_seconds", "Next-patient pops (pop_next included)",
+                       _after_pop)
+    METRICS.instrument(_manager, "cancel", "queue_cancel_seconds", "Appointment cancellations", _after_cancel)
+    METRICS.instrument(_manager, "peek_all", "queue_peek_all_seconds", "Full queue listings")
+METRICS.describe("dijkstra_settled_total", "Nodes settled by full Dijkstra searches")
+METRICS.describe("dijkstra_heap_pushes_total", "Heap pushes made by full Dijkstra searches")
+METRICS.describe("dijkstra_stale_pops_total", "Outdated heap entries skipped by full Dijkstra searches")
+METRICS.describe("dijkstra_settled_nodes", "Nodes settled per full Dijkstra search")
+METRICS.describe("queue_depth_at_booking", "Patients already queued when a booking arrives")
+METRICS.describe("appointment_wait_seconds", "Time from booking to being called, by priority")
+METRICS.describe("routing_call_seconds", "Worker-pool routing queries, submit to result")
+
+# Demo data (the network and patients the app starts with)
+def populate_demo_graph(graph):
+    # Hospitals
+    graph.add_hospital("Agha Khan", 360, 140)
+    graph.add_hospital("Jinnah Hospital", 560, 220)
+    graph.add_hospital("Saifee Hospital", 180, 80)
+    graph.add_hospital("Civil Hospital", 600, 420)
+    graph.add_hospital("Ziauddin Hospital", 820, 140)
+    graph.add_hospital("Indus Hospital", 80, 320)
+
+    # Roads (km)
+    graph.add_road("Agha Khan", "Jinnah Hospital", 15)
+    graph.add_road("Agha Khan", "Saifee Hospital", 25)
+    graph.add_road("Jinnah Hospital", "Civil Hospital", 10)
+    graph.add_road("Saifee Hospital", "Civil Hospital", 35)
+    graph.add_road("Agha Khan", "Ziauddin Hospital", 20)
+    graph.add_road("Jinnah Hospital", "Ziauddin Hospital", 30)
+    graph.add_road("Indus Hospital", "Agha Khan", 18)
+
+def book_demo_appointments(managers):
+    # Agha Khan Hospital
+    managers["Agha Khan"].book("Sarah Feroz", 3, "Annual Checkup")
+    managers["Agha Khan"].book("Hamza Ali", 2, "High Fever")
+    managers["Agha Khan"].book("Mahira Usman", 1, "Severe Bleeding")
+    managers["Agha Khan"].book("Rimsha Khalid", 2, "Severe Headache")
+    managers["Agha Khan"].book("Usman Tariq", 1, "Accidental Injury")
+    managers["Agha Khan"].book("Laiba Ahmed", 3, "Diabetes Follow-up")
+    managers["Agha Khan"].book("Irfan Siddiqui", 2, "Abdominal Pain")
+
+    # Jinnah Hospital
+    managers["Jinnah Hospital"].book("Nawera Khan", 1, "Severe Chest Pain")
+    managers["Jinnah Hospital"].book("Daniyal Ahmed", 2, "Migraine")
+    managers["Jinnah Hospital"].book("Areeba Shah", 3, "Routine Follow-up")
+    managers["Jinnah Hospital"].book("Sarmad Ali", 3, "Throat Infection")
+    managers["Jinnah Hospital"].book("Maryam Zehra", 2, "High Blood Pressure")
+
+
+    # Saifee Hospital
+    managers["Saifee Hospital"].book("Alyana Abid", 2, "Flu Symptoms")
+    managers["Saifee Hospital"].book("Hassan Raza", 1, "Asthma Attack")
+    managers["Saifee Hospital"].book("Fatima Noor", 3, "Blood Test")
+
+    # Civil Hospital
+    managers["Civil Hospital"].book("Zohaib Khan", 1, "Road Accident Injury")
+    managers["Civil Hospital"].book("Sadia Mirza", 2, "Infection")
+    managers["Civil Hospital"].book("Areesha Tariq", 3, "General Checkup")
+
+    # Ziauddin Hospital
+    managers["Ziauddin Hospital"].book("Talha Siddiqui", 2, "Back Pain")
+    managers["Ziauddin Hospital"].book("Noor Fatima", 1, "Shortness of Breath")
+    managers["Ziauddin Hospital"].book("Rehan Ali", 3, "X-ray Appointment")
+    managers["Ziauddin Hospital"].book("Hiba Shafqat", 1, "Critical Injury")
+    managers["Ziauddin Hospital"].book("Adeel Qureshi", 3, "Physiotherapy Session")
+    managers["Ziauddin Hospital"].book("Sadia Hussain", 2, "Allergy Reaction")
+
+
+    # Indus Hospital
+    managers["Indus Hospital"].book("Kiran Baloch", 1, "High Risk Pregnancy")
+    managers["Indus Hospital"].book("Shahzaib Akhtar", 2, "Ear Infection")
+    managers["Indus Hospital"].book("Mariam Javed", 3, "Skin Rash")
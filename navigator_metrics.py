@@ -0,0 +1,347 @@
+"""Opt-in metrics for Smart Care Navigator: counters, timers, histograms and exporters.
+
+    from navigator_metrics import METRICS
+    METRICS.enable()
+    ...
+    print(METRICS.export("prometheus"))
+
+Everything is off until enable(). Methods registered with instrument() are only wrapped while
+metrics are enabled (disable() puts the originals back), and inline probes in the hot paths
+are a single `if METRICS.enabled` check, so a disabled registry costs next to nothing.
+Worker processes keep their own registry; RoutingExecutor merges it back into the parent's.
+A forked child starts from empty totals, so the parent's are not sent back and counted twice.
+Recording, merging and exporting take the registry's lock, so executor callback threads, the
+Tk or asyncio thread and exporters can share one registry.
+"""
+import bisect
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+
+# Histogram bucket upper bounds
+TIME_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+COUNT_BUCKETS = (1, 10, 100, 1000, 10**4, 10**5, 10**6, 10**7)
+PREFIX = "scn_"  # namespace for Prometheus metric names
+
+# Histograms
+class Histogram:
+    """Fixed-bucket histogram; counts[i] holds values <= buckets[i] (the last slot is +Inf)."""
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the largest value seen for +Inf)."""
+        if not self.count:
+            return 0
+        rank, seen = q * self.count, 0
+        for bound, c in zip(self.buckets, self.counts):
+            seen += c
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+# Timers
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+# Slow-query sampling profiler
+class SlowQuerySampler:
+    """Runs one in every `every` instrumented calls under cProfile. Any instrumented call slower
+    than threshold seconds is passed to callback(name, seconds, args, stats), where stats is a
+    pstats.Stats for sampled calls and None otherwise."""
+    def __init__(self, threshold, callback=None, every=100):
+        self.threshold = threshold
+        self.callback = callback or self.print_report
+        self.every = every
+        self.calls = 0
+        self.active = False  # cProfile cannot nest, so calls inside a sampled one are not sampled
+
+    def wants(self):
+        self.calls += 1
+        return not self.active and self.calls % self.every == 0
+
+    def run(self, registry, name, fn, args, kwargs):
+        profile = cProfile.Profile()
+        self.active = True
+        start = time.perf_counter()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.active = False
+            registry.observe(name, elapsed)
+            if elapsed >= self.threshold:
+                self.callback(name, elapsed, args, pstats.Stats(profile))
+
+    def slow(self, name, elapsed, args):
+        self.callback(name, elapsed, args, None)
+
+    @staticmethod
+    def print_report(name, seconds, args, stats):
+        print(f"slow {name}: {seconds * 1e3:.1f} ms", file=sys.stderr)
+        if stats is not None:
+            stats.stream = sys.stderr
+            stats.sort_stats("cumulative").print_stats(12)
+
+# Registry
+def _label_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}  # (name, labels) -> total
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.gauges = {}  # name -> (callable, label name); read at export time
+        self.help = {}  # name -> description
+        self.sampler = None
+        self._probes = {}  # (owner, attribute) -> (metric name, after hook)
+        self._originals = {}  # (owner, attribute) -> the unwrapped function while enabled
+        self.lock = threading.RLock()  # re-entrant: gauges read during export may record too
+
+    # Switching on and off
+    def enable(self, sampler=None):
+        if sampler is not None:
+            self.sampler = sampler
+        if not self.enabled:
+            self.enabled = True
+            for key in self._probes:
+                self._wrap(*key)
+
+    def disable(self):
+        self.enabled = False
+        for (owner, attribute), original in self._originals.items():
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    # Recording
+    def describe(self, name, text):
+        self.help.setdefault(name, text)
+
+    def inc(self, name, n=1, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def record(self, name, elapsed, labels=(), args=()):
+        """A finished timing: histogram plus the slow-query callback when over threshold."""
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(TIME_BUCKETS)
+            histogram.observe(elapsed)
+        if self.sampler is not None and elapsed >= self.sampler.threshold:
+            self.sampler.slow(name, elapsed, args)
+
+    def timer(self, name, **labels):
+        """Context manager timing its block into histogram name (a no-op while disabled)."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, name, _label_key(labels))
+
+    def gauge(self, name, read, label=None, text=None):
+        """Register a value read at export time: read() returns a number, or {label value: number}."""
+        self.gauges[name] = (read, label)
+        if text:
+            self.describe(name, text)
+
+    # Method instrumentation
+    def instrument(self, owner, attribute, name, text=None, after=None):
+        """Time owner.attribute into histogram name while enabled. after(instance, result, args)
+        runs after each call, e.g. to derive domain statistics from the result."""
+        self._probes[(owner, attribute)] = (name, after)
+        if text:
+            self.describe(name, text)
+        if self.enabled:
+            self._wrap(owner, attribute)
+
+    def _wrap(self, owner, attribute):
+        if (owner, attribute) in self._originals:
+            return
+        fn = owner.__dict__[attribute]
+        name, after = self._probes[(owner, attribute)]
+        registry = self
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            sampler = registry.sampler
+            if sampler is not None and sampler.wants():
+                result = sampler.run(registry, name, fn, args, kwargs)
+            else:
+                start = time.perf_counter()
+                result = fn(*args, **kwargs)
+                registry.record(name, time.perf_counter() - start, (), args)
+            if after is not None:
+                after(args[0], result, args[1:])
+            return result
+
+        self._originals[(owner, attribute)] = fn
+        setattr(owner, attribute, timed)
+
+    # Moving metrics between processes
+    def drain(self):
+        """Picklable (counters, histograms) recorded since the last drain; clears them."""
+        with self.lock:
+            state = (self.counters, self.histograms)
+            self.counters, self.histograms = {}, {}
+        return state
+
+    def merge(self, state):
+        counters, histograms = state
+        with self.lock:
+            for key, n in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + n
+            for key, other in histograms.items():
+                mine = self.histograms.get(key)
+                if mine is None:
+                    self.histograms[key] = mine = Histogram(other.buckets)
+                mine.merge(other)
+
+    def export(self, fmt="text"):
+        with self.lock:
+            return EXPORTERS[fmt](self)
+
+    def read_gauges(self):
+        """{(name, labels): value} from the registered gauge callables."""
+        values = {}
+        for name, (read, label) in self.gauges.items():
+            value = read()
+            if isinstance(value, dict):
+                for label_value, v in value.items():
+                    values[(name, ((label, str(label_value)),))] = v
+            else:
+                values[(name, ())] = value
+        return values
+
+# Exporters (format name -> function(registry) -> str)
+EXPORTERS = {}
+
+def exporter(fmt):
+    """Register an export format: @exporter("json") def dump(registry): ..."""
+    def register(fn):
+        EXPORTERS[fmt] = fn
+        return fn
+    return register
+
+def _labels_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+@exporter("text")
+def export_text(registry):
+    lines = []
+    for (name, labels), value in sorted(registry.counters.items()):
+        lines.append(f"{name}{_labels_text(labels)} {value}")
+    for (name, labels), value in sorted(registry.read_gauges().items()):
+        lines.append(f"{name}{_labels_text(labels)} {value}")
+    for (name, labels), h in sorted(registry.histograms.items()):
+        if not h.count:
+            continue
+        scale, unit = (1e3, "ms") if h.buckets == TIME_BUCKETS else (1, "")
+        lines.append(f"{name}{_labels_text(labels)} count={h.count} mean={h.sum / h.count * scale:.3g}{unit} "
+                     f"p50<={h.quantile(0.5) * scale:.3g}{unit} p90<={h.quantile(0.9) * scale:.3g}{unit} "
+                     f"p99<={h.quantile(0.99) * scale:.3g}{unit} max={h.max * scale:.3g}{unit}")
+    return "\n".join(lines) + "\n"
+
+@exporter("prometheus")
+def export_prometheus(registry):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines, declared = [], set()
+
+    def declare(name, kind):
+        if name not in declared:
+            declared.add(name)
+            if name in registry.help:
+                lines.append(f"# HELP {PREFIX}{name} {registry.help[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    for (name, labels), value in sorted(registry.counters.items()):
+        declare(name, "counter")
+        lines.append(f"{PREFIX}{name}{_labels_text(labels)} {value}")
+    for (name, labels), value in sorted(registry.read_gauges().items()):
+        declare(name, "gauge")
+        lines.append(f"{PREFIX}{name}{_labels_text(labels)} {value}")
+    for (name, labels), h in sorted(registry.histograms.items()):
+        declare(name, "histogram")
+        cumulative = 0
+        for bound, c in zip(h.buckets, h.counts):
+            cumulative += c
+            lines.append(f"{PREFIX}{name}_bucket{_labels_text(labels, [('le', f'{bound:g}')])} {cumulative}")
+        lines.append(f"{PREFIX}{name}_bucket{_labels_text(labels, [('le', '+Inf')])} {h.count}")
+        lines.append(f"{PREFIX}{name}_sum{_labels_text(labels)} {h.sum:g}")
+        lines.append(f"{PREFIX}{name}_count{_labels_text(labels)} {h.count}")
+    return "\n".join(lines) + "\n"
+
+# The process-wide registry used by navigator_core and the apps
+METRICS = Registry()
+
+def _forked():
+    # The child's copy of the lock may have been held by another parent thread at the fork
+    METRICS.lock = threading.RLock()
+    METRICS.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forked)
@@ -0,0 +1,299 @@
+"""Headless HTTP/JSON service for Smart Care Navigator (no tkinter import).
+
+    python navigator_service.py --port 8080
+
+Endpoints (GET parameters go in the query string, POST parameters in a JSON body):
+    GET  /nearest?location=<node>&k=3 or ?x=..&y=..  nearest hospitals plus a recommendation
+    POST /book   {"hospital", "name", "priority", "details"}  -> {"id"}
+    POST /next   {"hospital"}  -> the patient served next, or null
+    GET  /queue?hospital=..&offset=0&limit=50  -> one page of the queue and its depths
+    POST /roads  {"updates": [[a, b, km or null], ...]}  live lengths / closures (null closes)
+    GET  /health
+    GET  /metrics?format=prometheus  counters and latency histograms (with --metrics)
+
+Searches run on the RoutingExecutor process pool; queue operations for a hospital are
+serialized by that hospital's asyncio.Lock. The service shares the app's data directory
+layout (graph snapshot, checkpoint, journal); do not point both at one directory at once.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+from urllib.parse import parse_qsl, urlsplit
+
+from navigator_core import (AssignmentEngine, BucketAppointmentManager, Graph, RoutingExecutor,
+                            book_demo_appointments, populate_demo_graph)
+from navigator_metrics import EXPORTERS, METRICS, SlowQuerySampler
+from navigator_store import Storage
+
+MAX_BODY = 64 * 1024
+SYNC_SECONDS = 0.1  # how often a partial journal batch is checked for its fsync deadline
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _required(params, key):
+    if key not in params:
+        raise HTTPError(400, f"missing parameter {key!r}")
+    return params[key]
+
+def _integer(params, key, default=None):
+    value = params.get(key, default)
+    if value is None:
+        raise HTTPError(400, f"missing parameter {key!r}")
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{key} must be an integer") from None
+
+class NavigatorService:
+    """Routes HTTP requests to the graph, the appointment managers and the worker pool."""
+    def __init__(self, graph, managers, router, assigner, storage=None):
+        self.graph = graph
+        self.managers = managers  # hospital -> appointment manager
+        self.router = router
+        self.assigner = assigner
+        self.storage = storage
+        self.locks = {h: asyncio.Lock() for h in managers}
+        self.routes = {
+            ("GET", "/nearest"): self.nearest,
+            ("POST", "/book"): self.book,
+            ("POST", "/next"): self.next_patient,
+            ("GET", "/queue"): self.queue,
+            ("POST", "/roads"): self.roads,
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    def _hospital(self, params):
+        hospital = _required(params, "hospital")
+        if hospital not in self.managers:
+            raise HTTPError(404, f"unknown hospital {hospital!r}")
+        return hospital
+
+    async def nearest(self, params):
+        k = _integer(params, "k", self.assigner.candidates)
+        location = params.get("location")
+        if "x" in params and "y" in params:
+            try:
+                x, y = float(params["x"]), float(params["y"])
+            except (TypeError, ValueError):
+                raise HTTPError(400, "x and y must be numbers") from None
+            location = location or f"({x:g}, {y:g})"
+            overlay = self.graph.snap(location, x, y)
+        elif location is None:
+            raise HTTPError(400, "give a location node or x and y")
+        elif location not in self.graph.adj:
+            raise HTTPError(404, f"unknown location {location!r}")
+        else:
+            overlay = None
+        found = await asyncio.wrap_future(self.router.submit("nearest_hospitals", location, k, overlay))
+        priority = _integer(params, "priority", 1)
+        scores = self.assigner.score(found, priority) if found else []
+        return {
+            "location": location,
+            "hospitals": [{"hospital": h, "distance": d, "route": route} for h, d, route in found],
+            "recommended": scores[0]._asdict() if scores else None,
+        }
+
+    async def book(self, params):
+        hospital = self._hospital(params)
+        name = str(_required(params, "name")).strip()
+        if not name:
+            raise HTTPError(400, "name must not be empty")
+        priority = _integer(params, "priority")
+        async with self.locks[hospital]:
+            try:
+                appt_id = self.managers[hospital].book(name, priority, str(params.get("details", "")))
+            except ValueError as e:
+                raise HTTPError(400, str(e)) from None
+        return {"hospital": hospital, "id": appt_id}
+
+    async def next_patient(self, params):
+        hospital = self._hospital(params)
+        async with self.locks[hospital]:
+            entry = self.managers[hospital].pop_entry()
+        if entry is None:
+            return {"hospital": hospital, "patient": None}
+        p, appt_id, name, details = entry
+        return {"hospital": hospital, "patient": {"id": appt_id, "priority": p, "name": name, "details": details}}
+
+    async def queue(self, params):
+        hospital = self._hospital(params)
+        offset = max(_integer(params, "offset", 0), 0)
+        limit = min(max(_integer(params, "limit", 50), 0), 1000)
+        async with self.locks[hospital]:
+            manager = self.managers[hospital]
+            page = manager.peek(limit, offset)
+            depths = manager.depths()
+            total = len(manager)
+        return {
+            "hospital": hospital,
+            "total": total,
+            "depths": {str(p): c for p, c in depths.items()},
+            "entries": [{"id": i, "priority": p, "name": n, "details": d} for p, i, n, d in page],
+        }
+
+    async def roads(self, params):
+        updates = _required(params, "updates")
+        try:
+            batch = [(a, b, None if km is None else float(km)) for a, b, km in updates]
+            changed = self.graph.update_roads(batch)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, f"updates must be [a, b, km or null] triples: {e}") from None
+        except KeyError as e:
+            raise HTTPError(404, str(e.args[0])) from None
+        # The worker pool restarts on the new weights with its next query
+        return {"changed": changed, "version": self.graph.version}
+
+    async def health(self, params):
+        return {"status": "ok", "nodes": len(self.graph.adj), "hospitals": len(self.graph.hospitals)}
+
+    async def metrics(self, params):
+        if not METRICS.enabled:
+            raise HTTPError(404, "metrics are off; start the service with --metrics")
+        fmt = params.get("format", "prometheus")
+        if fmt not in EXPORTERS:
+            raise HTTPError(400, f"format must be one of {', '.join(EXPORTERS)}")
+        return METRICS.export(fmt)  # plain text, not JSON
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HTTPError(405, f"{method} not allowed on {url.path}")
+            raise HTTPError(404, f"no endpoint {url.path}")
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "body is not valid JSON") from None
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "body must be a JSON object")
+            params.update(payload)
+        return await handler(params)
+
+    async def handle(self, reader, writer):
+        """One client connection; HTTP/1.1 keep-alive until the client closes."""
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                try:
+                    method, target, version = request.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                try:
+                    if not 0 <= length <= MAX_BODY:
+                        keep_alive = False  # the body cannot be skipped reliably
+                        raise HTTPError(413 if length > MAX_BODY else 400, "bad or oversized request body")
+                    body = await reader.readexactly(length) if length else b""
+                    status, result = 200, await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, result = e.status, {"error": str(e)}
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:  # keep serving other requests
+                    status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+                if isinstance(result, str):
+                    payload, content_type = result.encode("utf-8"), "text/plain; version=0.0.4"
+                else:
+                    payload, content_type = json.dumps(result, ensure_ascii=False).encode("utf-8"), "application/json"
+                writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                             f"Content-Type: {content_type}\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def sync_journal(self):
+        while True:
+            await asyncio.sleep(SYNC_SECONDS)
+            self.storage.sync_if_due()
+
+def open_service(data_dir, workers=None):
+    """Load (or seed with demo data) the graph and queues in data_dir and start the pool."""
+    storage = Storage(data_dir)
+    graph = storage.load_graph()
+    if graph is None:
+        graph = Graph()
+        populate_demo_graph(graph)
+        storage.save_graph(graph)
+    managers = storage.open_queues(sorted(graph.hospitals), BucketAppointmentManager)
+    if storage.fresh:
+        book_demo_appointments(managers)
+    graph.freeze()
+    graph.precompute_hospital_partition()
+    router = RoutingExecutor(graph, workers)
+    return NavigatorService(graph, managers, router, AssignmentEngine(graph, managers), storage)
+
+async def serve(host, port, data_dir, workers=None, metrics=False, slow_ms=None):
+    service = open_service(data_dir, workers)
+    if metrics:
+        METRICS.enable(SlowQuerySampler(slow_ms / 1e3) if slow_ms is not None else None)
+        METRICS.gauge("queue_depth", lambda: {h: len(m) for h, m in service.managers.items()}, "hospital",
+                      "Patients waiting per hospital")
+    server = await asyncio.start_server(service.handle, host, port)
+    syncer = asyncio.create_task(service.sync_journal())
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):  # e.g. Windows
+            pass
+    address = server.sockets[0].getsockname()
+    print(f"listening on http://{address[0]}:{address[1]}", flush=True)
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        syncer.cancel()
+        service.router.shutdown()
+        service.storage.checkpoint()
+        service.storage.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    parser.add_argument("--data", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+    parser.add_argument("--workers", type=int, default=None, help="routing worker processes")
+    parser.add_argument("--metrics", action="store_true", help="record metrics and serve them on /metrics")
+    parser.add_argument("--slow-ms", type=float, default=None,
+                        help="with --metrics, report slower operations on stderr (one in 100 profiled)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.data, args.workers, args.metrics, args.slow_ms))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""Sharded appointment queues: hospitals spread over worker processes by consistent hashing.
+
+    queues = ShardedQueues(hospitals, workers=4)
+    appt_id = queues["Civil Hospital"].book("Ali", 1, "Chest Pain")
+    with queues.batch():  # one message per worker instead of one round trip per call
+        replies = [queues[h].book(name, p, details) for h, name, p, details in bookings]
+    ids = [r.result() for r in replies]
+    ids = queues.book_many(hospitals, names, priorities, details)  # bulk rows, sent as columns
+    queues.add_worker()  # moves only the hospitals the new worker takes over
+    queues.close()
+
+Each worker owns the queues of the hospitals that hash to it on the ring and runs them with
+the usual managers (BucketAppointmentManager by default), so bookings for different shards
+run on different cores. Requests travel as marshal-encoded batches of (op, hospital, *args)
+tuples over a Pipe; each worker has at most one batch in flight, so a worker busy with one
+batch never holds up the others. The proxies keep the AppointmentManager interface; calls
+outside batch() are sent at once and wait for their answer. For bulk traffic, book_many()
+and pop_many() take the rows as columns and send each worker its rows as a few column
+requests, so the caller does no per-row proxy call, Reply or tuple work and a worker, not
+the caller, is the bottleneck.
+
+Sharded queues live only as long as their workers: the journal and checkpoints of
+navigator_store stay with the in-process managers.
+"""
+import bisect
+import hashlib
+import marshal
+import multiprocessing
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+
+from navigator_core import BucketAppointmentManager
+
+BATCH = 512  # calls buffered per worker before a batch is sent without waiting for flush()
+ROWS = 4096  # rows per column request of book_many()/pop_many()
+REPLICAS = 64  # ring points per worker; more points, more even shares
+ERRORS = {"ValueError": ValueError, "KeyError": KeyError, "TypeError": TypeError}
+
+# Consistent-hash ring
+class HashRing:
+    """Each shard owns `replicas` points on a 64-bit ring; a key belongs to the shard owning the
+    first point at or after the key's hash. Adding a shard takes keys only from the arcs its
+    points split, and removing one hands only its own keys to the next points along."""
+    def __init__(self, replicas=REPLICAS):
+        self.replicas = replicas
+        self.points = []  # sorted hashes
+        self.shards = []  # shard owning points[i]
+
+    @staticmethod
+    def _hash(text):
+        return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def add(self, shard):
+        for i in range(self.replicas):
+            point = self._hash(f"shard {shard} #{i}")
+            j = bisect.bisect_left(self.points, point)
+            self.points.insert(j, point)
+            self.shards.insert(j, shard)
+
+    def remove(self, shard):
+        kept = [(p, s) for p, s in zip(self.points, self.shards) if s != shard]
+        self.points = [p for p, _ in kept]
+        self.shards = [s for _, s in kept]
+
+    def owner(self, key):
+        if not self.points:
+            raise LookupError("the ring has no shards")
+        return self.shards[bisect.bisect_left(self.points, self._hash(key)) % len(self.points)]
+
+# Worker process
+def _export(managers, hospital):
+    # Hand a queue over to another worker: its entries in queue order plus the ID counter
+    manager = managers.pop(hospital)
+    return manager.peek_all(), manager.counter
+
+def _rows(call, columns):
+    # Run call over the rows of columns; a failing row gets None and its error is reported
+    # by row number while the rest still run
+    results, errors = [], {}
+    rows = zip(*columns)
+    while True:
+        try:
+            for row in rows:
+                results.append(call(*row))
+            return results, errors
+        except Exception as e:
+            errors[len(results)] = (type(e).__name__, str(e))
+            results.append(None)
+
+WORKER_OPS = {
+    "B": lambda m, h, *args: m[h].book(*args),
+    "P": lambda m, h: m[h].pop_entry(),
+    "N": lambda m, h: m[h].pop_next(),
+    "A": lambda m, h: m[h].peek_all(),
+    "K": lambda m, h, n, offset: m[h].peek(n, offset),
+    "X": lambda m, h, appt_id: m[h].cancel(appt_id),
+    "U": lambda m, h, appt_id, priority: m[h].update_priority(appt_id, priority),
+    "F": lambda m, h, name: m[h].find(name),
+    "D": lambda m, h: m[h].depths(),
+    "L": lambda m, h: len(m[h]),
+    "E": _export,
+    # Column requests: the hospital field holds one hospital per row
+    "b": lambda m, hospitals, *columns: _rows(lambda h, name, priority, details: m[h].book(name, priority, details),
+                                               (hospitals,) + columns),
+    "n": lambda m, hospitals: _rows(lambda h: m[h].pop_next(), (hospitals,)),
+}
+
+def _shard_worker(conn, factory):
+    """Serve batches until the pipe closes or a None batch arrives; replies are
+    (results, {index: (error type, message)}) in request order."""
+    managers = {}
+
+    def create(m, h):
+        if h not in m:
+            m[h] = factory()
+
+    def restore(m, h, entries, counter):
+        create(m, h)
+        m[h].restore(entries, counter)
+
+    ops = dict(WORKER_OPS, **{"+": create, "R": restore})
+    while True:
+        try:
+            requests = marshal.loads(conn.recv_bytes())
+        except EOFError:
+            break
+        if requests is None:
+            break
+        results, errors = [], {}
+        for i, (op, hospital, *args) in enumerate(requests):
+            try:
+                results.append(ops[op](managers, hospital, *args))
+            except Exception as e:  # reported to the caller, the worker keeps serving
+                results.append(None)
+                errors[i] = (type(e).__name__, str(e))
+        conn.send_bytes(marshal.dumps((results, errors)))
+    conn.close()
+
+class _Shard:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.requests = []  # buffered, not yet sent
+        self.replies = []  # Reply objects for self.requests
+        self.in_flight = None  # Reply objects of the batch the worker is running
+
+# Results and per-hospital proxies
+class Reply:
+    """Answer to a call made inside ShardedQueues.batch(); result() is valid once the batch is sent."""
+    __slots__ = ("value", "error", "done")
+
+    def __init__(self):
+        self.done = False
+
+    def result(self):
+        if not self.done:
+            raise RuntimeError("the batch has not been sent yet")
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+class QueueProxy:
+    """AppointmentManager interface for one hospital's queue held by a shard worker."""
+    def __init__(self, shards, hospital):
+        self.shards = shards
+        self.hospital = hospital
+
+    def __len__(self):
+        return self.shards._call(self.hospital, "L", wait=True)
+
+    def book(self, name, priority, details=""):
+        """Queue a patient and return the appointment ID."""
+        return self.shards._call(self.hospital, "B", name, priority, details)
+
+    def pop_entry(self):
+        return self.shards._call(self.hospital, "P")
+
+    def pop_next(self):
+        return self.shards._call(self.hospital, "N")
+
+    def peek_all(self):
+        return self.shards._call(self.hospital, "A")
+
+    def peek(self, n, offset=0):
+        return self.shards._call(self.hospital, "K", n, offset)
+
+    def cancel(self, appt_id):
+        return self.shards._call(self.hospital, "X", appt_id)
+
+    def update_priority(self, appt_id, priority):
+        return self.shards._call(self.hospital, "U", appt_id, priority)
+
+    def find(self, name):
+        return self.shards._call(self.hospital, "F", name)
+
+    def depths(self):
+        return self.shards._call(self.hospital, "D")
+
+# Sharded hospital -> queue mapping
+class ShardedQueues(Mapping):
+    """hospital -> QueueProxy, with the queues spread over `workers` processes (one per core by
+    default). factory() makes an empty manager inside a worker and must be picklable."""
+    def __init__(self, hospitals=(), workers=None, factory=BucketAppointmentManager, mp_context=None,
+                 replicas=REPLICAS):
+        self.factory = factory
+        self.context = mp_context or multiprocessing.get_context()
+        self.ring = HashRing(replicas)
+        self.shards = {}  # worker number -> _Shard
+        self.owner = {}  # hospital -> worker number
+        self.proxies = {}
+        self.batching = 0
+        self._next_worker = 0
+        for _ in range(workers or os.cpu_count() or 1):
+            self._start_worker()
+        with self.batch():
+            for hospital in hospitals:
+                self.add_hospital(hospital)
+
+    def __getitem__(self, hospital):
+        return self.proxies[hospital]
+
+    def __iter__(self):
+        return iter(self.proxies)
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _start_worker(self):
+        number = self._next_worker
+        self._next_worker += 1
+        conn, child = self.context.Pipe()
+        process = self.context.Process(target=_shard_worker, args=(child, self.factory), daemon=True,
+                                       name=f"queue-shard-{number}")
+        process.start()
+        child.close()
+        self.shards[number] = _Shard(process, conn)
+        self.ring.add(number)
+        return number
+
+    # Sending and receiving batches
+    def _call(self, hospital, op, *args, wait=False):
+        shard = self.shards[self.owner[hospital]]
+        reply = Reply()
+        shard.requests.append((op, hospital) + args)
+        shard.replies.append(reply)
+        if self.batching and not wait:
+            if len(shard.requests) >= BATCH:
+                self._send(shard)
+            return reply
+        self.flush()
+        return reply.result()
+
+    def _send(self, shard):
+        if shard.in_flight is not None:
+            self._receive(shard)  # one batch in flight per worker, so neither side blocks on a full pipe
+        shard.conn.send_bytes(marshal.dumps(shard.requests))
+        shard.in_flight = shard.replies
+        shard.requests, shard.replies = [], []
+
+    def _receive(self, shard):
+        results, errors = marshal.loads(shard.conn.recv_bytes())
+        for i, (reply, value) in enumerate(zip(shard.in_flight, results)):
+            reply.value = value
+            reply.error = None
+            if i in errors:
+                kind, message = errors[i]
+                reply.error = ERRORS.get(kind, RuntimeError)(message)
+            reply.done = True
+        shard.in_flight = None
+
+    def flush(self):
+        """Send every buffered call and wait for all the answers (workers run in parallel)."""
+        for shard in self.shards.values():
+            if shard.requests:
+                self._send(shard)
+        for shard in self.shards.values():
+            if shard.in_flight is not None:
+                self._receive(shard)
+
+    @contextmanager
+    def batch(self):
+        """Inside the block, proxy calls return Reply objects and are sent BATCH at a time;
+        everything still buffered is sent when the block ends."""
+        self.batching += 1
+        try:
+            yield self
+        finally:
+            self.batching -= 1
+            if not self.batching:
+                self.flush()
+
+    # Column requests
+    def book_many(self, hospitals, names, priorities, details=None):
+        """Book row i = (hospitals[i], names[i], priorities[i], details[i]) for every i and
+        return the appointment IDs in row order, as if book() were called row by row. If rows
+        are rejected the others are still booked and the first row's error is raised."""
+        hospitals = list(hospitals)
+        details = [""] * len(hospitals) if details is None else details
+        return self._columns("b", hospitals, names, priorities, details)
+
+    def pop_many(self, hospitals):
+        """pop_next() once per listed hospital (a hospital may repeat); the (priority, name,
+        details) answers or None, in order."""
+        return self._columns("n", hospitals)
+
+    def _columns(self, op, hospitals, *columns):
+        # Group the rows by worker (the sort is stable, so each hospital keeps its row order),
+        # send them ROWS at a time round-robin over the workers so every worker starts early,
+        # then put the answers back in row order
+        hospitals = list(hospitals)
+        owners = list(map(self.owner.__getitem__, hospitals))
+        order = sorted(range(len(hospitals)), key=owners.__getitem__)
+        columns = (hospitals,) + tuple(map(list, columns))
+        chunks = []  # (offset within the worker's rows, worker number, row numbers)
+        for number, rows in groupby(order, owners.__getitem__):
+            rows = list(rows)
+            chunks += [(start, number, rows[start:start + ROWS]) for start in range(0, len(rows), ROWS)]
+        chunks.sort(key=itemgetter(0))
+        sent = []
+        for _, number, rows in chunks:
+            shard = self.shards[number]
+            reply = Reply()
+            shard.requests.append((op,) + tuple([[column[i] for i in rows] for column in columns]))
+            shard.replies.append(reply)
+            self._send(shard)
+            sent.append((rows, reply))
+        self.flush()
+        results, failed = [None] * len(hospitals), []
+        for rows, reply in sent:
+            values, errors = reply.result()
+            for i, value in zip(rows, values):
+                results[i] = value
+            failed += [(rows[row], kind, message) for row, (kind, message) in errors.items()]
+        if failed:
+            i, kind, message = min(failed)
+            raise ERRORS.get(kind, RuntimeError)(f"row {i}: {message}")
+        return results
+
+    # Membership and rebalancing
+    def add_hospital(self, hospital):
+        """Create an empty queue on the hospital's shard; no other queue moves."""
+        if hospital not in self.proxies:
+            self.owner[hospital] = self.ring.owner(hospital)
+            self.proxies[hospital] = QueueProxy(self, hospital)
+            self._call(hospital, "+")
+        return self.proxies[hospital]
+
+    def add_worker(self):
+        """Start another worker and move to it the hospitals whose ring arc it took over
+        (about 1 / workers of them). Returns the moved hospitals."""
+        self.flush()
+        self._start_worker()
+        return self._rebalance()
+
+    def remove_worker(self, number=None):
+        """Stop a worker (the newest by default) after handing its hospitals to the next
+        points on the ring. Returns the moved hospitals."""
+        if len(self.shards) < 2:
+            raise ValueError("cannot remove the last worker")
+        number = max(self.shards) if number is None else number
+        self.flush()
+        self.ring.remove(number)
+        moved = self._rebalance()
+        self._stop(self.shards.pop(number))
+        return moved
+
+    def _rebalance(self):
+        moves = [(h, new) for h, old in self.owner.items() if (new := self.ring.owner(h)) != old]
+        with self.batch():
+            exports = [(h, new, self._call(h, "E")) for h, new in moves]
+        for h, new, _ in exports:
+            self.owner[h] = new
+        with self.batch():
+            for h, _, reply in exports:
+                self._call(h, "R", *reply.result())
+        return [h for h, _ in moves]
+
+    def distribution(self):
+        """{worker number: hospitals it owns}"""
+        counts = dict.fromkeys(self.shards, 0)
+        for number in self.owner.values():
+            counts[number] += 1
+        return counts
+
+    def _stop(self, shard):
+        try:
+            shard.conn.send_bytes(marshal.dumps(None))
+        except OSError:
+            pass
+        shard.process.join(5)
+        shard.conn.close()
+
+    def close(self):
+        """Stop the workers; their queues are gone afterwards."""
+        if self.shards:
+            self.flush()
+        for shard in self.shards.values():
+            self._stop(shard)
+        self.shards.clear()
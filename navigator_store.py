@@ -0,0 +1,530 @@
+"""Durable storage for Smart Care Navigator.
+
+The road graph is saved as one binary snapshot whose CSR arrays are memory-mapped back on
+load instead of being parsed. Appointment queues are made durable by an append-only journal
+(fsync'd in batches) plus periodic binary checkpoints, so a restart loads the last checkpoint
+and replays only the journal written after it. Large road networks come in from CSV/edge-list
+files through GraphImporter, which builds the CSR arrays directly.
+"""
+import csv
+import gc
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from itertools import accumulate, islice, repeat
+from operator import itemgetter
+
+from navigator_core import CSRGraph, Graph
+
+# Graph snapshot
+GRAPH_MAGIC = b"SCNGRPH1"
+_GRAPH_HEADER = struct.Struct("=QQQB7x")  # nodes, edge slots, name bytes, integral flag
+
+# Queue checkpoint
+QUEUES_MAGIC = b"SCNQUEU1"
+_QUEUES_HEADER = struct.Struct("=QQ")  # journal generation, hospitals
+_QUEUE_HEADER = struct.Struct("=QQQQQ")  # ID counter, entries, hospital/name/details bytes
+
+def _fsync_replace(tmp, path):
+    os.replace(tmp, path)
+    if hasattr(os, "O_DIRECTORY"):  # make the rename itself durable
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def save_graph(graph, path):
+    """Write the frozen graph as one file: header, 8-byte aligned CSR/coordinate arrays,
+    hospital flags, then the NUL-separated node names."""
+    csr = graph.freeze()
+    names = "\0".join(csr.names).encode("utf-8")
+    n = len(csr)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(GRAPH_MAGIC)
+        f.write(_GRAPH_HEADER.pack(n, len(csr.targets), len(names), bool(csr.integral)))
+        for part in (csr.offsets, csr.targets, csr.weights, csr.xs, csr.ys, csr.is_hospital):
+            f.write(part)
+        f.write(bytes(-n % 8))
+        f.write(names)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_replace(tmp, path)
+
+def load_graph(path):
+    """Graph over a private (copy-on-write) mapping of a save_graph() file. The arrays are
+    memoryviews into the mapping and the graph's views over them are lazy, so loading only
+    decodes the node names."""
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    view = memoryview(buf)
+    if view[:len(GRAPH_MAGIC)] != GRAPH_MAGIC:
+        raise ValueError(f"{path} is not a graph snapshot")
+    n, m, name_bytes, integral = _GRAPH_HEADER.unpack_from(buf, len(GRAPH_MAGIC))
+    pos = len(GRAPH_MAGIC) + _GRAPH_HEADER.size
+
+    def take(size, fmt):
+        nonlocal pos
+        part = view[pos:pos + size].cast(fmt)
+        pos += size
+        return part
+
+    offsets = take(8 * (n + 1), 'q')
+    targets = take(8 * m, 'q')
+    weights = take(8 * m, 'd')
+    xs = take(8 * n, 'd')
+    ys = take(8 * n, 'd')
+    is_hospital = take(n, 'B')
+    pos += -n % 8
+    if pos + name_bytes != len(buf):
+        raise ValueError(f"{path} is truncated or corrupt")
+    names = bytes(view[pos:]).decode("utf-8").split("\0") if n else []
+    csr = CSRGraph(names, offsets, targets, weights, bool(integral), is_hospital, xs, ys)
+    return Graph.from_csr(csr)
+
+@contextmanager
+def _no_gc():
+    # Millions of new, long-lived objects: cyclic GC passes would only rescan them
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if collecting:
+            gc.enable()
+
+def _join_text(column):
+    text = "\0".join(column)
+    if text.count("\0") != max(len(column) - 1, 0):
+        raise ValueError("patient names and details cannot contain NUL characters")
+    return text.encode("utf-8")
+
+def _split_text(data, count):
+    return str(data, "utf-8").split("\0") if count else []
+
+def write_queues(f, generation, managers):
+    """Checkpoint: header, then per hospital its counter, its queue in queue order as columns
+    (int64 priorities and IDs, NUL-separated names and details) and its name."""
+    f.write(QUEUES_MAGIC)
+    f.write(_QUEUES_HEADER.pack(generation, len(managers)))
+    for hospital, manager in managers.items():
+        entries = manager.peek_all()
+        priorities, ids, names, details = (list(map(itemgetter(i), entries)) for i in range(4))
+        hospital, names, details = hospital.encode("utf-8"), _join_text(names), _join_text(details)
+        f.write(_QUEUE_HEADER.pack(manager.counter, len(ids), len(hospital), len(names), len(details)))
+        f.write(array('q', priorities))
+        f.write(array('q', ids))
+        f.write(hospital)
+        f.write(names)
+        f.write(details)
+
+def read_queues(path):
+    """Journal generation and a list of (hospital, counter, entries) from write_queues()."""
+    with open(path, "rb") as f:
+        data = memoryview(f.read())
+    if data[:len(QUEUES_MAGIC)] != QUEUES_MAGIC:
+        raise ValueError(f"{path} is not a queue checkpoint")
+    generation, count = _QUEUES_HEADER.unpack_from(data, len(QUEUES_MAGIC))
+    pos = len(QUEUES_MAGIC) + _QUEUES_HEADER.size
+    queues = []
+    for _ in range(count):
+        counter, n, hospital_bytes, name_bytes, detail_bytes = _QUEUE_HEADER.unpack_from(data, pos)
+        pos += _QUEUE_HEADER.size
+        columns = []
+        for size in (8 * n, 8 * n, hospital_bytes, name_bytes, detail_bytes):
+            columns.append(data[pos:pos + size])
+            pos += size
+        if pos > len(data):
+            raise ValueError(f"{path} is truncated or corrupt")
+        priorities, ids, hospital, names, details = columns
+        names, details = _split_text(names, n), _split_text(details, n)
+        if len(names) != n or len(details) != n:
+            raise ValueError(f"{path} is truncated or corrupt")
+        entries = zip(priorities.cast('q').tolist(), ids.cast('q').tolist(), names, details)
+        queues.append((str(hospital, "utf-8"), counter, entries))
+    return generation, queues
+
+# Appointment journal
+class AppointmentJournal:
+    """Append-only log of queue changes, one compact JSON array per line:
+    ["B", hospital, id, priority, name, details] booked, ["X", hospital, id] removed (served or
+    cancelled), ["U", hospital, id, priority] re-prioritized or promoted by aging. Records are buffered and fsync'd
+    once sync_every records or sync_interval seconds have accumulated, so a crash loses at most
+    that batch."""
+    def __init__(self, path, sync_every=256, sync_interval=0.5):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.file = open(path, "ab")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self.file.write(line.encode("utf-8"))
+        self.pending += 1
+        if self.pending >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Flush and fsync buffered records (a no-op when nothing is pending)."""
+        if self.pending:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def sync_if_due(self):
+        """Sync a partial batch once it is sync_interval old; for callers with an idle loop."""
+        if self.pending and time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    @staticmethod
+    def replay(path):
+        """Yield the journal's records. A torn final line (crash mid-write) is cut off."""
+        if not os.path.exists(path):
+            return
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good += len(line)
+                yield record
+        if good != os.path.getsize(path):
+            with open(path, "r+b") as f:
+                f.truncate(good)
+
+class JournaledManager:
+    """Appointment manager wrapper that journals every change; reads pass straight through."""
+    def __init__(self, manager, journal, hospital):
+        self.manager = manager
+        self.journal = journal
+        self.hospital = hospital
+        if hasattr(manager, "on_promote"):
+            manager.on_promote = self._promoted
+
+    def _promoted(self, appt_id, priority):
+        # Replaying the promotion as a re-prioritization puts the patient at the same place
+        self.journal.append(["U", self.hospital, appt_id, priority])
+
+    def __getattr__(self, attr):
+        return getattr(self.manager, attr)
+
+    def __len__(self):
+        return len(self.manager)
+
+    def book(self, name, priority, details=""):
+        appt_id = self.manager.book(name, priority, details)
+        self.journal.append(["B", self.hospital, appt_id, priority, name, details])
+        return appt_id
+
+    def pop_entry(self):
+        entry = self.manager.pop_entry()
+        if entry is not None:
+            self.journal.append(["X", self.hospital, entry[1]])
+        return entry
+
+    def pop_next(self):
+        entry = self.pop_entry()
+        if entry is None:
+            return None
+        p, _, name, details = entry
+        return (p, name, details)
+
+    def cancel(self, appt_id):
+        removed = self.manager.cancel(appt_id)
+        if removed is not None:
+            self.journal.append(["X", self.hospital, appt_id])
+        return removed
+
+    def update_priority(self, appt_id, priority):
+        moved = self.manager.update_priority(appt_id, priority)
+        if moved:
+            self.journal.append(["U", self.hospital, appt_id, priority])
+        return moved
+
+# Storage directory
+class Storage:
+    """One directory holding graph.bin, the queues checkpoint (see write_queues) and the
+    current journal. The checkpoint names the journal generation that follows it; checkpoint() writes a new
+    checkpoint, starts the next generation and deletes the old journal, so a crash at any
+    point leaves either the old pair or the new pair intact."""
+    GRAPH = "graph.bin"
+    QUEUES = "queues.ckpt"
+
+    def __init__(self, directory, sync_every=256, sync_interval=0.5):
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.managers = {}  # hospital -> unwrapped manager
+        self.queues = {}  # hospital -> JournaledManager
+        self.journal = None
+        self.generation = 0
+        self.fresh = True  # no checkpoint or journal existed when the queues were opened
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _journal_path(self, generation):
+        return self._path(f"journal-{generation}.log")
+
+    def load_graph(self):
+        """The saved graph, or None if nothing has been saved yet."""
+        path = self._path(self.GRAPH)
+        return load_graph(path) if os.path.exists(path) else None
+
+    def save_graph(self, graph):
+        save_graph(graph, self._path(self.GRAPH))
+
+    def _manager(self, hospital, factory):
+        if hospital not in self.managers:
+            self.managers[hospital] = factory()
+            self.queues[hospital] = JournaledManager(self.managers[hospital], None, hospital)
+        return self.managers[hospital]
+
+    def open_queues(self, hospitals, factory):
+        """Restore hospital -> manager from the checkpoint plus journal tail and return
+        journaled managers; factory() makes an empty manager."""
+        ckpt = self._path(self.QUEUES)
+        with _no_gc():
+            if os.path.exists(ckpt):
+                self.fresh = False
+                self.generation, queues = read_queues(ckpt)
+                for hospital, counter, entries in queues:
+                    self._manager(hospital, factory).restore(entries, counter)
+            journal = self._journal_path(self.generation)
+            if os.path.exists(journal):
+                self.fresh = False
+            for record in AppointmentJournal.replay(journal):
+                manager = self._manager(record[1], factory)
+                if record[0] == "B":
+                    manager.counter = record[2] - 1  # rebook under the journaled ID
+                    manager.book(record[4], record[3], record[5])
+                elif record[0] == "X":
+                    manager.cancel(record[2])
+                elif record[0] == "U":
+                    manager.update_priority(record[2], record[3])
+        for hospital in hospitals:
+            self._manager(hospital, factory)
+        self.journal = AppointmentJournal(journal, self.sync_every, self.sync_interval)
+        for queue in self.queues.values():
+            queue.journal = self.journal
+        return self.queues
+
+    def checkpoint(self):
+        """Write every queue to a new checkpoint and start an empty journal after it."""
+        generation = self.generation + 1
+        tmp = self._path(self.QUEUES + ".tmp")
+        with open(tmp, "wb") as f, _no_gc():
+            write_queues(f, generation, self.managers)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_replace(tmp, self._path(self.QUEUES))
+        old = self.journal
+        self.journal = AppointmentJournal(self._journal_path(generation), self.sync_every, self.sync_interval)
+        for queue in self.queues.values():
+            queue.journal = self.journal
+        if old is not None:
+            old.close()
+            os.remove(old.path)
+        self.generation = generation
+
+    def sync(self):
+        if self.journal is not None:
+            self.journal.sync()
+
+    def sync_if_due(self):
+        if self.journal is not None:
+            self.journal.sync_if_due()
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+# Bulk import
+IMPORT_CHUNK = 65536  # rows parsed between memory-ceiling checks
+NAME_BYTES = 160  # rough cost of one interned name: string, dict slot, list slot, coordinates
+
+class GraphImporter:
+    """Streams road files into a frozen Graph without one add_road() call per edge.
+
+    Edge rows are "a,b,distance" and node rows "name,x,y[,hospital]" (any delimiter csv
+    understands; a header row, blank lines and lines starting with # are skipped). Names are
+    interned to integer IDs as rows arrive and edges are staged in typed arrays; build() lays
+    them out as CSR with a counting sort and keeps the shortest of any parallel roads. Every
+    row is a two-way road, like add_road(), since routing relies on that. With max_bytes set,
+    staging plus the CSR about to be built is checked every chunk and MemoryError is raised
+    before the ceiling would be crossed."""
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        self.ids = {}  # name -> id, in id order
+        self.src = array('q')
+        self.dst = array('q')
+        self.weights = array('d')
+        self.positions = {}  # id -> (x, y) from node rows
+        self.hospitals = set()  # ids
+
+    def memory_estimate(self):
+        """Bytes for the staged edges and names plus the CSR arrays build() will allocate."""
+        staged = 24 * len(self.src) + NAME_BYTES * len(self.ids)
+        return staged + 8 * (len(self.ids) + 1) + 32 * len(self.src)
+
+    def _check(self):
+        if self.max_bytes is not None and self.memory_estimate() > self.max_bytes:
+            raise MemoryError(f"graph import needs about {self.memory_estimate() / 2**20:.1f} MiB, "
+                              f"over the {self.max_bytes / 2**20:.1f} MiB ceiling")
+
+    @staticmethod
+    def _rows(path, delimiter):
+        with open(path, newline="", encoding="utf-8") as f:
+            lines = (line for line in f if line[:1] != "#")
+            yield from filter(None, csv.reader(lines, delimiter=delimiter, skipinitialspace=True))
+
+    @staticmethod
+    def _chunks(rows, number):
+        # Yields lists of rows; the first row is dropped if its number column is a header
+        rows = iter(rows)
+        for first in rows:
+            try:
+                float(first[number])
+                yield [first]
+            except (IndexError, ValueError):
+                pass
+            break
+        while True:
+            chunk = list(islice(rows, IMPORT_CHUNK))
+            if not chunk:
+                return
+            yield chunk
+
+    def add_edges(self, rows):
+        """Stage (a, b, distance) rows."""
+        setdefault, ids = self.ids.setdefault, self.ids
+        src, dst, weights = self.src.append, self.dst.append, self.weights.append
+        for chunk in self._chunks(rows, 2):
+            start = len(self.weights)
+            try:
+                for row in chunk:
+                    src(setdefault(row[0], len(ids)))
+                    dst(setdefault(row[1], len(ids)))
+                    weights(float(row[2]))
+            except (IndexError, ValueError):
+                raise ValueError(f"bad edge row {row!r}") from None
+            added = self.weights[start:]
+            if any(map(math.isnan, added)) or (added and min(added) < 0):
+                raise ValueError("road distances must be non-negative numbers")
+            self._check()
+        return self
+
+    def add_nodes(self, rows):
+        """Stage (name, x, y[, hospital]) rows; a truthy fourth column marks a hospital."""
+        ids, positions = self.ids, self.positions
+        for chunk in self._chunks(rows, 1):
+            try:
+                for row in chunk:
+                    i = ids.setdefault(row[0], len(ids))
+                    positions[i] = (float(row[1]), float(row[2]))
+                    if len(row) > 3 and row[3].strip().lower() in ("1", "true", "yes", "hospital"):
+                        self.hospitals.add(i)
+            except (IndexError, ValueError):
+                raise ValueError(f"bad node row {row!r}") from None
+            self._check()
+        return self
+
+    def read_edges(self, path, delimiter=","):
+        return self.add_edges(self._rows(path, delimiter))
+
+    def read_nodes(self, path, delimiter=","):
+        return self.add_nodes(self._rows(path, delimiter))
+
+    def mark_hospitals(self, names):
+        for name in names:
+            self.hospitals.add(self.ids.setdefault(name, len(self.ids)))
+        return self
+
+    def build(self):
+        """Frozen Graph over the staged network; the staging arrays are released."""
+        self._check()
+        n = len(self.ids)
+        src, dst, wts = self.src, self.dst, self.weights
+        self.src, self.dst, self.weights = array('q'), array('q'), array('d')
+        # Counting sort of edge slots by source node
+        degree = Counter(src)
+        degree.update(dst)
+        offsets = array('q', [0])
+        offsets.extend(accumulate(map(degree.get, range(n), repeat(0))))
+        del degree
+        slots = offsets[n]
+        fill = offsets[:-1]
+        targets = array('q', bytes(8 * slots))
+        weights = array('d', bytes(8 * slots))
+        for u, v, w in zip(src, dst, wts):
+            i = fill[u]
+            targets[i] = v
+            weights[i] = w
+            fill[u] = i + 1
+            i = fill[v]
+            targets[i] = u
+            weights[i] = w
+            fill[v] = i + 1
+        integral = all(map(float.is_integer, wts))
+        del src, dst, wts, fill
+        # Compact each row in place, keeping the shortest of parallel roads and dropping self
+        # loops: seen[v] == u means v already sits in row u at slot where[v]
+        seen = array('q', [-1]) * n
+        where = array('q', bytes(8 * n))
+        out = start = 0
+        for u in range(n):
+            end = offsets[u + 1]
+            offsets[u] = out
+            seen[u] = u
+            for i in range(start, end):
+                v = targets[i]
+                if seen[v] == u:
+                    if v != u and weights[i] < weights[where[v]]:
+                        weights[where[v]] = weights[i]
+                    continue
+                seen[v] = u
+                where[v] = out
+                targets[out] = v
+                weights[out] = weights[i]
+                out += 1
+            start = end
+        offsets[n] = out
+        del targets[out:], weights[out:]
+        # Nodes without a node row get add_node's fallback layout
+        xs = array('d', bytes(8 * n))
+        ys = array('d', bytes(8 * n))
+        positions = self.positions
+        for i in range(n):
+            xs[i], ys[i] = positions.get(i) or (60 + ((i + 1) * 120) % 900, 60 + ((i + 1) * 80) % 500)
+        is_hospital = bytearray(n)
+        for i in self.hospitals:
+            is_hospital[i] = 1
+        csr = CSRGraph(list(self.ids), offsets, targets, weights, integral, is_hospital, xs, ys)
+        return Graph.from_csr(csr)
+
+def import_graph(edges, nodes=None, delimiter=",", max_bytes=None):
+    """Graph from an edge-list file and an optional node coordinate file."""
+    importer = GraphImporter(max_bytes)
+    if nodes is not None:
+        importer.read_nodes(nodes, delimiter)
+    return importer.read_edges(edges, delimiter).build()
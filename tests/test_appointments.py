@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from navigator_core import AppointmentManager, BucketAppointmentManager
+
+
+def test_same_priority_update_keeps_place():
+    for cls in (AppointmentManager, BucketAppointmentManager):
+        mgr = cls()
+        x = mgr.book("x", 2)
+        mgr.book("y", 2)
+        assert mgr.update_priority(x, 2)
+        assert [name for _, _, name, _ in mgr.peek_all()] == ["x", "y"]
+
+
+def test_update_moves_to_back_of_new_level():
+    mgr = BucketAppointmentManager()
+    mgr.book("a", 1)
+    late = mgr.book("b", 3)
+    mgr.book("c", 1)
+    mgr.update_priority(late, 1)
+    assert [name for _, _, name, _ in mgr.peek_all()] == ["a", "c", "b"]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_bucket_manager_matches_heap_manager(seed):
+    """Same operations, same answers, except that an update to another level puts the patient
+    at the back of it in the bucket queue; those updates are only compared by their result."""
+    rng = random.Random(seed)
+    heap, bucket = AppointmentManager(), BucketAppointmentManager()
+    ids = []
+    for step in range(2000):
+        r = rng.random()
+        if r < 0.45:
+            args = (f"patient {rng.randrange(300)}", rng.choice((1, 2, 3)), f"details {step}")
+            ids.append(heap.book(*args))
+            assert bucket.book(*args) == ids[-1]
+        elif r < 0.7:
+            assert heap.pop_entry() == bucket.pop_entry()
+        elif r < 0.8 and ids:
+            appt_id = rng.choice(ids)
+            assert heap.cancel(appt_id) == bucket.cancel(appt_id)
+        elif r < 0.9 and ids:
+            appt_id = rng.choice(ids)
+            record = bucket.live.get(appt_id)
+            priority = record.priority if record is not None else rng.choice((1, 2, 3))
+            assert heap.update_priority(appt_id, priority) == bucket.update_priority(appt_id, priority)
+        elif r < 0.95:
+            name = f"patient {rng.randrange(300)}"
+            assert heap.find(name) == bucket.find(name)
+        else:
+            offset, n = rng.randrange(20), rng.randrange(1, 30)
+            assert heap.peek(n, offset) == bucket.peek(n, offset)
+        assert len(heap) == len(bucket)
+        assert heap.depths() == {p: c for p, c in bucket.depths().items() if c}
+    assert heap.peek_all() == bucket.peek_all()
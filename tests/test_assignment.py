@@ -0,0 +1,45 @@
+import pytest
+
+from navigator_core import AssignmentEngine, BucketAppointmentManager, Graph
+
+
+def two_hospitals():
+    graph = Graph()
+    graph.add_node("J", 0, 0)
+    graph.add_hospital("A", 10, 0)
+    graph.add_hospital("B", 0, 25)
+    graph.add_road("J", "A", 10)
+    graph.add_road("J", "B", 25)
+    managers = {"A": BucketAppointmentManager(), "B": BucketAppointmentManager()}
+    return graph, managers
+
+
+def test_rank_adds_the_wait_of_patients_ahead():
+    graph, managers = two_hospitals()
+    for i in range(3):
+        managers["A"].book(f"urgent {i}", 2)
+    engine = AssignmentEngine(graph, managers, speed_kmh=60, service_rate=6)
+    # A standard patient waits behind the three urgent ones (30 min), an emergency does not
+    assert [(s.hospital, s.minutes) for s in engine.rank("J", 3)] == [("B", 25), ("A", 40)]
+    assert [(s.hospital, s.minutes) for s in engine.rank("J", 1)] == [("A", 10), ("B", 25)]
+    best = engine.rank("J", 3)[0]
+    assert (best.travel, best.wait, best.distance, best.route) == (25, 0, 25, ["J", "B"])
+
+
+def test_rank_uses_per_hospital_service_rates():
+    graph, managers = two_hospitals()
+    for i in range(3):
+        managers["A"].book(f"p{i}", 3)
+    engine = AssignmentEngine(graph, managers, speed_kmh=60, service_rate={"A": 60})
+    assert [(s.hospital, s.minutes) for s in engine.rank("J", 3)] == [("A", pytest.approx(13)), ("B", 25)]
+
+
+def test_wave_spreads_a_surge_and_serves_urgent_patients_first():
+    graph, managers = two_hospitals()
+    engine = AssignmentEngine(graph, managers, speed_kmh=60, service_rate=6)
+    wave = [("p3a", "J", 3, None), ("p3b", "J", 3, None), ("p1", "J", 1, None)]
+    result = engine.assign_wave(wave)
+    assert [(patient, score.hospital) for patient, score in result] == [("p3a", "A"), ("p3b", "B"), ("p1", "A")]
+    assert result[2][1].minutes == 10  # assigned first, so nobody is ahead of it
+    assert result[0][1].minutes == 20
+    assert managers["A"].depths() == {1: 0, 2: 0, 3: 0}  # a wave only plans, it books nothing
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from navigator_core import INF, Graph
+
+
+def random_city(seed, n=80):
+    rng = random.Random(seed)
+    graph = Graph()
+    names = [f"j{i}" for i in range(n)]
+    for name in names:
+        graph.add_node(name, rng.uniform(0, 900), rng.uniform(0, 500))
+    for _ in range(2 * n):
+        a, b = rng.sample(names, 2)
+        graph.add_road(a, b, rng.randint(1, 30))
+    for name in rng.sample(names, 5):
+        graph.hospitals.add(name)
+    graph.freeze()
+    return graph, names
+
+
+def nearest_by_brute_force(graph, name):
+    dist, _ = graph.dijkstra(name)
+    return min((dist[h], h) for h in graph.hospitals)
+
+
+@pytest.mark.parametrize("partition", [False, True])
+@pytest.mark.parametrize("seed", range(4))
+def test_coverage_matches_brute_force(seed, partition):
+    graph, names = random_city(seed)
+    if partition:
+        graph.precompute_hospital_partition()
+    radius = 25
+    coverage = graph.coverage(radius)
+    served, uncovered = {}, []
+    for name in names:
+        d, hospital = nearest_by_brute_force(graph, name)
+        hit = coverage.nearest(name)
+        if d > radius:
+            assert hit is None
+            uncovered.append(name)
+            continue
+        assert hit[1] == d
+        assert graph.dijkstra(hit[0])[0][name] == d  # the owner really is that close
+        served[hit[0]] = served.get(hit[0], 0) + 1
+    assert 0 < len(uncovered) < len(names)
+    assert coverage.uncovered() == uncovered
+    assert coverage.served() == served
+    assert coverage.share() == pytest.approx(1 - len(uncovered) / len(names))
+
+
+def test_nearest_hospital_ids_accepts_names_and_positions():
+    graph, names = random_city(9)
+    coverage = graph.coverage(INF)
+    ids = graph.csr.ids
+    x, y = graph.node_positions[names[3]]
+    got = list(graph.nearest_hospital_ids([names[0], (x + 0.01, y), names[5]]))
+    assert got == [coverage.owner[ids[names[0]]], coverage.owner[ids[names[3]]], coverage.owner[ids[names[5]]]]
+    assert all(graph.csr.names[i] in graph.hospitals for i in got if i >= 0)
@@ -0,0 +1,39 @@
+import random
+
+from navigator_store import GraphImporter, import_graph
+
+
+def test_every_row_is_a_two_way_road():
+    rows = [("a", "b", "1"), ("b", "c", "1"), ("a", "c", "10"), ("c", "d", "2")]
+    graph = GraphImporter().add_edges(rows).build()
+    for method in ("dijkstra", "astar", "bidirectional"):
+        assert graph.route("a", "c", method) == (2, ["a", "b", "c"])
+        assert graph.route("d", "a", method) == (4, ["d", "c", "b", "a"])
+    assert graph.k_shortest_routes("d", "a", 3) == [(4, ["d", "c", "b", "a"]), (12, ["d", "c", "a"])]
+
+
+def test_duplicate_roads_keep_the_shortest_and_self_loops_are_dropped():
+    rng = random.Random(3)
+    names = [f"n{i}" for i in range(30)]
+    rows, shortest = [], {}
+    for _ in range(400):
+        a, b = rng.choice(names), rng.choice(names)
+        w = rng.randint(1, 50)
+        rows.append((a, b, str(w)))
+        if a != b:
+            key = frozenset((a, b))
+            shortest[key] = min(shortest.get(key, w), w)
+    graph = GraphImporter().add_edges(rows).build()
+    roads = {frozenset((a, b)): w for a in graph.adj for b, w in graph.adj[a].items()}
+    assert roads == shortest
+    assert all(graph.adj[a][b] == graph.adj[b][a] for a in graph.adj for b in graph.adj[a])
+    assert all(isinstance(graph.route(a, b)[0], int) for a, b in zip(names, names[1:]))
+
+
+def test_files_with_headers_comments_and_node_rows(tmp_path):
+    (tmp_path / "edges.csv").write_text("from,to,km\n# closed for works\na,b,4\n\nb,a,2\nb,c,3.5\n")
+    (tmp_path / "nodes.csv").write_text("name,x,y,hospital\na,1,2,no\nc,5,6,yes\n")
+    graph = import_graph(tmp_path / "edges.csv", tmp_path / "nodes.csv")
+    assert graph.route("a", "c") == (5.5, ["a", "b", "c"])
+    assert set(graph.hospitals) == {"c"}
+    assert graph.node_positions["c"] == (5, 6)
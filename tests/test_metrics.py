@@ -0,0 +1,56 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from navigator_core import Graph, RoutingExecutor, populate_demo_graph
+from navigator_metrics import METRICS, Histogram, Registry
+
+
+def test_concurrent_recording_and_merging_loses_nothing():
+    registry = Registry()
+    registry.enable()
+    state = ({("merged", ()): 1}, {("merged_seconds", ()): Histogram()})
+    state[1][("merged_seconds", ())].observe(0.001)
+
+    def record():
+        for _ in range(20000):
+            registry.inc("calls")
+            registry.observe("seconds", 0.002)
+
+    def merge():
+        for _ in range(5000):
+            registry.merge(state)
+            registry.export("prometheus")
+
+    threads = [threading.Thread(target=record) for _ in range(4)] + [threading.Thread(target=merge)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.counters[("calls", ())] == 80000
+    assert registry.histograms[("seconds", ())].count == 80000
+    assert registry.counters[("merged", ())] == 5000
+    assert registry.histograms[("merged_seconds", ())].count == 5000
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_fork_pool_workers_report_only_their_own_work():
+    graph = Graph()
+    populate_demo_graph(graph)
+    graph.freeze()
+    METRICS.reset()
+    METRICS.enable()
+    executor = RoutingExecutor(graph, workers=1, mp_context=multiprocessing.get_context("fork"))
+    try:
+        graph.dijkstra("Agha Khan")
+        settled = METRICS.counters[("dijkstra_settled_total", ())]
+        searches = sum(h.count for (name, _), h in METRICS.histograms.items() if name == "dijkstra_seconds")
+        # The forked worker starts with a copy of these totals and runs the same search once
+        assert executor.submit("route", "Agha Khan", "Civil Hospital", "dijkstra").result()[0] == 25
+        assert METRICS.counters[("dijkstra_settled_total", ())] == 2 * settled
+        assert sum(h.count for (name, _), h in METRICS.histograms.items() if name == "dijkstra_seconds") == 2 * searches
+    finally:
+        executor.shutdown()
+        METRICS.disable()
+        METRICS.reset()
@@ -0,0 +1,47 @@
+import random
+
+from navigator_core import Graph, NameIndex, populate_demo_graph
+
+
+def demo_graph():
+    graph = Graph()
+    populate_demo_graph(graph)
+    return graph
+
+
+def test_resolve_single_word_typos_of_longer_names():
+    index = demo_graph().name_index()
+    assert index.resolve("ziaudin") == "Ziauddin Hospital"
+    assert index.resolve("civl") == "Civil Hospital"
+    assert index.resolve("Ziaudin hospitl") == "Ziauddin Hospital"
+    assert index.resolve("hospitl") is None  # every hospital is as close
+    assert index.resolve("xyzzy") is None
+
+
+def test_name_index_survives_road_changes():
+    graph = demo_graph()
+    index = graph.name_index()
+    a = next(iter(graph.adj))
+    graph.close_road(a, next(iter(graph.adj[a])))
+    assert graph.name_index() is index
+    graph.add_node("Saddar", 10, 10)
+    assert graph.name_index() is not index
+    assert graph.name_index().get("saddar") == "Saddar"
+
+
+def test_fuzzy_limit_keeps_the_closest_names():
+    rng = random.Random(5)
+    syllables = ["ka", "ba", "ha", "li", "na", "mo", "sha", "to", "ga", "pur"]
+    kinds = ["Hospital", "Clinic", "Park", "Colony", "Bridge"]
+    names = [f"{''.join(rng.choices(syllables, k=2)).title()} {rng.choice(kinds)} {rng.randint(1, 60)}"
+             for _ in range(1500)]
+    index = NameIndex(names)
+    for _ in range(200):
+        name = rng.choice(names)
+        text = name[:rng.randint(3, len(name))]
+        if rng.random() < 0.5:
+            i = rng.randrange(len(text))
+            text = text[:i] + text[i + 1:]
+        for prefix in (False, True):
+            everything = index.fuzzy(text, 2, len(names), prefix=prefix)
+            assert index.fuzzy(text, 2, 5, prefix=prefix) == everything[:5]
@@ -0,0 +1,31 @@
+from array import array
+
+from navigator_core import Graph, ShortestPathCache
+
+
+def tree(n):
+    return array("d", [0.0]) * n, array("q", [-1]) * n
+
+
+def test_cache_is_bounded_by_array_bytes():
+    cache = ShortestPathCache(maxbytes=16 * 100)
+    for key in "abc":
+        cache.put(key, 0, tree(40))  # 640 bytes each
+    assert list(cache.entries) == ["b", "c"] and cache.bytes == 1280
+    cache.get("b", 0)
+    cache.put("d", 0, tree(40))
+    assert list(cache.entries) == ["b", "d"] and cache.bytes == 1280
+    cache.put("e", 0, tree(500))  # larger than the budget, kept alone
+    assert list(cache.entries) == ["e"] and cache.bytes == 8000
+    cache.get("e", 1)
+    assert not cache.entries and cache.bytes == 0
+
+
+def test_graph_trees_are_counted_by_their_arrays():
+    graph = Graph()
+    for i in range(9):
+        graph.add_road(f"n{i}", f"n{i + 1}", 1)
+    graph.dijkstra("n0")
+    graph.k_shortest_routes("n0", "n9", 2)
+    assert graph.path_cache.bytes == sum(graph.path_cache._size(t) for t, _ in graph.path_cache.entries.values())
+    assert graph.path_cache.bytes >= 2 * 16 * 10
@@ -0,0 +1,78 @@
+import math
+import random
+
+import pytest
+
+from navigator_core import INF, Graph, HospitalPartition, populate_demo_graph
+from navigator_store import GraphImporter
+
+
+def demo_graph():
+    graph = Graph()
+    populate_demo_graph(graph)
+    graph.freeze()
+    return graph
+
+
+@pytest.mark.parametrize("distance", [-1, math.nan, -INF])
+def test_update_roads_rejects_bad_lengths(distance):
+    graph = demo_graph()
+    with pytest.raises(ValueError):
+        graph.update_roads([("Agha Khan", "Jinnah Hospital", distance)])
+    assert graph.route("Agha Khan", "Jinnah Hospital") == (15, ["Agha Khan", "Jinnah Hospital"])
+
+
+def test_closed_road_keeps_integer_distances_after_an_edit():
+    graph = demo_graph()
+    graph.close_road("Agha Khan", "Jinnah Hospital")
+    graph.add_road("Saifee Hospital", "Indus Hospital", 12)  # thaws back to dicts holding the inf
+    distance, route = graph.route("Agha Khan", "Jinnah Hospital")
+    assert distance == 50 and isinstance(distance, int)
+    assert route == ["Agha Khan", "Ziauddin Hospital", "Jinnah Hospital"]
+    assert graph.adj["Agha Khan"]["Jinnah Hospital"] == INF
+
+
+@pytest.mark.parametrize("weight", ["nan", "-2"])
+def test_importer_rejects_bad_lengths(weight):
+    rows = [("a", "b", "3"), ("b", "c", weight), ("c", "d", "1")]
+    with pytest.raises(ValueError):
+        GraphImporter().add_edges(rows)
+
+
+def test_repeated_updates_in_one_batch_use_the_last_length():
+    graph = Graph()
+    graph.add_hospital("H", 0, 0)
+    graph.add_hospital("K", 100, 0)
+    graph.add_node("J", 50, 0)
+    graph.add_road("H", "J", 10)
+    graph.add_road("J", "K", 12)
+    graph.precompute_hospital_partition()
+    assert graph.update_roads([("H", "J", 1), ("H", "J", 40)]) == 2
+    assert graph.nearest_hospitals("J", 1) == [("K", 12, ["J", "K"])]
+    assert graph.update_roads([("J", "K", 3), ("J", "K", 12)]) == 0
+
+
+def test_repaired_partition_matches_a_rebuild():
+    rng = random.Random(7)
+    graph = Graph()
+    for i in range(120):
+        graph.add_node(f"n{i}", rng.uniform(0, 500), rng.uniform(0, 500))
+    for i in range(0, 120, 15):
+        graph.hospitals.add(f"n{i}")
+    roads = set()
+    for i in range(1, 120):
+        roads.add((rng.randrange(i), i))
+    while len(roads) < 260:
+        a, b = rng.sample(range(120), 2)
+        roads.add((min(a, b), max(a, b)))
+    for a, b in roads:
+        graph.add_road(f"n{a}", f"n{b}", rng.randint(1, 20))
+    partition = graph.precompute_hospital_partition()
+    roads = sorted(roads)
+    for _ in range(30):
+        batch = []
+        for a, b in rng.sample(roads, 6):
+            # The same road often comes back later in the batch with another length
+            batch += [(f"n{a}", f"n{b}", rng.choice([None, rng.randint(1, 30)])) for _ in range(rng.randint(1, 3))]
+        graph.update_roads(batch)
+        assert list(partition.dist) == list(HospitalPartition(graph.csr).dist)
@@ -0,0 +1,148 @@
+import random
+
+import pytest
+
+import navigator_core
+from navigator_core import INF, MATRIX_PARALLEL_MIN, Graph
+
+
+def random_city(seed, n=60, extra=40):
+    """Random junctions joined by a chain (with a few gaps, so some pairs are unreachable)
+    plus random shortcuts; odd seeds use integer road lengths, even seeds fractional ones."""
+    rng = random.Random(seed)
+    graph = Graph()
+    names = [f"j{i}" for i in range(n)]
+    for name in names:
+        graph.add_node(name, rng.uniform(0, 900), rng.uniform(0, 500))
+    for a, b in zip(names, names[1:]):
+        if rng.random() < 0.95:
+            graph.add_road(a, b, rng.randint(1, 20))
+    for _ in range(extra):
+        a, b = rng.sample(names, 2)
+        graph.add_road(a, b, rng.randint(1, 20) if seed % 2 else rng.uniform(0.5, 20))
+    for name in rng.sample(names, 4):
+        graph.hospitals.add(name)
+    graph.freeze()
+    return graph, names, rng
+
+
+def route_length(graph, route, overlay=None):
+    return graph.hop_distances(route, overlay)[-1]
+
+
+@pytest.mark.parametrize("seed", range(12))
+@pytest.mark.parametrize("method", ["astar", "alt", "bidirectional"])
+def test_route_matches_dijkstra(seed, method):
+    graph, names, rng = random_city(seed)
+    for _ in range(25):
+        start, target = rng.choice(names), rng.choice(names)
+        dist, _ = graph.dijkstra(start)
+        graph.path_cache.clear()  # make route() search instead of reading the tree
+        d, route = graph.route(start, target, method)
+        if dist[target] == INF:
+            assert (d, route) == (INF, [])
+            continue
+        assert d == pytest.approx(dist[target])
+        assert route[0] == start and route[-1] == target
+        assert route_length(graph, route) == pytest.approx(d)
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("method", ["astar", "alt", "bidirectional"])
+def test_route_from_overlay_matches_dijkstra(seed, method):
+    graph, names, rng = random_city(seed)
+    for i in range(10):
+        overlay = graph.snap(f"caller {i}", rng.uniform(0, 900), rng.uniform(0, 500))
+        target = rng.choice(names)
+        dist, _ = graph.dijkstra(overlay.origin, overlay)
+        graph.path_cache.clear()
+        d, route = graph.route(overlay.origin, target, method, overlay)
+        if dist[target] == INF:
+            assert route == []
+            continue
+        assert d == pytest.approx(dist[target])
+        assert route[0] == overlay.origin and route[-1] == target
+        assert route_length(graph, route, overlay) == pytest.approx(d)
+
+
+def simple_paths(graph, start, target):
+    """Every loopless route from start to target with its length (brute force)."""
+    found, stack = [], [(start, [start], 0)]
+    while stack:
+        node, path, d = stack.pop()
+        if node == target:
+            found.append((d, path))
+            continue
+        for nxt, w in graph.adj[node].items():
+            if nxt not in path:
+                stack.append((nxt, path + [nxt], d + w))
+    return sorted(found)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_k_shortest_routes_match_brute_force(seed):
+    graph, names, rng = random_city(seed, n=10, extra=8)
+    for _ in range(10):
+        start, target = rng.sample(names, 2)
+        want = simple_paths(graph, start, target)
+        got = graph.k_shortest_routes(start, target, 4)
+        assert [d for d, _ in got] == pytest.approx([d for d, _ in want[:4]])
+        for d, route in got:
+            assert route[0] == start and route[-1] == target and len(set(route)) == len(route)
+            assert route_length(graph, route) == pytest.approx(d)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_subtree_ranges_match_the_tree(seed):
+    graph, names, rng = random_city(seed)
+    csr = graph.csr
+    root = rng.randrange(len(csr))
+    _, prev = csr.dijkstra(root)
+    start, end = csr.subtree_ranges(prev, root)
+
+    def ancestors(x):
+        while x >= 0:
+            yield x
+            x = prev[x]
+
+    for x in range(len(csr)):
+        if x != root and prev[x] < 0:
+            assert start[x] == -1  # unreached
+            continue
+        above = set(ancestors(x))
+        for y in range(len(csr)):
+            if start[y] >= 0:
+                assert (start[y] <= start[x] < end[y]) == (y in above)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("flip", [False, True])
+def test_distance_matrix_matches_dijkstra(workers, flip, monkeypatch):
+    pools = []
+    real = navigator_core.ProcessPoolExecutor
+    monkeypatch.setattr(navigator_core, "ProcessPoolExecutor", lambda *a, **kw: pools.append(a) or real(*a, **kw))
+    # Both sides are big enough for the pool; the smaller one is searched from
+    graph, names, rng = random_city(3, n=MATRIX_PARALLEL_MIN + 20)
+    sources = rng.sample(names, MATRIX_PARALLEL_MIN + (6 if flip else 2))
+    targets = rng.sample(names, MATRIX_PARALLEL_MIN + (2 if flip else 6))
+    matrix = graph.distance_matrix(sources, targets, workers=workers)
+    assert len(pools) == (workers > 1)
+    assert len(matrix) == len(sources)
+    for s, row in zip(sources, matrix):
+        dist, _ = graph.dijkstra(s)
+        assert list(row) == [dist[t] for t in targets]
+
+
+def test_landmarks_survive_a_save_and_load(tmp_path):
+    graph, names, rng = random_city(5)
+    built = graph.build_landmarks(4, tmp_path / "alt.bin")
+    copy, _, _ = random_city(5)
+    loaded = copy.load_landmarks(tmp_path / "alt.bin")
+    assert loaded.landmarks == built.landmarks
+    assert [list(d) for d in loaded.dist] == [list(d) for d in built.dist]
+    for _ in range(10):
+        start, target = rng.sample(names, 2)
+        assert copy.route(start, target, "alt") == graph.route(start, target, "alt")
+    other, _, _ = random_city(6)
+    with pytest.raises(ValueError):
+        other.load_landmarks(tmp_path / "alt.bin")
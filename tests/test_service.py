@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from navigator_core import Graph, populate_demo_graph
+from navigator_service import HTTPError, open_service
+from navigator_store import Storage
+
+
+def test_queues_only_for_hospitals(tmp_path):
+    graph = Graph()
+    populate_demo_graph(graph)
+    graph.add_node("Main Road", 400, 300)
+    graph.add_road("Main Road", "Agha Khan", 4)
+    Storage(str(tmp_path)).save_graph(graph)
+
+    service = open_service(str(tmp_path), workers=1)
+    try:
+        assert set(service.managers) == set(graph.hospitals)
+        health = asyncio.run(service.health({}))
+        assert health["nodes"] == 7 and health["hospitals"] == 6
+        with pytest.raises(HTTPError) as error:
+            asyncio.run(service.book({"hospital": "Main Road", "name": "Ali", "priority": 1}))
+        assert error.value.status == 404
+        booked = asyncio.run(service.book({"hospital": "Agha Khan", "name": "Ali", "priority": 1}))
+        assert booked["hospital"] == "Agha Khan"
+    finally:
+        service.router.shutdown()
+        service.storage.close()
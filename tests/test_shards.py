@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from navigator_core import BucketAppointmentManager
+from navigator_shards import ShardedQueues
+
+
+HOSPITALS = [f"Hospital {i}" for i in range(12)]
+
+
+def rows(count, seed):
+    rng = random.Random(seed)
+    return [(rng.choice(HOSPITALS), f"p{i}", rng.choice((1, 2, 3)), "x") for i in range(count)]
+
+
+def test_column_requests_match_row_by_row_calls():
+    work = rows(3000, 1)
+    ref = {h: BucketAppointmentManager() for h in HOSPITALS}
+    want = [ref[h].book(name, p, details) for h, name, p, details in work]
+    with ShardedQueues(HOSPITALS, workers=3) as queues:
+        assert queues.book_many(*(list(column) for column in zip(*work))) == want
+        order = [h for h, _, _, _ in rows(3500, 2)]
+        assert queues.pop_many(order) == [ref[h].pop_next() for h in order]
+        assert all(queues[h].peek_all() == ref[h].peek_all() for h in HOSPITALS)
+
+
+def test_rejected_rows_raise_after_the_rest_are_booked():
+    with ShardedQueues(HOSPITALS[:2], workers=2) as queues:
+        a, b = HOSPITALS[:2]
+        with pytest.raises(ValueError, match="row 1:"):
+            queues.book_many([a, a, b, b], ["w", "x", "y", "z"], [1, 9, 2, 7])
+        assert queues[a].peek_all() == [(1, 1, "w", "")]
+        assert queues[b].peek_all() == [(2, 1, "y", "")]
@@ -0,0 +1,39 @@
+import random
+import time
+
+from navigator_core import SpatialIndex
+
+
+def brute(positions, x, y, k):
+    return sorted((((px - x) ** 2 + (py - y) ** 2) ** 0.5, name) for name, (px, py) in positions.items())[:k]
+
+
+def random_positions(count, seed):
+    rng = random.Random(seed)
+    return {f"n{i}": (rng.uniform(0, 1000), rng.uniform(0, 600)) for i in range(count)}
+
+
+def test_nearest_matches_brute_force():
+    positions = random_positions(500, 1)
+    index = SpatialIndex(positions)
+    rng = random.Random(2)
+    for _ in range(200):
+        x, y = rng.uniform(-500, 1500), rng.uniform(-500, 1100)
+        k = rng.randint(1, 8)
+        assert index.nearest(x, y, k) == brute(positions, x, y, k)
+
+
+def test_far_away_point_is_fast():
+    positions = random_positions(2000, 3)
+    index = SpatialIndex(positions)
+    start = time.perf_counter()
+    for x, y in ((1e9, 0), (-1e9, -1e9), (2e5, 300), (500, 1e12)):
+        assert index.nearest(x, y, 3) == brute(positions, x, y, 3)
+    assert time.perf_counter() - start < 1
+
+
+def test_within_clips_to_the_data():
+    positions = random_positions(300, 4)
+    index = SpatialIndex(positions)
+    assert len(index.within(500, 300, 1e7)) == 300
+    assert index.within(500, 300, 50) == [hit for hit in brute(positions, 500, 300, 300) if hit[0] <= 50]
@@ -0,0 +1,89 @@
+import pytest
+
+from navigator_core import AppointmentManager, BucketAppointmentManager, Graph
+from navigator_store import Storage, load_graph, save_graph
+
+HOSPITALS = ["Agha Khan", "Civil Hospital", "Indus Hospital"]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def snapshot(queues):
+    return {h: (q.peek_all(), q.counter) for h, q in queues.items()}
+
+
+@pytest.mark.parametrize("factory", [BucketAppointmentManager, AppointmentManager])
+def test_checkpoint_and_journal_restore(tmp_path, factory):
+    storage = Storage(str(tmp_path))
+    queues = storage.open_queues(HOSPITALS, factory)
+    for i in range(300):
+        queues[HOSPITALS[i % 2]].book(f"patient {i % 40}", 1 + i % 3, "Ünïcode ✓" if i % 7 else "")
+    storage.checkpoint()
+    queues["Agha Khan"].pop_next()
+    queues["Agha Khan"].cancel(4)
+    queues["Civil Hospital"].update_priority(10, 1)
+    queues["Civil Hospital"].book("walk-in", 2, "triage")
+    expected = snapshot(queues)
+    found = queues["Agha Khan"].find("patient 2")
+    storage.close()
+
+    storage = Storage(str(tmp_path))
+    queues = storage.open_queues(HOSPITALS, factory)
+    assert snapshot(queues) == expected
+    assert queues["Agha Khan"].find("patient 2") == found
+    assert len(queues["Indus Hospital"]) == 0
+    storage.close()
+
+
+def test_checkpoint_rejects_nul_in_names(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.open_queues(HOSPITALS, BucketAppointmentManager)["Agha Khan"].book("a\0b", 1)
+    with pytest.raises(ValueError):
+        storage.checkpoint()
+    storage.close()
+
+
+def test_aging_promotions_replay_in_order(tmp_path):
+    clock = Clock()
+
+    def factory():
+        return BucketAppointmentManager(max_wait=10, clock=clock)
+
+    storage = Storage(str(tmp_path))
+    queue = storage.open_queues(HOSPITALS, factory)["Agha Khan"]
+    queue.book("a", 3)
+    queue.book("b", 2)
+    queue.book("c", 1)
+    clock.now = 10
+    queue.peek(1)  # promotes a and b
+    queue.book("d", 2)
+    queue.book("e", 1)
+    expected = queue.peek_all()
+    assert [name for _, _, name, _ in expected] == ["c", "b", "e", "a", "d"]
+    storage.close()
+
+    storage = Storage(str(tmp_path))
+    assert storage.open_queues(HOSPITALS, factory)["Agha Khan"].peek_all() == expected
+    storage.close()
+
+
+def test_loaded_graph_views(tmp_path):
+    graph = Graph()
+    graph.add_hospital("H", 10, 20)
+    graph.add_node("J", 30, 40)
+    graph.add_road("H", "J", 7)
+    path = str(tmp_path / "graph.bin")
+    save_graph(graph, path)
+    loaded = load_graph(path)
+    assert loaded.hospitals == {"H"} and "J" not in loaded.hospitals
+    assert dict(loaded.node_positions) == {"H": (10, 20), "J": (30, 40)}
+    loaded.add_hospital("K", 50, 60)  # the first edit turns the views into a dict and a set
+    loaded.add_road("J", "K", 3)
+    assert loaded.hospitals == {"H", "K"}
+    assert loaded.route("J", "K") == (3, ["J", "K"])